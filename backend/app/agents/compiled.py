@@ -0,0 +1,105 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.models import Agent
+
+# Optional Agent.configuration entries appended to the system prompt, in order
+PREAMBLE_SECTIONS = [
+    ("instructions", "Instructions"),
+    ("knowledge", "Background knowledge"),
+    ("response_style", "Response style"),
+]
+
+class CompiledAgent:
+    """
+    An agent's ready-to-send prompt prefix.
+    
+    The prefix is byte-identical on every turn, so providers that cache
+    prompt prefixes (Anthropic cache_control, OpenAI automatic prefix
+    caching) can reuse it. It is always the first message and flagged with
+    'cache'; anything that changes between turns goes in later messages.
+    """
+    
+    def __init__(self, agent_id: str, version: Optional[str], prefix: str):
+        self.agent_id = agent_id
+        self.version = version
+        self.prefix = prefix
+    
+    def messages(self, summary: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the system messages for a turn: the cached prefix, then the
+        conversation summary if there is one.
+        """
+        messages: List[Dict[str, Any]] = [{"role": "system", "content": self.prefix, "cache": True}]
+        if summary:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{summary}"
+            })
+        return messages
+
+def compile_agent(agent: Agent) -> CompiledAgent:
+    """
+    Build the prompt prefix of an agent from its system prompt and configuration.
+    """
+    configuration = agent.configuration or {}
+    parts = [agent.system_prompt.strip()]
+    
+    for key, title in PREAMBLE_SECTIONS:
+        value = configuration.get(key)
+        if not value:
+            continue
+        if isinstance(value, list):
+            value = "\n".join(f"- {item}" for item in value)
+        parts.append(f"{title}:\n{value}")
+    
+    return CompiledAgent(str(agent.id), CompiledAgentCache.version_of(agent), "\n\n".join(parts))
+
+class CompiledAgentCache:
+    """
+    LRU cache of compiled agents.
+    
+    Entries are invalidated explicitly when an agent is updated and are also
+    checked against the agent's updated_at, so an update made through another
+    worker is picked up the next time the row is loaded.
+    """
+    
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._agents: "OrderedDict[str, CompiledAgent]" = OrderedDict()
+    
+    def get(self, agent: Agent) -> CompiledAgent:
+        """
+        Get the compiled form of an agent, compiling it if needed.
+        """
+        agent_id = str(agent.id)
+        compiled = self._agents.get(agent_id)
+        if compiled is not None and compiled.version == self.version_of(agent):
+            self.hits += 1
+            self._agents.move_to_end(agent_id)
+            return compiled
+        
+        self.misses += 1
+        compiled = compile_agent(agent)
+        self._agents[agent_id] = compiled
+        self._agents.move_to_end(agent_id)
+        if len(self._agents) > self.max_size:
+            self._agents.popitem(last=False)
+        return compiled
+    
+    def invalidate(self, agent_id: Any) -> None:
+        """
+        Drop the compiled form of an agent.
+        """
+        self._agents.pop(str(agent_id), None)
+    
+    def stats(self) -> Dict[str, int]:
+        return {"agents": len(self._agents), "hits": self.hits, "misses": self.misses}
+    
+    @staticmethod
+    def version_of(agent: Agent) -> Optional[str]:
+        return agent.updated_at.isoformat() if agent.updated_at else None
+
+compiled_agents = CompiledAgentCache()
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
 import uuid
 
 from app.database import get_db
+from app.replicas import get_read_db
 from app.models import Agent
 from app.auth.dependencies import get_current_active_user
+from app.agents.compiled import compiled_agents
 
 router = APIRouter(prefix="/agents", tags=["agents"])
 
@@ -38,16 +41,16 @@ class AgentResponse(AgentBase):
 async def get_agents(
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user = Depends(get_current_active_user)
 ):
-    agents = db.query(Agent).filter(Agent.user_id == current_user.id).offset(skip).limit(limit).all()
+    agents = (await db.scalars(select(Agent).where(Agent.user_id == current_user.id).offset(skip).limit(limit))).all()
     return agents
 
 @router.post("/", response_model=AgentResponse, status_code=status.HTTP_201_CREATED)
 async def create_agent(
     agent_data: AgentCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     new_agent = Agent(
@@ -56,18 +59,18 @@ async def create_agent(
     )
     
     db.add(new_agent)
-    db.commit()
-    db.refresh(new_agent)
+    await db.commit()
+    await db.refresh(new_agent)
     
     return new_agent
 
 @router.get("/{agent_id}", response_model=AgentResponse)
 async def get_agent(
     agent_id: uuid.UUID, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    agent = db.query(Agent).filter(Agent.id == agent_id, Agent.user_id == current_user.id).first()
+    agent = await db.scalar(select(Agent).where(Agent.id == agent_id, Agent.user_id == current_user.id))
     
     if not agent:
         raise HTTPException(
@@ -81,10 +84,10 @@ async def get_agent(
 async def update_agent(
     agent_id: uuid.UUID, 
     agent_data: AgentUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    agent = db.query(Agent).filter(Agent.id == agent_id, Agent.user_id == current_user.id).first()
+    agent = await db.scalar(select(Agent).where(Agent.id == agent_id, Agent.user_id == current_user.id))
     
     if not agent:
         raise HTTPException(
@@ -95,18 +98,19 @@ async def update_agent(
     for key, value in agent_data.dict().items():
         setattr(agent, key, value)
     
-    db.commit()
-    db.refresh(agent)
+    await db.commit()
+    await db.refresh(agent)
+    compiled_agents.invalidate(agent.id)
     
     return agent
 
 @router.delete("/{agent_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_agent(
     agent_id: uuid.UUID, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    agent = db.query(Agent).filter(Agent.id == agent_id, Agent.user_id == current_user.id).first()
+    agent = await db.scalar(select(Agent).where(Agent.id == agent_id, Agent.user_id == current_user.id))
     
     if not agent:
         raise HTTPException(
@@ -114,18 +118,19 @@ async def delete_agent(
             detail="Agent not found"
         )
     
-    db.delete(agent)
-    db.commit()
+    await db.delete(agent)
+    await db.commit()
+    compiled_agents.invalidate(agent_id)
     
     return None
 
 @router.post("/{agent_id}/duplicate", response_model=AgentResponse)
 async def duplicate_agent(
     agent_id: uuid.UUID, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    agent = db.query(Agent).filter(Agent.id == agent_id, Agent.user_id == current_user.id).first()
+    agent = await db.scalar(select(Agent).where(Agent.id == agent_id, Agent.user_id == current_user.id))
     
     if not agent:
         raise HTTPException(
@@ -143,7 +148,7 @@ async def duplicate_agent(
     )
     
     db.add(new_agent)
-    db.commit()
-    db.refresh(new_agent)
+    await db.commit()
+    await db.refresh(new_agent)
     
     return new_agent
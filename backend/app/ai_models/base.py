@@ -1,5 +1,11 @@
+import asyncio
+import json
+import logging
+import re
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
 
 class AIModelBase(ABC):
     """
@@ -7,6 +13,9 @@ class AIModelBase(ABC):
     All model providers must implement these methods.
     """
     
+    # Environment variable holding the provider's API key
+    API_KEY_ENV: str = ""
+    
     @abstractmethod
     async def generate_text(self, prompt: str, system_message: Optional[str] = None, 
                            temperature: float = 0.7, max_tokens: int = 1000, 
@@ -45,6 +54,53 @@ class AIModelBase(ABC):
         """
         pass
     
+    async def stream_chat_response(self, messages: List[Dict[str, str]], 
+                                   temperature: float = 0.7, max_tokens: int = 1000,
+                                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream a response to a conversation history as it is generated.
+        
+        Providers with native streaming override this to yield token deltas as
+        soon as they arrive. The default implementation yields the complete
+        response as a single chunk.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content' keys
+            temperature: Controls randomness (0.0 to 1.0)
+            max_tokens: Maximum number of tokens to generate
+            options: Additional model-specific options
+            
+        Yields:
+            Text deltas of the generated response
+        """
+        yield await self.generate_chat_response(messages, temperature=temperature,
+                                                max_tokens=max_tokens, options=options)
+    
+    async def stream_text(self, prompt: str, system_message: Optional[str] = None, 
+                          temperature: float = 0.7, max_tokens: int = 1000, 
+                          options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream text generated from the provided prompt.
+        
+        Args:
+            prompt: The user prompt to generate text from
+            system_message: Optional system message to guide the model's behavior
+            temperature: Controls randomness (0.0 to 1.0)
+            max_tokens: Maximum number of tokens to generate
+            options: Additional model-specific options
+            
+        Yields:
+            Text deltas of the generated text
+        """
+        messages = []
+        if system_message:
+            messages.append({"role": "system", "content": system_message})
+        messages.append({"role": "user", "content": prompt})
+        
+        async for chunk in self.stream_chat_response(messages, temperature=temperature,
+                                                     max_tokens=max_tokens, options=options):
+            yield chunk
+    
     @abstractmethod
     async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
                                        options: Optional[Dict[str, Any]] = None) -> float:
@@ -61,6 +117,115 @@ class AIModelBase(ABC):
         """
         pass
     
+    async def score_conflict_resolutions(self, conflict_text: str, resolution_texts: List[str],
+                                         options: Optional[Dict[str, Any]] = None,
+                                         batch_size: int = 10) -> List[float]:
+        """
+        Score several candidate resolutions of a conflict in as few calls as possible.
+        
+        Candidates are scored together in one structured prompt per batch of
+        batch_size, and batches run concurrently. If a batch response cannot be
+        parsed, its candidates default to 0.5, as with score_conflict_resolution.
+        
+        Args:
+            conflict_text: The text describing the conflict
+            resolution_texts: The proposed resolutions to score
+            options: Additional model-specific options
+            batch_size: Maximum number of candidates scored per call
+            
+        Returns:
+            Scores between 0.0 and 1.0, in the order of resolution_texts
+        """
+        if not resolution_texts:
+            return []
+        
+        batches = [
+            resolution_texts[start:start + batch_size]
+            for start in range(0, len(resolution_texts), batch_size)
+        ]
+        results = await asyncio.gather(*[
+            self._score_batch(conflict_text, batch, options) for batch in batches
+        ])
+        return [score for batch_scores in results for score in batch_scores]
+    
+    async def _score_batch(self, conflict_text: str, resolution_texts: List[str],
+                           options: Optional[Dict[str, Any]]) -> List[float]:
+        candidates = "\n\n".join(
+            f"[{index}]\n{text}" for index, text in enumerate(resolution_texts, start=1)
+        )
+        prompt = f"""
+        You are evaluating the quality of several proposed resolutions of a conflict between AI agents.
+        
+        Conflict:
+        {conflict_text}
+        
+        Proposed Resolutions:
+        {candidates}
+        
+        Please evaluate each resolution on a scale from 0.0 to 1.0, where:
+        - 0.0 means the resolution completely fails to address the conflict
+        - 1.0 means the resolution perfectly addresses the conflict
+        
+        Return only a JSON array of {len(resolution_texts)} numbers between 0.0 and 1.0,
+        one per resolution, in the order given.
+        """
+        
+        response = await self.generate_text(
+            prompt,
+            system_message="You are an AI evaluator that scores conflict resolutions.",
+            temperature=0.1,  # Low temperature for more deterministic scoring
+            max_tokens=8 * len(resolution_texts) + 16,
+            options=options
+        )
+        
+        scores = self._parse_scores(response, len(resolution_texts))
+        if scores is None:
+            logger.warning(f"Could not parse batch conflict scores: {response!r}")
+            return [0.5] * len(resolution_texts)
+        return scores
+    
+    @staticmethod
+    def _parse_scores(response_text: str, expected: int) -> Optional[List[float]]:
+        """
+        Parse a list of scores from a model response, clamped to 0.0-1.0.
+        
+        Returns:
+            The scores, or None if the response does not contain exactly
+            the expected number of scores
+        """
+        values: List[Any] = []
+        match = re.search(r"\[[^\[\]]*\]", response_text)
+        if match:
+            try:
+                values = json.loads(match.group(0))
+            except ValueError:
+                values = []
+        
+        if len(values) != expected:
+            values = re.findall(r"[0-9]*\.?[0-9]+", response_text)
+        
+        if len(values) != expected:
+            return None
+        
+        try:
+            return [max(0.0, min(1.0, float(value))) for value in values]
+        except (TypeError, ValueError):
+            return None
+    
+    @classmethod
+    @abstractmethod
+    def describe(cls, model_name: str) -> Dict[str, Any]:
+        """
+        Get information about a model of this provider without creating a client.
+        
+        Args:
+            model_name: The model name to describe
+            
+        Returns:
+            Dictionary containing model information, as returned by get_model_info
+        """
+        pass
+    
     @abstractmethod
     def get_model_info(self) -> Dict[str, Any]:
         """
@@ -70,3 +235,19 @@ class AIModelBase(ABC):
             Dictionary containing model information like name, provider, capabilities, etc.
         """
         pass
+
+class ModelWrapper(AIModelBase):
+    """
+    Base class for models that add behaviour (caching, coalescing, rate
+    limiting, failover) around other models rather than calling a provider.
+    """
+    
+    @classmethod
+    def describe(cls, model_name: str) -> Dict[str, Any]:
+        """
+        Wrappers have no models of their own; describe the provider class instead.
+        
+        Raises:
+            TypeError: Always
+        """
+        raise TypeError(f"{cls.__name__} wraps other models and cannot describe {model_name!r}")
@@ -0,0 +1,322 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.ai_models.base import AIModelBase, ModelWrapper
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Options key callers can set to False to skip the cache for one request.
+# It is removed before the options reach the provider.
+CACHE_OPTION = "cache"
+
+def make_request_key(**parts: Any) -> str:
+    """
+    Build a stable key identifying a model request from its parts.
+    """
+    encoded = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def key_fingerprint(api_key: Optional[str]) -> str:
+    """
+    Get a short hash of an API key, for keys that must not be shared across credentials.
+    """
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+def normalize_messages(messages: List[Dict[str, str]]) -> List[List[str]]:
+    """
+    Reduce messages to their role and stripped content for request keys.
+    """
+    return [[message["role"], message["content"].strip()] for message in messages]
+
+def normalize_prompt(prompt: str, system_message: Optional[str]) -> List[str]:
+    """
+    Reduce a prompt and optional system message to a request key payload.
+    """
+    return [(system_message or "").strip(), prompt.strip()]
+
+class ResponseCache:
+    """
+    Two-tier cache for model responses.
+    
+    The first tier is an in-process LRU with a per-entry TTL. The optional
+    second tier is Redis, shared across workers; Redis errors are logged and
+    treated as misses so the cache never fails a request.
+    """
+    
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 3600.0,
+                 redis_url: Optional[str] = None, key_prefix: str = "llm-cache:"):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_entries: Maximum number of entries kept in process
+            default_ttl: Default time to live of an entry in seconds
+            redis_url: Optional Redis URL enabling the shared tier
+            key_prefix: Prefix for keys stored in Redis
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.key_prefix = key_prefix
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._redis = None
+        
+        if redis_url:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(redis_url)
+        
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+    
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a value, checking the in-process tier before Redis.
+        
+        Returns:
+            The cached value, or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(self.key_prefix + key)
+            except Exception as e:
+                logger.warning(f"LLM cache Redis read failed: {e}")
+                raw = None
+            
+            if raw is not None:
+                try:
+                    value = json.loads(raw)
+                except ValueError as e:
+                    logger.warning(f"Ignoring corrupt LLM cache entry {key}: {e}")
+                else:
+                    self._store_local(key, value, self.default_ttl)
+                    self.redis_hits += 1
+                    return value
+        
+        self.misses += 1
+        return None
+    
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a value in both tiers.
+        
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+            ttl: Time to live in seconds (defaults to default_ttl)
+        """
+        ttl = ttl or self.default_ttl
+        self._store_local(key, value, ttl)
+        
+        if self._redis is not None:
+            try:
+                await self._redis.set(self.key_prefix + key, json.dumps(value), ex=int(ttl))
+            except Exception as e:
+                logger.warning(f"LLM cache Redis write failed: {e}")
+    
+    def clear(self) -> None:
+        """
+        Drop every in-process entry.
+        """
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss counters for the cache.
+        """
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "hit_rate": (self.hits + self.redis_hits) / lookups if lookups else 0.0
+        }
+    
+    def _store_local(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+class CachedModel(ModelWrapper):
+    """
+    AIModelBase wrapper that serves repeated requests from a ResponseCache.
+    
+    Requests are keyed on provider, API key fingerprint, model, normalized
+    messages and sampling parameters, so responses are never shared across
+    credentials. Requests with a temperature above max_temperature, or with
+    options {"cache": False}, bypass the cache.
+    """
+    
+    def __init__(self, model: AIModelBase, provider: str, cache: "ResponseCache",
+                 api_key: Optional[str] = None, max_temperature: float = 0.3, ttl: Optional[float] = None):
+        """
+        Initialize the cached model.
+        
+        Args:
+            model: The model to wrap
+            provider: Provider name used in cache keys
+            cache: The response cache to use
+            api_key: API key the wrapped model calls with; only its hash is kept
+            max_temperature: Highest temperature that is still cached
+            ttl: Time to live of entries written by this model
+        """
+        self.model = model
+        self.provider = provider
+        self.cache = cache
+        self.key_fingerprint = key_fingerprint(api_key)
+        self.max_temperature = max_temperature
+        self.ttl = ttl
+    
+    async def generate_text(self, prompt: str, system_message: Optional[str] = None,
+                           temperature: float = 0.7, max_tokens: int = 1000,
+                           options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate text, serving repeated requests from the cache.
+        """
+        use_cache, options = self._check_bypass(temperature, options)
+        if not use_cache:
+            return await self.model.generate_text(prompt, system_message=system_message,
+                                                  temperature=temperature, max_tokens=max_tokens,
+                                                  options=options)
+        
+        key = self._key("generate_text", normalize_prompt(prompt, system_message),
+                        temperature, max_tokens, options)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        result = await self.model.generate_text(prompt, system_message=system_message,
+                                                temperature=temperature, max_tokens=max_tokens,
+                                                options=options)
+        await self.cache.set(key, result, self.ttl)
+        return result
+    
+    async def generate_chat_response(self, messages: List[Dict[str, str]],
+                                    temperature: float = 0.7, max_tokens: int = 1000,
+                                    options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate a chat response, serving repeated requests from the cache.
+        """
+        use_cache, options = self._check_bypass(temperature, options)
+        if not use_cache:
+            return await self.model.generate_chat_response(messages, temperature=temperature,
+                                                           max_tokens=max_tokens, options=options)
+        
+        key = self._key("chat", normalize_messages(messages), temperature, max_tokens, options)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        result = await self.model.generate_chat_response(messages, temperature=temperature,
+                                                         max_tokens=max_tokens, options=options)
+        await self.cache.set(key, result, self.ttl)
+        return result
+    
+    async def stream_chat_response(self, messages: List[Dict[str, str]],
+                                   temperature: float = 0.7, max_tokens: int = 1000,
+                                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat response; a cached response is replayed as one chunk.
+        
+        Streams share cache entries with generate_chat_response. The upstream
+        stream is only opened on a miss.
+        """
+        use_cache, options = self._check_bypass(temperature, options)
+        open_stream = lambda: self.model.stream_chat_response(messages, temperature=temperature,
+                                                              max_tokens=max_tokens, options=options)
+        if not use_cache:
+            chunks = open_stream()
+            async with aclosing(chunks):
+                async for chunk in chunks:
+                    yield chunk
+            return
+        
+        key = self._key("chat", normalize_messages(messages), temperature, max_tokens, options)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        parts = []
+        chunks = open_stream()
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        await self.cache.set(key, "".join(parts), self.ttl)
+    
+    async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
+                                       options: Optional[Dict[str, Any]] = None) -> float:
+        """
+        Score a conflict resolution, serving repeated requests from the cache.
+        
+        Scoring always runs at a low temperature, so it is cached unless
+        explicitly bypassed.
+        """
+        use_cache, options = self._check_bypass(0.0, options)
+        if not use_cache:
+            return await self.model.score_conflict_resolution(conflict_text, resolution_text,
+                                                              options=options)
+        
+        key = self._key("score", [conflict_text.strip(), resolution_text.strip()], None, None, options)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        score = await self.model.score_conflict_resolution(conflict_text, resolution_text,
+                                                           options=options)
+        await self.cache.set(key, score, self.ttl)
+        return score
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """
+        Get information about the wrapped model.
+        """
+        return self.model.get_model_info()
+    
+    def _check_bypass(self, temperature: float,
+                      options: Optional[Dict[str, Any]]) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        use_cache = temperature <= self.max_temperature
+        if options and CACHE_OPTION in options:
+            options = dict(options)
+            use_cache = use_cache and bool(options.pop(CACHE_OPTION))
+        if not use_cache:
+            self.cache.bypasses += 1
+        return use_cache, options
+    
+    def _key(self, operation: str, payload: Any, temperature: Optional[float],
+             max_tokens: Optional[int], options: Optional[Dict[str, Any]]) -> str:
+        return make_request_key(
+            provider=self.provider,
+            api_key=self.key_fingerprint,
+            model=self.model.get_model_info()["name"],
+            operation=operation,
+            payload=payload,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            options=options or {}
+        )
+
+response_cache = ResponseCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    default_ttl=settings.LLM_CACHE_TTL_SECONDS,
+    redis_url=settings.REDIS_URL if settings.LLM_CACHE_REDIS_ENABLED else None
+)
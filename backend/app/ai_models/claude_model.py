@@ -1,13 +1,19 @@
 import os
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple, Union
 import anthropic
 from app.ai_models.base import AIModelBase
+from app.ai_models.http_client import get_http_client
+
+# Enables cache_control on system blocks
+PROMPT_CACHING_HEADERS = {"anthropic-beta": "prompt-caching-2024-07-31"}
 
 class ClaudeModel(AIModelBase):
     """
     Implementation of the Anthropic Claude model integration.
     """
     
+    API_KEY_ENV = "ANTHROPIC_API_KEY"
+    
     def __init__(self, api_key: Optional[str] = None, model_name: str = "claude-3-opus-20240229"):
         """
         Initialize the Claude model.
@@ -16,12 +22,12 @@ class ClaudeModel(AIModelBase):
             api_key: Anthropic API key (defaults to environment variable)
             model_name: Claude model name to use
         """
-        self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
+        self.api_key = api_key or os.getenv(self.API_KEY_ENV)
         if not self.api_key:
             raise ValueError("Anthropic API key is required")
         
         self.model_name = model_name
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+        self.client = anthropic.AsyncAnthropic(api_key=self.api_key, http_client=get_http_client())
     
     async def generate_text(self, prompt: str, system_message: Optional[str] = None, 
                            temperature: float = 0.7, max_tokens: int = 1000, 
@@ -44,7 +50,7 @@ class ClaudeModel(AIModelBase):
         if options:
             params.update(options)
         
-        response = self.client.messages.create(**params)
+        response = await self.client.messages.create(**params)
         
         return response.content[0].text
     
@@ -54,20 +60,7 @@ class ClaudeModel(AIModelBase):
         """
         Generate a chat response using Claude model.
         """
-        # Convert messages to Claude format
-        claude_messages = []
-        system_message = None
-        
-        for message in messages:
-            role = message["role"]
-            content = message["content"]
-            
-            if role == "system":
-                system_message = content
-            elif role == "user":
-                claude_messages.append({"role": "user", "content": content})
-            elif role == "assistant":
-                claude_messages.append({"role": "assistant", "content": content})
+        system_message, claude_messages = self._convert_messages(messages)
         
         params = {
             "model": self.model_name,
@@ -78,14 +71,43 @@ class ClaudeModel(AIModelBase):
         
         if system_message:
             params["system"] = system_message
+            if isinstance(system_message, list):
+                params["extra_headers"] = PROMPT_CACHING_HEADERS
         
         if options:
             params.update(options)
         
-        response = self.client.messages.create(**params)
+        response = await self.client.messages.create(**params)
         
         return response.content[0].text
     
+    async def stream_chat_response(self, messages: List[Dict[str, str]], 
+                                   temperature: float = 0.7, max_tokens: int = 1000,
+                                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat response from Claude model.
+        """
+        system_message, claude_messages = self._convert_messages(messages)
+        
+        params = {
+            "model": self.model_name,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": claude_messages
+        }
+        
+        if system_message:
+            params["system"] = system_message
+            if isinstance(system_message, list):
+                params["extra_headers"] = PROMPT_CACHING_HEADERS
+        
+        if options:
+            params.update(options)
+        
+        async with self.client.messages.stream(**params) as stream:
+            async for text in stream.text_stream:
+                yield text
+    
     async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
                                        options: Optional[Dict[str, Any]] = None) -> float:
         """
@@ -120,7 +142,7 @@ class ClaudeModel(AIModelBase):
         if options:
             params.update(options)
         
-        response = self.client.messages.create(**params)
+        response = await self.client.messages.create(**params)
         
         # Extract the score from the response
         try:
@@ -133,12 +155,44 @@ class ClaudeModel(AIModelBase):
             # Default to middle score if parsing fails
             return 0.5
     
-    def get_model_info(self) -> Dict[str, Any]:
+    def _convert_messages(self, messages: List[Dict[str, Any]]) -> Tuple[Union[str, List[Dict[str, Any]], None], List[Dict[str, str]]]:
         """
-        Get information about the Claude model.
+        Convert messages to Claude format, splitting out the system messages.
+        
+        System messages flagged with 'cache' are sent as text blocks marked
+        with cache_control so Anthropic caches the prompt prefix; otherwise the
+        system messages are joined into a single string.
+        """
+        claude_messages = []
+        system_blocks = []
+        
+        for message in messages:
+            role = message["role"]
+            content = message["content"]
+            
+            if role == "system":
+                block = {"type": "text", "text": content}
+                if message.get("cache"):
+                    block["cache_control"] = {"type": "ephemeral"}
+                system_blocks.append(block)
+            elif role == "user":
+                claude_messages.append({"role": "user", "content": content})
+            elif role == "assistant":
+                claude_messages.append({"role": "assistant", "content": content})
+        
+        if not system_blocks:
+            return None, claude_messages
+        if not any("cache_control" in block for block in system_blocks):
+            return "\n\n".join(block["text"] for block in system_blocks), claude_messages
+        return system_blocks, claude_messages
+    
+    @classmethod
+    def describe(cls, model_name: str) -> Dict[str, Any]:
+        """
+        Get information about a Claude model without creating a client.
         """
         return {
-            "name": self.model_name,
+            "name": model_name,
             "provider": "Anthropic",
             "description": "Anthropic's Claude model for text generation and chat",
             "is_default": False,
@@ -146,3 +200,9 @@ class ClaudeModel(AIModelBase):
             "max_tokens": 100000,  # Claude 3 Opus has a very large context window
             "supports_system_message": True
         }
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """
+        Get information about the Claude model.
+        """
+        return self.describe(self.model_name)
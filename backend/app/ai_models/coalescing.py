@@ -0,0 +1,294 @@
+import asyncio
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from app.ai_models.base import AIModelBase, ModelWrapper
+from app.ai_models.cache import key_fingerprint, make_request_key, normalize_messages, normalize_prompt
+
+T = TypeVar("T")
+
+# Options key callers can set to False to opt out of coalescing for one request.
+# It is removed before the options reach the provider.
+COALESCE_OPTION = "coalesce"
+
+class _StreamCancelled(Exception):
+    """
+    Raised to a subscriber of a stream whose upstream was cancelled.
+    """
+
+class _StreamFanout:
+    """
+    Single upstream stream shared by any number of subscribers.
+    
+    Chunks are buffered so late subscribers replay the response from the
+    start. The upstream is cancelled if every subscriber leaves before it
+    finishes; the partial buffer is then never served as a complete
+    response.
+    """
+    
+    def __init__(self, chunks: AsyncIterator[str], on_done: Callable[["_StreamFanout"], None]):
+        self.buffer: List[str] = []
+        self.done = False
+        self.cancelled = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._on_done = on_done
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._pump(chunks))
+    
+    async def _pump(self, chunks: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in chunks:
+                self.buffer.append(chunk)
+                self._notify()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            self.error = _StreamCancelled()
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._on_done(self)
+            self._notify()
+    
+    def _notify(self) -> None:
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+    
+    async def subscribe(self) -> AsyncIterator[str]:
+        if self.cancelled:
+            raise _StreamCancelled()
+        self.subscribers += 1
+        index = 0
+        try:
+            while True:
+                if index < len(self.buffer):
+                    yield self.buffer[index]
+                    index += 1
+                elif self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                else:
+                    await self._wakeup.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                # Stop sharing the stream before cancelling it, so new
+                # requests start a fresh upstream call
+                self.cancelled = True
+                self._on_done(self)
+                self._task.cancel()
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical requests into one upstream call.
+    
+    The first caller for a key starts the call; callers arriving while it is
+    in flight await the same future (or subscribe to the same stream) instead
+    of issuing their own.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[str, "asyncio.Future[Any]"] = {}
+        self._streams: Dict[str, _StreamFanout] = {}
+        self.calls = 0
+        self.coalesced = 0
+    
+    async def do(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run call, or join the identical call already in flight.
+        
+        Args:
+            key: Request key
+            call: Callable starting the upstream request
+        
+        Returns:
+            The result of the shared call
+        """
+        future = self._calls.get(key)
+        if future is None:
+            self.calls += 1
+            future = asyncio.ensure_future(call())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._forget(self._calls, key, done))
+        else:
+            self.coalesced += 1
+        
+        # Shield the shared call so one caller going away does not cancel it
+        # for everyone else
+        return await asyncio.shield(future)
+    
+    def stream(self, key: str, open_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Subscribe to a stream, or to the identical stream already in flight.
+        
+        Args:
+            key: Request key
+            open_stream: Callable opening the upstream stream
+        
+        Returns:
+            An async iterator over the shared stream's chunks
+        """
+        return self._subscribe(key, open_stream)
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get counters for upstream and coalesced requests.
+        """
+        return {
+            "in_flight": len(self._calls) + len(self._streams),
+            "calls": self.calls,
+            "coalesced": self.coalesced
+        }
+    
+    async def _subscribe(self, key: str, open_stream: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        # The stream is looked up when iteration starts, and a subscriber
+        # that finds its stream cancelled joins or starts a new one
+        received = False
+        while True:
+            fanout = self._streams.get(key)
+            if fanout is None or fanout.cancelled:
+                self.calls += 1
+                fanout = _StreamFanout(open_stream(), lambda done: self._forget(self._streams, key, done))
+                self._streams[key] = fanout
+            else:
+                self.coalesced += 1
+            
+            try:
+                # Close the subscription as soon as this subscriber stops,
+                # not when it is garbage collected
+                async with aclosing(fanout.subscribe()) as subscription:
+                    async for chunk in subscription:
+                        received = True
+                        yield chunk
+                return
+            except _StreamCancelled:
+                if received:
+                    # Starting over would repeat the chunks already sent
+                    raise RuntimeError("The shared upstream stream was cancelled")
+                continue
+    
+    @staticmethod
+    def _forget(registry: Dict[str, Any], key: str, value: Any) -> None:
+        if registry.get(key) is value:
+            del registry[key]
+
+class CoalescingModel(ModelWrapper):
+    """
+    AIModelBase wrapper that shares one upstream call between concurrent
+    identical requests.
+    
+    Request keys include a fingerprint of the API key, so calls made with
+    different credentials are never merged.
+    """
+    
+    def __init__(self, model: AIModelBase, provider: str, single_flight: SingleFlight,
+                 api_key: Optional[str] = None):
+        """
+        Initialize the coalescing model.
+        
+        Args:
+            model: The model to wrap
+            provider: Provider name used in request keys
+            single_flight: The coalescing group to use
+            api_key: API key the wrapped model calls with; only its hash is kept
+        """
+        self.model = model
+        self.provider = provider
+        self.single_flight = single_flight
+        self.key_fingerprint = key_fingerprint(api_key)
+    
+    async def generate_text(self, prompt: str, system_message: Optional[str] = None,
+                           temperature: float = 0.7, max_tokens: int = 1000,
+                           options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate text, sharing identical in-flight requests.
+        """
+        coalesce, options = self._check_opt_out(options)
+        call = lambda: self.model.generate_text(prompt, system_message=system_message,
+                                                temperature=temperature, max_tokens=max_tokens,
+                                                options=options)
+        if not coalesce:
+            return await call()
+        
+        key = self._key("generate_text", normalize_prompt(prompt, system_message),
+                        temperature, max_tokens, options)
+        return await self.single_flight.do(key, call)
+    
+    async def generate_chat_response(self, messages: List[Dict[str, str]],
+                                    temperature: float = 0.7, max_tokens: int = 1000,
+                                    options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate a chat response, sharing identical in-flight requests.
+        """
+        coalesce, options = self._check_opt_out(options)
+        call = lambda: self.model.generate_chat_response(messages, temperature=temperature,
+                                                         max_tokens=max_tokens, options=options)
+        if not coalesce:
+            return await call()
+        
+        key = self._key("chat", normalize_messages(messages), temperature, max_tokens, options)
+        return await self.single_flight.do(key, call)
+    
+    async def stream_chat_response(self, messages: List[Dict[str, str]],
+                                   temperature: float = 0.7, max_tokens: int = 1000,
+                                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat response, fanning identical in-flight streams out to
+        every subscriber.
+        """
+        coalesce, options = self._check_opt_out(options)
+        open_stream = lambda: self.model.stream_chat_response(messages, temperature=temperature,
+                                                              max_tokens=max_tokens, options=options)
+        if not coalesce:
+            chunks = open_stream()
+        else:
+            key = self._key("stream", normalize_messages(messages), temperature, max_tokens, options)
+            chunks = self.single_flight.stream(key, open_stream)
+        
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                yield chunk
+    
+    async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
+                                       options: Optional[Dict[str, Any]] = None) -> float:
+        """
+        Score a conflict resolution, sharing identical in-flight requests.
+        """
+        coalesce, options = self._check_opt_out(options)
+        call = lambda: self.model.score_conflict_resolution(conflict_text, resolution_text,
+                                                            options=options)
+        if not coalesce:
+            return await call()
+        
+        key = self._key("score", [conflict_text.strip(), resolution_text.strip()], None, None, options)
+        return await self.single_flight.do(key, call)
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """
+        Get information about the wrapped model.
+        """
+        return self.model.get_model_info()
+    
+    def _check_opt_out(self, options: Optional[Dict[str, Any]]) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        if options and COALESCE_OPTION in options:
+            options = dict(options)
+            return bool(options.pop(COALESCE_OPTION)), options
+        return True, options
+    
+    def _key(self, operation: str, payload: Any, temperature: Optional[float],
+             max_tokens: Optional[int], options: Optional[Dict[str, Any]]) -> str:
+        return make_request_key(
+            provider=self.provider,
+            api_key=self.key_fingerprint,
+            model=self.model.get_model_info()["name"],
+            operation=operation,
+            payload=payload,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            options=options or {}
+        )
+
+single_flight = SingleFlight()
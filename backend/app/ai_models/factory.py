@@ -1,5 +1,5 @@
 import os
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Type
 from app.ai_models.base import AIModelBase
 from app.ai_models.gemini_model import GeminiModel
 from app.ai_models.openai_model import OpenAIModel
@@ -10,14 +10,79 @@ from app.ai_models.grok_model import GrokModel
 from app.ai_models.huggingface_model import HuggingfaceModel
 from app.ai_models.openrouter_model import OpenrouterModel
 from app.ai_models.perplexity_model import PerplexityModel
+from app.ai_models.registry import model_registry
+from app.ai_models.cache import CachedModel, response_cache
+from app.ai_models.coalescing import CoalescingModel, single_flight
+from app.ai_models.rate_limit import RateLimitedModel, rate_limiters
+from app.ai_models.failover import FailoverModel
+from app.ai_models.options import ProviderOptionsModel
+from app.config import settings
+
+# Supported providers and their model classes
+MODEL_CLASSES: Dict[str, Type[AIModelBase]] = {
+    "gemini": GeminiModel,
+    "openai": OpenAIModel,
+    "claude": ClaudeModel,
+    "mistral": MistralAIModel,
+    "deepseek": DeepSeekModel,
+    "grok": GrokModel,
+    "huggingface": HuggingfaceModel,
+    "openrouter": OpenrouterModel,
+    "perplexity": PerplexityModel,
+}
+
+# Default model name for each provider
+DEFAULT_MODEL_NAMES: Dict[str, str] = {
+    "gemini": "gemini-flash-2.0",
+    "openai": "gpt-4o",
+    "claude": "claude-3-opus-20240229",
+    "mistral": "mistral-large-latest",
+    "deepseek": "deepseek-chat",
+    "grok": "grok-1",
+    "huggingface": "meta-llama/Llama-3-70b-chat",
+    "openrouter": "openai/gpt-4o",
+    "perplexity": "sonar-medium-online",
+}
+
+# Alternative provider names
+PROVIDER_ALIASES: Dict[str, str] = {
+    "mistralai": "mistral",
+}
 
 class AIModelFactory:
     """
     Factory class for creating AI model instances.
+    
+    Instances are pooled in a process-wide registry keyed by
+    (provider, api_key, model_name), so repeated calls reuse the same client
+    and its keep-alive connections.
     """
     
     @staticmethod
-    def get_model(provider: str, api_key: Optional[str] = None, model_name: Optional[str] = None) -> AIModelBase:
+    def resolve_provider(provider: str) -> str:
+        """
+        Normalize a provider name.
+        
+        Args:
+            provider: The AI model provider (gemini, openai, claude, etc.)
+        
+        Returns:
+            The canonical provider name
+        
+        Raises:
+            ValueError: If the provider is not supported
+        """
+        provider = provider.lower()
+        provider = PROVIDER_ALIASES.get(provider, provider)
+        
+        if provider not in MODEL_CLASSES:
+            raise ValueError(f"Unsupported AI model provider: {provider}")
+        
+        return provider
+    
+    @staticmethod
+    def get_model(provider: str, api_key: Optional[str] = None, model_name: Optional[str] = None,
+                  cached: bool = True) -> AIModelBase:
         """
         Get an AI model instance based on the provider.
         
@@ -25,35 +90,98 @@ class AIModelFactory:
             provider: The AI model provider (gemini, openai, claude, etc.)
             api_key: Optional API key for the provider
             model_name: Optional model name to use
-            
+            cached: Whether to serve repeated low-temperature requests from the
+                    response cache (when LLM_CACHE_ENABLED is set)
+        
         Returns:
-            An instance of the requested AI model
-            
+            A pooled instance of the requested AI model. Calls are queued
+            through the provider's rate limiter when LLM_RATE_LIMIT_ENABLED is
+            set, and concurrent identical requests share one upstream call when
+            LLM_COALESCING_ENABLED is set.
+        
         Raises:
             ValueError: If the provider is not supported
         """
-        provider = provider.lower()
+        provider = AIModelFactory.resolve_provider(provider)
+        model_class = MODEL_CLASSES[provider]
+        model_name = model_name or DEFAULT_MODEL_NAMES[provider]
         
-        if provider == "gemini":
-            return GeminiModel(api_key=api_key, model_name=model_name or "gemini-flash-2.0")
-        elif provider == "openai":
-            return OpenAIModel(api_key=api_key, model_name=model_name or "gpt-4o")
-        elif provider == "claude":
-            return ClaudeModel(api_key=api_key, model_name=model_name or "claude-3-opus-20240229")
-        elif provider == "mistral" or provider == "mistralai":
-            return MistralAIModel(api_key=api_key, model_name=model_name or "mistral-large-latest")
-        elif provider == "deepseek":
-            return DeepSeekModel(api_key=api_key, model_name=model_name or "deepseek-chat")
-        elif provider == "grok":
-            return GrokModel(api_key=api_key, model_name=model_name or "grok-1")
-        elif provider == "huggingface":
-            return HuggingfaceModel(api_key=api_key, model_name=model_name or "meta-llama/Llama-3-70b-chat")
-        elif provider == "openrouter":
-            return OpenrouterModel(api_key=api_key, model_name=model_name or "openai/gpt-4o")
-        elif provider == "perplexity":
-            return PerplexityModel(api_key=api_key, model_name=model_name or "sonar-medium-online")
-        else:
-            raise ValueError(f"Unsupported AI model provider: {provider}")
+        model = model_registry.get_or_create(
+            (provider, api_key, model_name),
+            lambda: model_class(api_key=api_key, model_name=model_name)
+        )
+        provider_api_key = model.api_key
+        
+        # Wrapper-only options never reach the provider, even when the
+        # wrapper they are meant for is disabled
+        model = ProviderOptionsModel(model)
+        
+        if settings.LLM_RATE_LIMIT_ENABLED:
+            model = RateLimitedModel(model, rate_limiters.get(provider, provider_api_key))
+        
+        if settings.LLM_COALESCING_ENABLED:
+            model = CoalescingModel(model, provider, single_flight, api_key=provider_api_key)
+        
+        if cached and settings.LLM_CACHE_ENABLED:
+            model = CachedModel(
+                model,
+                provider,
+                response_cache,
+                api_key=provider_api_key,
+                max_temperature=settings.LLM_CACHE_MAX_TEMPERATURE
+            )
+        
+        return model
+    
+    @staticmethod
+    def get_failover_model(provider: str, model_name: Optional[str] = None,
+                           fallback_providers: Optional[List[str]] = None) -> AIModelBase:
+        """
+        Get a model that falls back to alternative providers if one is unavailable.
+        
+        Args:
+            provider: The preferred AI model provider
+            model_name: Optional model name for the preferred provider
+            fallback_providers: Providers to fall back to, in order (defaults to
+                                LLM_FALLBACK_PROVIDERS); those without an API key
+                                configured are skipped
+        
+        Returns:
+            A FailoverModel over the available providers, or the preferred
+            model itself if no fallback is available
+        
+        Raises:
+            ValueError: If no provider is available
+        """
+        if fallback_providers is None:
+            fallback_providers = [p.strip() for p in settings.LLM_FALLBACK_PROVIDERS.split(",") if p.strip()]
+        
+        models = []
+        seen = set()
+        for index, name in enumerate([provider] + fallback_providers):
+            try:
+                name = AIModelFactory.resolve_provider(name)
+                if name in seen:
+                    continue
+                seen.add(name)
+                model = AIModelFactory.get_model(name, model_name=model_name if index == 0 else None)
+            except ValueError:
+                if index == 0:
+                    raise
+                continue
+            models.append((f"{name}:{model.get_model_info()['name']}", model))
+        
+        if len(models) == 1:
+            return models[0][1]
+        
+        return FailoverModel(
+            models,
+            timeout=settings.LLM_PROVIDER_TIMEOUT_SECONDS,
+            hedge=settings.LLM_HEDGE_ENABLED,
+            hedge_min_delay=settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+            failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=settings.LLM_CIRCUIT_RESET_SECONDS
+        )
     
     @staticmethod
     def get_default_model() -> AIModelBase:
@@ -63,62 +191,40 @@ class AIModelFactory:
         Returns:
             An instance of the default AI model
         """
-        return GeminiModel()
+        return AIModelFactory.get_model("gemini")
+    
+    @staticmethod
+    def get_model_info(provider: str, model_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get information about a model without creating a client.
+        
+        Args:
+            provider: The AI model provider (gemini, openai, claude, etc.)
+            model_name: Optional model name (defaults to the provider's default)
+        
+        Returns:
+            Dictionary containing model information
+        
+        Raises:
+            ValueError: If the provider is not supported
+        """
+        provider = AIModelFactory.resolve_provider(provider)
+        return MODEL_CLASSES[provider].describe(model_name or DEFAULT_MODEL_NAMES[provider])
     
     @staticmethod
     def list_available_models() -> List[Dict[str, Any]]:
         """
         List all available AI models with their information.
         
+        Only providers with an API key configured in the environment are listed.
+        
         Returns:
             A list of dictionaries containing model information
         """
         models = []
         
-        # Create temporary instances to get model info
-        try:
-            models.append(GeminiModel().get_model_info())
-        except:
-            pass
-            
-        try:
-            models.append(OpenAIModel().get_model_info())
-        except:
-            pass
-            
-        try:
-            models.append(ClaudeModel().get_model_info())
-        except:
-            pass
-            
-        try:
-            models.append(MistralAIModel().get_model_info())
-        except:
-            pass
-            
-        try:
-            models.append(DeepSeekModel().get_model_info())
-        except:
-            pass
-            
-        try:
-            models.append(GrokModel().get_model_info())
-        except:
-            pass
-            
-        try:
-            models.append(HuggingfaceModel().get_model_info())
-        except:
-            pass
-            
-        try:
-            models.append(OpenrouterModel().get_model_info())
-        except:
-            pass
-            
-        try:
-            models.append(PerplexityModel().get_model_info())
-        except:
-            pass
+        for provider, model_class in MODEL_CLASSES.items():
+            if os.getenv(model_class.API_KEY_ENV):
+                models.append(model_class.describe(DEFAULT_MODEL_NAMES[provider]))
         
         return models
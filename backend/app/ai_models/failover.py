@@ -0,0 +1,341 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from app.ai_models.base import AIModelBase, ModelWrapper
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class ProviderUnavailableError(RuntimeError):
+    """
+    Raised when every provider of a FailoverModel failed or was skipped.
+    """
+    
+    def __init__(self, errors: List[Tuple[str, Exception]]):
+        self.errors = errors
+        details = "; ".join(f"{name}: {error!r}" for name, error in errors) or "all circuits open"
+        super().__init__(f"No AI model provider could handle the request ({details})")
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised for a provider skipped because its circuit is open.
+    """
+    
+    def __init__(self, name: str):
+        super().__init__(f"Circuit open for {name}")
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+    
+    After failure_threshold consecutive failures the circuit opens and the
+    provider is skipped for reset_timeout seconds. It then lets exactly one
+    probe request through (half-open) while every other request keeps being
+    skipped: a successful probe closes the circuit, a failed one re-opens it
+    for another reset_timeout. A probe that never reports back is given up
+    after reset_timeout so the circuit cannot stay stuck.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started_at: Optional[float] = None
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+    
+    @property
+    def probing(self) -> bool:
+        return (self.probe_started_at is not None
+                and time.monotonic() - self.probe_started_at < self.reset_timeout)
+    
+    def available(self) -> bool:
+        """
+        Check whether a request would be let through, without claiming the probe.
+        """
+        state = self.state
+        return state == self.CLOSED or (state == self.HALF_OPEN and not self.probing)
+    
+    def allow_request(self) -> bool:
+        """
+        Check whether a request may be sent, claiming the probe when half-open.
+        """
+        if not self.available():
+            return False
+        if self.state == self.HALF_OPEN:
+            self.probe_started_at = time.monotonic()
+        return True
+    
+    def release_probe(self) -> None:
+        """
+        Give up the probe without a result, e.g. when it was cancelled.
+        """
+        self.probe_started_at = None
+    
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+    
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+        self.probe_started_at = None
+
+class LatencyTracker:
+    """
+    Rolling window of successful call latencies.
+    """
+    
+    def __init__(self, window: int = 200):
+        self.samples: Deque[float] = deque(maxlen=window)
+    
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+    
+    def percentile(self, percentile: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+
+class ProviderHealth:
+    """
+    Circuit breaker and latency statistics for one provider/model.
+    """
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latency = LatencyTracker()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "p50_seconds": self.latency.percentile(50),
+            "p95_seconds": self.latency.percentile(95)
+        }
+
+# Health is tracked per provider/model for the whole process, so breaker
+# state survives across requests
+provider_health: Dict[str, ProviderHealth] = {}
+
+def get_provider_health(name: str, failure_threshold: int = 5,
+                        reset_timeout: float = 30.0) -> ProviderHealth:
+    """
+    Get the shared health record for a provider, creating it on first use.
+    """
+    health = provider_health.get(name)
+    if health is None:
+        health = ProviderHealth(failure_threshold, reset_timeout)
+        provider_health[name] = health
+    return health
+
+class FailoverModel(ModelWrapper):
+    """
+    AIModelBase that routes each request over an ordered list of providers.
+    
+    Providers are tried in order, moving on when one errors or exceeds the
+    timeout; providers whose circuit is open, or half-open with a probe
+    already in flight, are skipped, and a request fails fast with
+    ProviderUnavailableError when every provider is skipped. With hedging
+    enabled, the next provider is also started once the current one has
+    taken longer than its p95 latency, and the first successful response wins.
+    Streams fail over only until their first chunk has been received.
+    """
+    
+    def __init__(self, models: List[Tuple[str, AIModelBase]], timeout: float = 60.0,
+                 hedge: bool = False, hedge_min_delay: float = 1.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize the failover model.
+        
+        Args:
+            models: Ordered (name, model) pairs; the name keys shared health state
+            timeout: Seconds before a provider call is abandoned
+            hedge: Whether to send hedged requests to the next provider
+            hedge_min_delay: Lower bound (and default) for the hedge delay in seconds
+            failure_threshold: Consecutive failures that open a provider's circuit
+            reset_timeout: Seconds a circuit stays open before requests are retried
+        """
+        if not models:
+            raise ValueError("FailoverModel needs at least one model")
+        
+        self.models = models
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.health = {
+            name: get_provider_health(name, failure_threshold, reset_timeout)
+            for name, _ in models
+        }
+    
+    async def generate_text(self, prompt: str, system_message: Optional[str] = None,
+                           temperature: float = 0.7, max_tokens: int = 1000,
+                           options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate text with the first provider able to answer.
+        """
+        return await self._route(lambda model: model.generate_text(
+            prompt, system_message=system_message, temperature=temperature,
+            max_tokens=max_tokens, options=options
+        ))
+    
+    async def generate_chat_response(self, messages: List[Dict[str, str]],
+                                    temperature: float = 0.7, max_tokens: int = 1000,
+                                    options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate a chat response with the first provider able to answer.
+        """
+        return await self._route(lambda model: model.generate_chat_response(
+            messages, temperature=temperature, max_tokens=max_tokens, options=options
+        ))
+    
+    async def stream_chat_response(self, messages: List[Dict[str, str]],
+                                   temperature: float = 0.7, max_tokens: int = 1000,
+                                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat response, failing over until the first chunk arrives.
+        """
+        errors: List[Tuple[str, Exception]] = []
+        
+        for name, model in self._candidates():
+            health = self.health[name]
+            probe = health.breaker.state == CircuitBreaker.HALF_OPEN
+            if not health.breaker.allow_request():
+                errors.append((name, CircuitOpenError(name)))
+                continue
+            
+            started = time.monotonic()
+            chunks = model.stream_chat_response(messages, temperature=temperature,
+                                                max_tokens=max_tokens, options=options)
+            try:
+                try:
+                    first = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                except StopAsyncIteration:
+                    health.breaker.record_success()
+                    return
+                except Exception as e:
+                    logger.warning(f"AI provider {name} failed to stream, failing over: {e!r}")
+                    health.breaker.record_failure()
+                    errors.append((name, e))
+                    await chunks.aclose()
+                    continue
+                
+                health.latency.record(time.monotonic() - started)
+                yield first
+                try:
+                    async for chunk in chunks:
+                        yield chunk
+                except Exception:
+                    health.breaker.record_failure()
+                    raise
+                health.breaker.record_success()
+                return
+            finally:
+                # A probe abandoned by the caller frees the circuit for the next one
+                if probe:
+                    health.breaker.release_probe()
+        
+        raise ProviderUnavailableError(errors)
+    
+    async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
+                                       options: Optional[Dict[str, Any]] = None) -> float:
+        """
+        Score a conflict resolution with the first provider able to answer.
+        """
+        return await self._route(lambda model: model.score_conflict_resolution(
+            conflict_text, resolution_text, options=options
+        ))
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """
+        Get information about the primary model.
+        """
+        return self.models[0][1].get_model_info()
+    
+    def _candidates(self) -> List[Tuple[str, AIModelBase]]:
+        return [
+            (name, model) for name, model in self.models
+            if self.health[name].breaker.available()
+        ]
+    
+    async def _attempt(self, name: str, model: AIModelBase,
+                       invoke: Callable[[AIModelBase], Awaitable[T]]) -> T:
+        health = self.health[name]
+        # The probe is claimed only when the provider is actually called, so
+        # candidates never tried do not hold it
+        probe = health.breaker.state == CircuitBreaker.HALF_OPEN
+        if not health.breaker.allow_request():
+            raise CircuitOpenError(name)
+        
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(invoke(model), self.timeout)
+        except asyncio.CancelledError:
+            if probe:
+                health.breaker.release_probe()
+            raise
+        except Exception as e:
+            logger.warning(f"AI provider {name} failed, failing over: {e!r}")
+            health.breaker.record_failure()
+            raise
+        health.latency.record(time.monotonic() - started)
+        health.breaker.record_success()
+        return result
+    
+    async def _route(self, invoke: Callable[[AIModelBase], Awaitable[T]]) -> T:
+        candidates = self._candidates()
+        errors: List[Tuple[str, Exception]] = []
+        
+        if not self.hedge:
+            for name, model in candidates:
+                try:
+                    return await self._attempt(name, model, invoke)
+                except Exception as e:
+                    errors.append((name, e))
+            raise ProviderUnavailableError(errors)
+        
+        pending: Dict["asyncio.Task[T]", str] = {}
+        try:
+            while candidates or pending:
+                delay = None
+                if candidates:
+                    name, model = candidates.pop(0)
+                    pending[asyncio.ensure_future(self._attempt(name, model, invoke))] = name
+                    if candidates:
+                        delay = self._hedge_delay(name)
+                
+                done, _ = await asyncio.wait(pending, timeout=delay,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append((name, task.exception()))
+            
+            raise ProviderUnavailableError(errors)
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def _hedge_delay(self, name: str) -> float:
+        p95 = self.health[name].latency.percentile(95)
+        return max(self.hedge_min_delay, p95 or 0.0)
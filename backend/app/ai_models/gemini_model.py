@@ -1,7 +1,8 @@
 import os
-import json
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
+import google.ai.generativelanguage as glm
 import google.generativeai as genai
+from google.api_core import gapic_v1
 from app.ai_models.base import AIModelBase
 
 class GeminiModel(AIModelBase):
@@ -10,6 +11,8 @@ class GeminiModel(AIModelBase):
     This is the default model for DeGeNz Lounge.
     """
     
+    API_KEY_ENV = "GEMINI_API_KEY"
+    
     def __init__(self, api_key: Optional[str] = None, model_name: str = "gemini-flash-2.0"):
         """
         Initialize the Gemini model.
@@ -18,13 +21,48 @@ class GeminiModel(AIModelBase):
             api_key: Gemini API key (defaults to environment variable)
             model_name: Gemini model name to use
         """
-        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.api_key = api_key or os.getenv(self.API_KEY_ENV)
         if not self.api_key:
             raise ValueError("Gemini API key is required")
         
         self.model_name = model_name
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel(self.model_name)
+        self._client: Optional[glm.GenerativeServiceAsyncClient] = None
+        self._model: Optional[genai.GenerativeModel] = None
+    
+    @property
+    def client(self) -> glm.GenerativeServiceAsyncClient:
+        """
+        The instance's own API client, created on first use.
+        
+        genai.configure would set the key for the whole process, so every
+        instance would call with whichever key was configured last. The
+        gRPC channel is created lazily so it belongs to the running loop.
+        """
+        if self._client is None:
+            self._client = glm.GenerativeServiceAsyncClient(
+                client_options={"api_key": self.api_key},
+                client_info=gapic_v1.client_info.ClientInfo(user_agent=f"genai-py/{genai.__version__}")
+            )
+        return self._client
+    
+    @property
+    def model(self) -> genai.GenerativeModel:
+        """
+        The GenerativeModel used for calls without a system instruction.
+        """
+        if self._model is None:
+            self._model = self._new_model()
+        return self._model
+    
+    def _new_model(self, system_instruction: Optional[str] = None) -> genai.GenerativeModel:
+        """
+        Create a GenerativeModel that calls through this instance's client.
+        
+        Building a GenerativeModel is local; no request is made here.
+        """
+        model = genai.GenerativeModel(self.model_name, system_instruction=system_instruction)
+        model._async_client = self.client
+        return model
     
     async def generate_text(self, prompt: str, system_message: Optional[str] = None, 
                            temperature: float = 0.7, max_tokens: int = 1000, 
@@ -47,7 +85,7 @@ class GeminiModel(AIModelBase):
         if system_message:
             full_prompt = f"{system_message}\n\n{prompt}"
         
-        response = self.model.generate_content(
+        response = await self.model.generate_content_async(
             full_prompt,
             generation_config=generation_config
         )
@@ -70,29 +108,80 @@ class GeminiModel(AIModelBase):
         if options:
             generation_config.update(options)
         
-        # Convert messages to Gemini chat format
-        chat = self.model.start_chat(history=[])
+        model, contents = self._build_request(messages)
+        
+        # Send the whole conversation in a single request
+        response = await model.generate_content_async(
+            contents,
+            generation_config=generation_config
+        )
+        
+        return response.text
+    
+    async def stream_chat_response(self, messages: List[Dict[str, str]], 
+                                   temperature: float = 0.7, max_tokens: int = 1000,
+                                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat response from Gemini model.
+        """
+        generation_config = {
+            "temperature": temperature,
+            "max_output_tokens": max_tokens,
+            "top_p": 0.95,
+            "top_k": 40,
+        }
+        
+        if options:
+            generation_config.update(options)
+        
+        model, contents = self._build_request(messages)
+        
+        response = await model.generate_content_async(
+            contents,
+            generation_config=generation_config,
+            stream=True
+        )
+        
+        async for chunk in response:
+            if chunk.parts:
+                yield chunk.text
+    
+    def _build_request(self, messages: List[Dict[str, str]]) -> Tuple[Any, List[Dict[str, Any]]]:
+        """
+        Convert messages to Gemini's native contents structure.
+        
+        System messages become the model's system instruction, and consecutive
+        messages with the same role are merged since Gemini expects user and
+        model turns to alternate.
+        
+        Returns:
+            The model to call and the contents to send
+        """
+        system_parts = []
+        contents: List[Dict[str, Any]] = []
         
-        # Add messages to chat
         for message in messages:
             role = message["role"]
             content = message["content"]
             
-            if role == "system" and len(messages) > 1:
-                # For system messages, we'll add them as user messages with a special prefix
-                chat.send_message(f"[System Instruction] {content}")
-            elif role == "user":
-                chat.send_message(content, role="user")
-            elif role == "assistant":
-                chat.send_message(content, role="model")
-        
-        # Generate response
-        response = chat.send_message(
-            messages[-1]["content"] if messages[-1]["role"] == "user" else "Please continue the conversation.",
-            generation_config=generation_config
-        )
+            if role == "system":
+                system_parts.append(content)
+                continue
+            
+            gemini_role = "model" if role == "assistant" else "user"
+            if contents and contents[-1]["role"] == gemini_role:
+                contents[-1]["parts"].append(content)
+            else:
+                contents.append({"role": gemini_role, "parts": [content]})
         
-        return response.text
+        if not contents or contents[-1]["role"] != "user":
+            contents.append({"role": "user", "parts": ["Please continue the conversation."]})
+        
+        model = self.model
+        if system_parts:
+            model = self._new_model("\n\n".join(system_parts))
+        
+        return model, contents
     
     async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
                                        options: Optional[Dict[str, Any]] = None) -> float:
@@ -125,7 +214,7 @@ class GeminiModel(AIModelBase):
         if options:
             generation_config.update(options)
         
-        response = self.model.generate_content(
+        response = await self.model.generate_content_async(
             prompt,
             generation_config=generation_config
         )
@@ -141,12 +230,13 @@ class GeminiModel(AIModelBase):
             # Default to middle score if parsing fails
             return 0.5
     
-    def get_model_info(self) -> Dict[str, Any]:
+    @classmethod
+    def describe(cls, model_name: str) -> Dict[str, Any]:
         """
-        Get information about the Gemini model.
+        Get information about a Gemini model without creating a client.
         """
         return {
-            "name": self.model_name,
+            "name": model_name,
             "provider": "Google",
             "description": "Google's Gemini model for text generation and chat",
             "is_default": True,
@@ -154,3 +244,9 @@ class GeminiModel(AIModelBase):
             "max_tokens": 8192,
             "supports_system_message": True
         }
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """
+        Get information about the Gemini model.
+        """
+        return self.describe(self.model_name)
@@ -1,6 +1,6 @@
 import os
-from typing import Dict, List, Optional, Any
-import requests
+from typing import AsyncIterator, Dict, List, Optional, Any
+from app.ai_models.http_client import get_http_client, iter_sse_events
 from app.ai_models.base import AIModelBase
 
 class GrokModel(AIModelBase):
@@ -8,6 +8,8 @@ class GrokModel(AIModelBase):
     Implementation of the Grok model integration.
     """
     
+    API_KEY_ENV = "GROK_API_KEY"
+    
     def __init__(self, api_key: Optional[str] = None, model_name: str = "grok-1"):
         """
         Initialize the Grok model.
@@ -16,7 +18,7 @@ class GrokModel(AIModelBase):
             api_key: Grok API key (defaults to environment variable)
             model_name: Grok model name to use
         """
-        self.api_key = api_key or os.getenv("GROK_API_KEY")
+        self.api_key = api_key or os.getenv(self.API_KEY_ENV)
         if not self.api_key:
             raise ValueError("Grok API key is required")
         
@@ -50,7 +52,7 @@ class GrokModel(AIModelBase):
         if options:
             payload.update(options)
         
-        response = requests.post(self.api_url, headers=self.headers, json=payload)
+        response = await get_http_client().post(self.api_url, headers=self.headers, json=payload)
         response.raise_for_status()
         
         return response.json()["choices"][0]["message"]["content"]
@@ -80,11 +82,40 @@ class GrokModel(AIModelBase):
         if options:
             payload.update(options)
         
-        response = requests.post(self.api_url, headers=self.headers, json=payload)
+        response = await get_http_client().post(self.api_url, headers=self.headers, json=payload)
         response.raise_for_status()
         
         return response.json()["choices"][0]["message"]["content"]
     
+    async def stream_chat_response(self, messages: List[Dict[str, str]], 
+                                   temperature: float = 0.7, max_tokens: int = 1000,
+                                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat response from Grok model.
+        """
+        grok_messages = [
+            {"role": message["role"], "content": message["content"]}
+            for message in messages
+        ]
+        
+        payload = {
+            "model": self.model_name,
+            "messages": grok_messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        
+        if options:
+            payload.update(options)
+        
+        async for event in iter_sse_events(self.api_url, self.headers, payload):
+            choices = event.get("choices") or []
+            if choices:
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+    
     async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
                                        options: Optional[Dict[str, Any]] = None) -> float:
         """
@@ -119,7 +150,7 @@ class GrokModel(AIModelBase):
         if options:
             payload.update(options)
         
-        response = requests.post(self.api_url, headers=self.headers, json=payload)
+        response = await get_http_client().post(self.api_url, headers=self.headers, json=payload)
         response.raise_for_status()
         
         # Extract the score from the response
@@ -133,12 +164,13 @@ class GrokModel(AIModelBase):
             # Default to middle score if parsing fails
             return 0.5
     
-    def get_model_info(self) -> Dict[str, Any]:
+    @classmethod
+    def describe(cls, model_name: str) -> Dict[str, Any]:
         """
-        Get information about the Grok model.
+        Get information about a Grok model without creating a client.
         """
         return {
-            "name": self.model_name,
+            "name": model_name,
             "provider": "xAI",
             "description": "xAI's Grok model for text generation and chat",
             "is_default": False,
@@ -146,3 +178,9 @@ class GrokModel(AIModelBase):
             "max_tokens": 8192,
             "supports_system_message": True
         }
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """
+        Get information about the Grok model.
+        """
+        return self.describe(self.model_name)
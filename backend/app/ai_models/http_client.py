@@ -0,0 +1,56 @@
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+import httpx
+
+# Shared async HTTP client used by the REST based model providers.
+# Reusing one client keeps TLS connections alive between calls instead of
+# opening a new connection for every request.
+_client: Optional[httpx.AsyncClient] = None
+
+DEFAULT_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=500, max_keepalive_connections=100)
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide async HTTP client, creating it on first use.
+
+    Returns:
+        A shared httpx.AsyncClient instance
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=DEFAULT_TIMEOUT, limits=DEFAULT_LIMITS)
+    return _client
+
+async def close_http_client() -> None:
+    """
+    Close the shared async HTTP client and release its connections.
+    """
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+async def iter_sse_events(url: str, headers: Dict[str, str],
+                          payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    POST a streaming request and yield the decoded server-sent events.
+    
+    Args:
+        url: Endpoint to post to
+        headers: Request headers
+        payload: JSON request body (should enable streaming for the provider)
+        
+    Yields:
+        The JSON payload of each "data:" event until the stream ends
+    """
+    async with get_http_client().stream("POST", url, headers=headers, json=payload) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            if data:
+                yield json.loads(data)
@@ -1,6 +1,6 @@
 import os
-from typing import Dict, List, Optional, Any
-import requests
+from typing import AsyncIterator, Dict, List, Optional, Any
+from app.ai_models.http_client import get_http_client, iter_sse_events
 from app.ai_models.base import AIModelBase
 
 class HuggingfaceModel(AIModelBase):
@@ -8,6 +8,8 @@ class HuggingfaceModel(AIModelBase):
     Implementation of the Huggingface model integration.
     """
     
+    API_KEY_ENV = "HUGGINGFACE_API_KEY"
+    
     def __init__(self, api_key: Optional[str] = None, model_name: str = "meta-llama/Llama-3-70b-chat"):
         """
         Initialize the Huggingface model.
@@ -16,7 +18,7 @@ class HuggingfaceModel(AIModelBase):
             api_key: Huggingface API key (defaults to environment variable)
             model_name: Huggingface model name to use
         """
-        self.api_key = api_key or os.getenv("HUGGINGFACE_API_KEY")
+        self.api_key = api_key or os.getenv(self.API_KEY_ENV)
         if not self.api_key:
             raise ValueError("Huggingface API key is required")
         
@@ -49,7 +51,7 @@ class HuggingfaceModel(AIModelBase):
         if options and "parameters" in options:
             payload["parameters"].update(options["parameters"])
         
-        response = requests.post(self.api_url, headers=self.headers, json=payload)
+        response = await get_http_client().post(self.api_url, headers=self.headers, json=payload)
         response.raise_for_status()
         
         # Handle different response formats from Huggingface
@@ -70,27 +72,7 @@ class HuggingfaceModel(AIModelBase):
         """
         Generate a chat response using Huggingface model.
         """
-        # Convert messages to a format suitable for Huggingface
-        conversation = ""
-        system_message = None
-        
-        for message in messages:
-            role = message["role"]
-            content = message["content"]
-            
-            if role == "system":
-                system_message = content
-            elif role == "user":
-                conversation += f"User: {content}\n"
-            elif role == "assistant":
-                conversation += f"Assistant: {content}\n"
-        
-        # Add system message at the beginning if present
-        if system_message:
-            conversation = f"System: {system_message}\n{conversation}"
-            
-        # Add final prompt for assistant response
-        conversation += "Assistant: "
+        conversation = self._format_conversation(messages)
         
         payload = {
             "inputs": conversation,
@@ -104,7 +86,7 @@ class HuggingfaceModel(AIModelBase):
         if options and "parameters" in options:
             payload["parameters"].update(options["parameters"])
         
-        response = requests.post(self.api_url, headers=self.headers, json=payload)
+        response = await get_http_client().post(self.api_url, headers=self.headers, json=payload)
         response.raise_for_status()
         
         # Handle different response formats from Huggingface
@@ -119,6 +101,30 @@ class HuggingfaceModel(AIModelBase):
         else:
             return str(result)
     
+    async def stream_chat_response(self, messages: List[Dict[str, str]], 
+                                   temperature: float = 0.7, max_tokens: int = 1000,
+                                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat response from Huggingface model.
+        """
+        payload = {
+            "inputs": self._format_conversation(messages),
+            "parameters": {
+                "temperature": temperature,
+                "max_new_tokens": max_tokens,
+                "return_full_text": False
+            },
+            "stream": True
+        }
+        
+        if options and "parameters" in options:
+            payload["parameters"].update(options["parameters"])
+        
+        async for event in iter_sse_events(self.api_url, self.headers, payload):
+            token = event.get("token") or {}
+            if token.get("text") and not token.get("special"):
+                yield token["text"]
+    
     async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
                                        options: Optional[Dict[str, Any]] = None) -> float:
         """
@@ -152,7 +158,7 @@ class HuggingfaceModel(AIModelBase):
         if options and "parameters" in options:
             payload["parameters"].update(options["parameters"])
         
-        response = requests.post(self.api_url, headers=self.headers, json=payload)
+        response = await get_http_client().post(self.api_url, headers=self.headers, json=payload)
         response.raise_for_status()
         
         # Extract the score from the response
@@ -185,12 +191,39 @@ class HuggingfaceModel(AIModelBase):
             # Default to middle score if parsing fails
             return 0.5
     
-    def get_model_info(self) -> Dict[str, Any]:
+    def _format_conversation(self, messages: List[Dict[str, str]]) -> str:
         """
-        Get information about the Huggingface model.
+        Convert messages to a prompt format suitable for Huggingface.
+        """
+        conversation = ""
+        system_message = None
+        
+        for message in messages:
+            role = message["role"]
+            content = message["content"]
+            
+            if role == "system":
+                system_message = content
+            elif role == "user":
+                conversation += f"User: {content}\n"
+            elif role == "assistant":
+                conversation += f"Assistant: {content}\n"
+        
+        # Add system message at the beginning if present
+        if system_message:
+            conversation = f"System: {system_message}\n{conversation}"
+            
+        # Add final prompt for assistant response
+        conversation += "Assistant: "
+        return conversation
+    
+    @classmethod
+    def describe(cls, model_name: str) -> Dict[str, Any]:
+        """
+        Get information about a Huggingface model without creating a client.
         """
         return {
-            "name": self.model_name,
+            "name": model_name,
             "provider": "Huggingface",
             "description": "Huggingface's hosted models for text generation and chat",
             "is_default": False,
@@ -198,3 +231,9 @@ class HuggingfaceModel(AIModelBase):
             "max_tokens": 4096,  # This varies by model
             "supports_system_message": True
         }
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """
+        Get information about the Huggingface model.
+        """
+        return self.describe(self.model_name)
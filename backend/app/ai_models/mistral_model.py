@@ -1,6 +1,6 @@
 import os
-from typing import Dict, List, Optional, Any
-import requests
+from typing import AsyncIterator, Dict, List, Optional, Any
+from app.ai_models.http_client import get_http_client, iter_sse_events
 from app.ai_models.base import AIModelBase
 
 class MistralAIModel(AIModelBase):
@@ -8,6 +8,8 @@ class MistralAIModel(AIModelBase):
     Implementation of the MistralAI model integration.
     """
     
+    API_KEY_ENV = "MISTRAL_API_KEY"
+    
     def __init__(self, api_key: Optional[str] = None, model_name: str = "mistral-large-latest"):
         """
         Initialize the MistralAI model.
@@ -16,7 +18,7 @@ class MistralAIModel(AIModelBase):
             api_key: MistralAI API key (defaults to environment variable)
             model_name: MistralAI model name to use
         """
-        self.api_key = api_key or os.getenv("MISTRAL_API_KEY")
+        self.api_key = api_key or os.getenv(self.API_KEY_ENV)
         if not self.api_key:
             raise ValueError("MistralAI API key is required")
         
@@ -50,7 +52,7 @@ class MistralAIModel(AIModelBase):
         if options:
             payload.update(options)
         
-        response = requests.post(self.api_url, headers=self.headers, json=payload)
+        response = await get_http_client().post(self.api_url, headers=self.headers, json=payload)
         response.raise_for_status()
         
         return response.json()["choices"][0]["message"]["content"]
@@ -80,11 +82,40 @@ class MistralAIModel(AIModelBase):
         if options:
             payload.update(options)
         
-        response = requests.post(self.api_url, headers=self.headers, json=payload)
+        response = await get_http_client().post(self.api_url, headers=self.headers, json=payload)
         response.raise_for_status()
         
         return response.json()["choices"][0]["message"]["content"]
     
+    async def stream_chat_response(self, messages: List[Dict[str, str]], 
+                                   temperature: float = 0.7, max_tokens: int = 1000,
+                                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat response from MistralAI model.
+        """
+        mistral_messages = [
+            {"role": message["role"], "content": message["content"]}
+            for message in messages
+        ]
+        
+        payload = {
+            "model": self.model_name,
+            "messages": mistral_messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        
+        if options:
+            payload.update(options)
+        
+        async for event in iter_sse_events(self.api_url, self.headers, payload):
+            choices = event.get("choices") or []
+            if choices:
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+    
     async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
                                        options: Optional[Dict[str, Any]] = None) -> float:
         """
@@ -119,7 +150,7 @@ class MistralAIModel(AIModelBase):
         if options:
             payload.update(options)
         
-        response = requests.post(self.api_url, headers=self.headers, json=payload)
+        response = await get_http_client().post(self.api_url, headers=self.headers, json=payload)
         response.raise_for_status()
         
         # Extract the score from the response
@@ -133,12 +164,13 @@ class MistralAIModel(AIModelBase):
             # Default to middle score if parsing fails
             return 0.5
     
-    def get_model_info(self) -> Dict[str, Any]:
+    @classmethod
+    def describe(cls, model_name: str) -> Dict[str, Any]:
         """
-        Get information about the MistralAI model.
+        Get information about a MistralAI model without creating a client.
         """
         return {
-            "name": self.model_name,
+            "name": model_name,
             "provider": "MistralAI",
             "description": "MistralAI's language models for text generation and chat",
             "is_default": False,
@@ -146,3 +178,9 @@ class MistralAIModel(AIModelBase):
             "max_tokens": 8192,
             "supports_system_message": True
         }
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """
+        Get information about the MistralAI model.
+        """
+        return self.describe(self.model_name)
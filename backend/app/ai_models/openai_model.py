@@ -1,13 +1,16 @@
 import os
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any
 import openai
 from app.ai_models.base import AIModelBase
+from app.ai_models.http_client import get_http_client
 
 class OpenAIModel(AIModelBase):
     """
     Implementation of the OpenAI model integration.
     """
     
+    API_KEY_ENV = "OPENAI_API_KEY"
+    
     def __init__(self, api_key: Optional[str] = None, model_name: str = "gpt-4o"):
         """
         Initialize the OpenAI model.
@@ -16,12 +19,12 @@ class OpenAIModel(AIModelBase):
             api_key: OpenAI API key (defaults to environment variable)
             model_name: OpenAI model name to use
         """
-        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.api_key = api_key or os.getenv(self.API_KEY_ENV)
         if not self.api_key:
             raise ValueError("OpenAI API key is required")
         
         self.model_name = model_name
-        self.client = openai.OpenAI(api_key=self.api_key)
+        self.client = openai.AsyncOpenAI(api_key=self.api_key, http_client=get_http_client())
     
     async def generate_text(self, prompt: str, system_message: Optional[str] = None, 
                            temperature: float = 0.7, max_tokens: int = 1000, 
@@ -46,7 +49,7 @@ class OpenAIModel(AIModelBase):
         if options:
             params.update(options)
         
-        response = self.client.chat.completions.create(**params)
+        response = await self.client.chat.completions.create(**params)
         
         return response.choices[0].message.content
     
@@ -75,10 +78,38 @@ class OpenAIModel(AIModelBase):
         if options:
             params.update(options)
         
-        response = self.client.chat.completions.create(**params)
+        response = await self.client.chat.completions.create(**params)
         
         return response.choices[0].message.content
     
+    async def stream_chat_response(self, messages: List[Dict[str, str]], 
+                                   temperature: float = 0.7, max_tokens: int = 1000,
+                                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat response from OpenAI model.
+        """
+        openai_messages = [
+            {"role": message["role"], "content": message["content"]}
+            for message in messages
+        ]
+        
+        params = {
+            "model": self.model_name,
+            "messages": openai_messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        
+        if options:
+            params.update(options)
+        
+        stream = await self.client.chat.completions.create(**params)
+        
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
     async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
                                        options: Optional[Dict[str, Any]] = None) -> float:
         """
@@ -113,7 +144,7 @@ class OpenAIModel(AIModelBase):
         if options:
             params.update(options)
         
-        response = self.client.chat.completions.create(**params)
+        response = await self.client.chat.completions.create(**params)
         
         # Extract the score from the response
         try:
@@ -126,16 +157,23 @@ class OpenAIModel(AIModelBase):
             # Default to middle score if parsing fails
             return 0.5
     
-    def get_model_info(self) -> Dict[str, Any]:
+    @classmethod
+    def describe(cls, model_name: str) -> Dict[str, Any]:
         """
-        Get information about the OpenAI model.
+        Get information about an OpenAI model without creating a client.
         """
         return {
-            "name": self.model_name,
+            "name": model_name,
             "provider": "OpenAI",
             "description": "OpenAI's GPT models for text generation and chat",
             "is_default": False,
             "capabilities": ["text_generation", "chat", "conflict_resolution"],
-            "max_tokens": 8192 if "gpt-4" in self.model_name else 4096,
+            "max_tokens": 8192 if "gpt-4" in model_name else 4096,
             "supports_system_message": True
         }
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """
+        Get information about the OpenAI model.
+        """
+        return self.describe(self.model_name)
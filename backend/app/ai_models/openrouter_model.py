@@ -1,6 +1,6 @@
 import os
-from typing import Dict, List, Optional, Any
-import requests
+from typing import AsyncIterator, Dict, List, Optional, Any
+from app.ai_models.http_client import get_http_client, iter_sse_events
 from app.ai_models.base import AIModelBase
 
 class OpenrouterModel(AIModelBase):
@@ -9,6 +9,8 @@ class OpenrouterModel(AIModelBase):
     Openrouter provides access to multiple AI models through a single API.
     """
     
+    API_KEY_ENV = "OPENROUTER_API_KEY"
+    
     def __init__(self, api_key: Optional[str] = None, model_name: str = "openai/gpt-4o"):
         """
         Initialize the Openrouter model.
@@ -17,7 +19,7 @@ class OpenrouterModel(AIModelBase):
             api_key: Openrouter API key (defaults to environment variable)
             model_name: Model name to use through Openrouter (provider/model format)
         """
-        self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
+        self.api_key = api_key or os.getenv(self.API_KEY_ENV)
         if not self.api_key:
             raise ValueError("Openrouter API key is required")
         
@@ -53,7 +55,7 @@ class OpenrouterModel(AIModelBase):
         if options:
             payload.update(options)
         
-        response = requests.post(self.api_url, headers=self.headers, json=payload)
+        response = await get_http_client().post(self.api_url, headers=self.headers, json=payload)
         response.raise_for_status()
         
         return response.json()["choices"][0]["message"]["content"]
@@ -83,11 +85,40 @@ class OpenrouterModel(AIModelBase):
         if options:
             payload.update(options)
         
-        response = requests.post(self.api_url, headers=self.headers, json=payload)
+        response = await get_http_client().post(self.api_url, headers=self.headers, json=payload)
         response.raise_for_status()
         
         return response.json()["choices"][0]["message"]["content"]
     
+    async def stream_chat_response(self, messages: List[Dict[str, str]], 
+                                   temperature: float = 0.7, max_tokens: int = 1000,
+                                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat response from Openrouter model.
+        """
+        openrouter_messages = [
+            {"role": message["role"], "content": message["content"]}
+            for message in messages
+        ]
+        
+        payload = {
+            "model": self.model_name,
+            "messages": openrouter_messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        
+        if options:
+            payload.update(options)
+        
+        async for event in iter_sse_events(self.api_url, self.headers, payload):
+            choices = event.get("choices") or []
+            if choices:
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+    
     async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
                                        options: Optional[Dict[str, Any]] = None) -> float:
         """
@@ -122,7 +153,7 @@ class OpenrouterModel(AIModelBase):
         if options:
             payload.update(options)
         
-        response = requests.post(self.api_url, headers=self.headers, json=payload)
+        response = await get_http_client().post(self.api_url, headers=self.headers, json=payload)
         response.raise_for_status()
         
         # Extract the score from the response
@@ -136,12 +167,13 @@ class OpenrouterModel(AIModelBase):
             # Default to middle score if parsing fails
             return 0.5
     
-    def get_model_info(self) -> Dict[str, Any]:
+    @classmethod
+    def describe(cls, model_name: str) -> Dict[str, Any]:
         """
-        Get information about the Openrouter model.
+        Get information about a Openrouter model without creating a client.
         """
         return {
-            "name": self.model_name,
+            "name": model_name,
             "provider": "Openrouter",
             "description": "Openrouter provides access to multiple AI models through a single API",
             "is_default": False,
@@ -149,3 +181,9 @@ class OpenrouterModel(AIModelBase):
             "max_tokens": 8192,  # This varies by the underlying model
             "supports_system_message": True
         }
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """
+        Get information about the Openrouter model.
+        """
+        return self.describe(self.model_name)
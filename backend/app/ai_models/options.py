@@ -0,0 +1,80 @@
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.ai_models.base import AIModelBase, ModelWrapper
+from app.ai_models.cache import CACHE_OPTION
+from app.ai_models.coalescing import COALESCE_OPTION
+
+# Options addressed to the wrappers rather than the provider. A wrapper pops
+# its own option, but when the wrapper is disabled nothing would, and the
+# provider would send it upstream as an unknown request parameter.
+WRAPPER_OPTIONS = frozenset({CACHE_OPTION, COALESCE_OPTION})
+
+def provider_options(options: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Get the options without any wrapper-only entries.
+    """
+    if not options or WRAPPER_OPTIONS.isdisjoint(options):
+        return options
+    return {key: value for key, value in options.items() if key not in WRAPPER_OPTIONS}
+
+class ProviderOptionsModel(ModelWrapper):
+    """
+    AIModelBase wrapper placed directly around a provider model that drops
+    wrapper-only options, whichever wrappers are enabled above it.
+    """
+    
+    def __init__(self, model: AIModelBase):
+        """
+        Initialize the option filter.
+        
+        Args:
+            model: The provider model to wrap
+        """
+        self.model = model
+    
+    async def generate_text(self, prompt: str, system_message: Optional[str] = None,
+                           temperature: float = 0.7, max_tokens: int = 1000,
+                           options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate text with the provider's options only.
+        """
+        return await self.model.generate_text(prompt, system_message=system_message,
+                                              temperature=temperature, max_tokens=max_tokens,
+                                              options=provider_options(options))
+    
+    async def generate_chat_response(self, messages: List[Dict[str, str]],
+                                    temperature: float = 0.7, max_tokens: int = 1000,
+                                    options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate a chat response with the provider's options only.
+        """
+        return await self.model.generate_chat_response(messages, temperature=temperature,
+                                                       max_tokens=max_tokens,
+                                                       options=provider_options(options))
+    
+    async def stream_chat_response(self, messages: List[Dict[str, str]],
+                                   temperature: float = 0.7, max_tokens: int = 1000,
+                                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat response with the provider's options only.
+        """
+        chunks = self.model.stream_chat_response(messages, temperature=temperature,
+                                                 max_tokens=max_tokens, options=provider_options(options))
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                yield chunk
+    
+    async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
+                                       options: Optional[Dict[str, Any]] = None) -> float:
+        """
+        Score a conflict resolution with the provider's options only.
+        """
+        return await self.model.score_conflict_resolution(conflict_text, resolution_text,
+                                                          options=provider_options(options))
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """
+        Get information about the wrapped model.
+        """
+        return self.model.get_model_info()
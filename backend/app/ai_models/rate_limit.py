@@ -0,0 +1,335 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import aclosing, asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from app.ai_models.base import AIModelBase, ModelWrapper
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# User on whose behalf model calls are made; used to queue callers fairly.
+# Routers set this before calling a model.
+current_user_id: ContextVar[str] = ContextVar("current_user_id", default="anonymous")
+
+# Default limits per provider: requests per minute, tokens per minute and
+# maximum concurrent requests. Override with the LLM_RATE_LIMITS setting.
+DEFAULT_PROVIDER_LIMITS: Dict[str, Dict[str, int]] = {
+    "gemini": {"rpm": 360, "tpm": 120000, "concurrency": 32},
+    "openai": {"rpm": 500, "tpm": 30000, "concurrency": 32},
+    "claude": {"rpm": 50, "tpm": 40000, "concurrency": 16},
+    "mistral": {"rpm": 300, "tpm": 100000, "concurrency": 16},
+    "deepseek": {"rpm": 300, "tpm": 100000, "concurrency": 16},
+    "grok": {"rpm": 60, "tpm": 100000, "concurrency": 16},
+    "huggingface": {"rpm": 60, "tpm": 50000, "concurrency": 8},
+    "openrouter": {"rpm": 200, "tpm": 100000, "concurrency": 16},
+    "perplexity": {"rpm": 50, "tpm": 50000, "concurrency": 8},
+}
+
+# Atomic token bucket shared through Redis. Returns the number of seconds to
+# wait before the requested amount is available (0 if it was taken).
+REDIS_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local amount = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+local wait = 0
+if tokens >= amount then
+    tokens = tokens - amount
+else
+    wait = (amount - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the number of tokens in a text (about 4 characters each).
+    """
+    return len(text) // 4 + 1
+
+class TokenBucket:
+    """
+    In-process token bucket refilled continuously at a per-minute rate.
+    """
+    
+    def __init__(self, per_minute: int):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated_at = time.monotonic()
+    
+    async def take(self, amount: float) -> float:
+        """
+        Take amount tokens if available.
+        
+        Returns:
+            0 if the tokens were taken, otherwise the seconds to wait before retrying
+        """
+        amount = min(amount, self.capacity)
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+    
+    async def acquire(self, amount: float) -> None:
+        """
+        Wait until amount tokens are available and take them.
+        """
+        while True:
+            wait = await self.take(amount)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+class RedisTokenBucket(TokenBucket):
+    """
+    Token bucket whose state lives in Redis so every worker shares it.
+    
+    Falls back to the in-process bucket if Redis is unavailable.
+    """
+    
+    def __init__(self, per_minute: int, redis_client: Any, key: str):
+        super().__init__(per_minute)
+        self.redis = redis_client
+        self.key = key
+    
+    async def take(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        try:
+            wait = await self.redis.eval(REDIS_BUCKET_SCRIPT, 1, self.key,
+                                         self.rate, self.capacity, amount)
+            return float(wait)
+        except Exception as e:
+            logger.warning(f"Redis rate limiter unavailable, using local bucket: {e}")
+            return await super().take(amount)
+
+class FairSemaphore:
+    """
+    Concurrency limit that hands free slots to waiting users round-robin,
+    so one user's burst cannot starve everyone else.
+    """
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+    
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._waiters.values())
+    
+    async def acquire(self, user_id: str) -> None:
+        if self.in_use < self.limit and not self._waiters:
+            self.in_use += 1
+            return
+        
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user_id, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed to us just as we were cancelled
+                self.release()
+            else:
+                queue = self._waiters.get(user_id)
+                if queue is not None and future in queue:
+                    queue.remove(future)
+                    if not queue:
+                        del self._waiters[user_id]
+            raise
+    
+    def release(self) -> None:
+        while self._waiters:
+            user_id, queue = next(iter(self._waiters.items()))
+            future = queue.popleft()
+            if queue:
+                self._waiters.move_to_end(user_id)
+            else:
+                del self._waiters[user_id]
+            
+            if not future.done():
+                # Hand the slot straight to the next waiter
+                future.set_result(None)
+                return
+        
+        self.in_use -= 1
+
+class ProviderLimiter:
+    """
+    Admission control for one provider and API key: a fair concurrency
+    limit plus requests-per-minute and tokens-per-minute buckets.
+    """
+    
+    def __init__(self, rpm: int, tpm: int, concurrency: int,
+                 redis_client: Any = None, key: str = ""):
+        if redis_client is not None:
+            self.requests = RedisTokenBucket(rpm, redis_client, f"llm-rate:{key}:rpm")
+            self.tokens = RedisTokenBucket(tpm, redis_client, f"llm-rate:{key}:tpm")
+        else:
+            self.requests = TokenBucket(rpm)
+            self.tokens = TokenBucket(tpm)
+        self.slots = FairSemaphore(concurrency)
+    
+    @asynccontextmanager
+    async def admit(self, estimated_tokens: int):
+        """
+        Wait for rate budget and then for a slot, holding the slot until exit.
+        
+        The buckets are waited on first so a request sleeping on rate budget
+        never holds a slot that an admitted request could use.
+        
+        Args:
+            estimated_tokens: Expected prompt plus completion tokens
+        """
+        await self.requests.acquire(1)
+        await self.tokens.acquire(estimated_tokens)
+        await self.slots.acquire(current_user_id.get())
+        try:
+            yield
+        finally:
+            self.slots.release()
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self.slots.in_use,
+            "queued": self.slots.waiting,
+            "concurrency": self.slots.limit
+        }
+
+class RateLimiterRegistry:
+    """
+    Creates one ProviderLimiter per (provider, API key).
+    """
+    
+    def __init__(self, limits: Dict[str, Dict[str, int]], redis_url: Optional[str] = None):
+        self.limits = limits
+        self._limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+        self._redis = None
+        
+        if redis_url:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(redis_url)
+    
+    def get(self, provider: str, api_key: Optional[str]) -> ProviderLimiter:
+        fingerprint = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+        key = (provider, fingerprint)
+        
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limits = self.limits.get(provider, {"rpm": 60, "tpm": 50000, "concurrency": 8})
+            limiter = ProviderLimiter(
+                limits["rpm"], limits["tpm"], limits["concurrency"],
+                redis_client=self._redis, key=f"{provider}:{fingerprint}"
+            )
+            self._limiters[key] = limiter
+        return limiter
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            f"{provider}:{fingerprint}": limiter.stats()
+            for (provider, fingerprint), limiter in self._limiters.items()
+        }
+
+class RateLimitedModel(ModelWrapper):
+    """
+    AIModelBase wrapper that queues calls through a ProviderLimiter instead
+    of sending them straight to the provider.
+    """
+    
+    def __init__(self, model: AIModelBase, limiter: ProviderLimiter):
+        """
+        Initialize the rate limited model.
+        
+        Args:
+            model: The model to wrap
+            limiter: Limiter for the model's provider and API key
+        """
+        self.model = model
+        self.limiter = limiter
+    
+    async def generate_text(self, prompt: str, system_message: Optional[str] = None,
+                           temperature: float = 0.7, max_tokens: int = 1000,
+                           options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate text once admitted by the rate limiter.
+        """
+        estimated = estimate_tokens(prompt) + estimate_tokens(system_message or "") + max_tokens
+        async with self.limiter.admit(estimated):
+            return await self.model.generate_text(prompt, system_message=system_message,
+                                                  temperature=temperature, max_tokens=max_tokens,
+                                                  options=options)
+    
+    async def generate_chat_response(self, messages: List[Dict[str, str]],
+                                    temperature: float = 0.7, max_tokens: int = 1000,
+                                    options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate a chat response once admitted by the rate limiter.
+        """
+        async with self.limiter.admit(self._estimate_messages(messages) + max_tokens):
+            return await self.model.generate_chat_response(messages, temperature=temperature,
+                                                           max_tokens=max_tokens, options=options)
+    
+    async def stream_chat_response(self, messages: List[Dict[str, str]],
+                                   temperature: float = 0.7, max_tokens: int = 1000,
+                                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat response, holding a concurrency slot until it ends.
+        """
+        async with self.limiter.admit(self._estimate_messages(messages) + max_tokens):
+            chunks = self.model.stream_chat_response(messages, temperature=temperature,
+                                                     max_tokens=max_tokens, options=options)
+            # Close the upstream stream before the slot is released, even if
+            # the caller stops reading early
+            async with aclosing(chunks):
+                async for chunk in chunks:
+                    yield chunk
+    
+    async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
+                                       options: Optional[Dict[str, Any]] = None) -> float:
+        """
+        Score a conflict resolution once admitted by the rate limiter.
+        """
+        estimated = estimate_tokens(conflict_text) + estimate_tokens(resolution_text) + 10
+        async with self.limiter.admit(estimated):
+            return await self.model.score_conflict_resolution(conflict_text, resolution_text,
+                                                              options=options)
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """
+        Get information about the wrapped model.
+        """
+        return self.model.get_model_info()
+    
+    @staticmethod
+    def _estimate_messages(messages: List[Dict[str, str]]) -> int:
+        return sum(estimate_tokens(message["content"]) for message in messages)
+
+def _load_limits() -> Dict[str, Dict[str, int]]:
+    limits = {provider: dict(values) for provider, values in DEFAULT_PROVIDER_LIMITS.items()}
+    if settings.LLM_RATE_LIMITS:
+        for provider, values in json.loads(settings.LLM_RATE_LIMITS).items():
+            limits.setdefault(provider, {"rpm": 60, "tpm": 50000, "concurrency": 8}).update(values)
+    return limits
+
+rate_limiters = RateLimiterRegistry(
+    _load_limits(),
+    redis_url=settings.REDIS_URL if settings.LLM_RATE_LIMIT_REDIS_ENABLED else None
+)
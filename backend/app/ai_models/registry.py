@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from app.ai_models.base import AIModelBase
+from app.config import settings
+
+# (provider, api_key, model_name)
+RegistryKey = Tuple[str, Optional[str], str]
+
+class ModelRegistry:
+    """
+    Process-wide registry of AI model instances.
+    
+    Model instances (and the SDK clients they hold) are created once per
+    (provider, api_key, model_name) and reused, so their connection pools stay
+    warm between requests. Instances idle for longer than idle_timeout are
+    evicted, and the least recently used instance is dropped once max_size is
+    reached.
+    """
+    
+    def __init__(self, idle_timeout: float = 600.0, max_size: int = 256):
+        """
+        Initialize the registry.
+        
+        Args:
+            idle_timeout: Seconds an instance may go unused before it is evicted
+            max_size: Maximum number of instances to keep
+        """
+        self.idle_timeout = idle_timeout
+        self.max_size = max_size
+        self._instances: "OrderedDict[RegistryKey, AIModelBase]" = OrderedDict()
+        self._last_used: Dict[RegistryKey, float] = {}
+        self._lock = threading.Lock()
+    
+    def get_or_create(self, key: RegistryKey, create: Callable[[], AIModelBase]) -> AIModelBase:
+        """
+        Get the instance registered under key, creating it if needed.
+        
+        Args:
+            key: The (provider, api_key, model_name) tuple identifying the instance
+            create: Callable building a new instance on a miss
+        
+        Returns:
+            The pooled model instance
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            
+            instance = self._instances.get(key)
+            if instance is None:
+                instance = create()
+                self._instances[key] = instance
+                while len(self._instances) > self.max_size:
+                    oldest, _ = self._instances.popitem(last=False)
+                    self._last_used.pop(oldest, None)
+            else:
+                self._instances.move_to_end(key)
+            
+            self._last_used[key] = now
+            return instance
+    
+    def evict_idle(self) -> int:
+        """
+        Drop every instance that has been idle for longer than idle_timeout.
+        
+        Returns:
+            Number of instances evicted
+        """
+        with self._lock:
+            return self._evict_idle(time.monotonic())
+    
+    def clear(self) -> None:
+        """
+        Drop every registered instance.
+        """
+        with self._lock:
+            self._instances.clear()
+            self._last_used.clear()
+    
+    def __len__(self) -> int:
+        return len(self._instances)
+    
+    def _evict_idle(self, now: float) -> int:
+        expired = [
+            key for key, last_used in self._last_used.items()
+            if now - last_used > self.idle_timeout
+        ]
+        for key in expired:
+            self._instances.pop(key, None)
+            self._last_used.pop(key, None)
+        return len(expired)
+
+model_registry = ModelRegistry(
+    idle_timeout=settings.MODEL_CLIENT_IDLE_TIMEOUT_SECONDS,
+    max_size=settings.MODEL_CLIENT_MAX_INSTANCES
+)
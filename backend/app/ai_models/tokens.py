@@ -0,0 +1,188 @@
+import math
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # Optional: exact counts for OpenAI models
+    tiktoken = None
+
+# Average characters per token for each provider's tokenizer, measured on
+# English chat text. Used when no exact tokenizer is available.
+CHARS_PER_TOKEN: Dict[str, float] = {
+    "openai": 4.0,
+    "claude": 3.5,
+    "gemini": 4.0,
+    "mistral": 3.7,
+    "deepseek": 3.6,
+    "grok": 3.8,
+    "huggingface": 3.7,
+    "openrouter": 3.8,
+    "perplexity": 3.8,
+}
+
+# Tokens added per message for role and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+class TokenCounter:
+    """
+    Counts tokens for one provider.
+    
+    Uses tiktoken for OpenAI models when it is installed and a calibrated
+    characters-per-token estimate otherwise. Counts for messages that carry
+    an 'id' are memoized, so a session's history is only tokenized once.
+    """
+    
+    def __init__(self, provider: str, model_name: Optional[str] = None, cache_size: int = 100000):
+        """
+        Initialize the counter.
+        
+        Args:
+            provider: Provider name as used by AIModelFactory
+            model_name: Model name, used to pick an exact tokenizer
+            cache_size: Maximum number of memoized message counts
+        """
+        self.provider = provider
+        self.chars_per_token = CHARS_PER_TOKEN.get(provider, 3.8)
+        self.cache_size = cache_size
+        self._counts: "OrderedDict[str, int]" = OrderedDict()
+        self._encoding = None
+        
+        if provider == "openai" and tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model_name or "gpt-4")
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+    
+    def count_text(self, text: str) -> int:
+        """
+        Count the tokens in a text.
+        """
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / self.chars_per_token)
+    
+    def count_message(self, message: Dict[str, Any]) -> int:
+        """
+        Count the tokens of one chat message, including per-message overhead.
+        """
+        key = message.get("id")
+        if key is not None:
+            key = str(key)
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+                return count
+        
+        count = self.count_text(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+        if key is not None:
+            self._counts[key] = count
+            if len(self._counts) > self.cache_size:
+                self._counts.popitem(last=False)
+        return count
+    
+    def count_messages(self, messages: List[Dict[str, Any]]) -> int:
+        """
+        Count the tokens of a message list.
+        """
+        return sum(self.count_message(message) for message in messages)
+    
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Cut a text down to at most max_tokens tokens, keeping its start.
+        """
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else self._encoding.decode(tokens[:max_tokens])
+        return text[:int(max_tokens * self.chars_per_token)]
+
+class ContextBudgeter:
+    """
+    Fits a prompt into a model's context window before the call.
+    
+    The fixed messages (system prompt and summary) are always kept; history
+    is dropped oldest first until the prompt plus the completion fits. If
+    the fixed part alone is too large, fixed messages are truncated from
+    the last one backwards, and dropped once nothing of them is left.
+    Messages flagged with 'cache' are a provider-cached prefix and are
+    never changed, so the prefix keeps hitting the cache.
+    """
+    
+    def __init__(self, counter: TokenCounter):
+        self.counter = counter
+    
+    def fit(self, fixed: List[Dict[str, Any]], history: List[Dict[str, Any]],
+            context_tokens: int, completion_tokens: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Trim messages so they fit in the context window.
+        
+        Args:
+            fixed: Messages that must be sent (e.g. the system prompt)
+            history: Conversation messages, oldest first
+            context_tokens: The model's context window
+            completion_tokens: Tokens reserved for the response
+        
+        Returns:
+            The (possibly truncated) fixed messages and the history that fits
+        
+        Raises:
+            ValueError: If the completion leaves no room for the fixed messages,
+                or for the cached prefix alone
+        """
+        available = context_tokens - completion_tokens
+        fixed_tokens = self.counter.count_messages(fixed)
+        
+        if fixed_tokens > available:
+            return self._truncate_fixed(fixed, fixed_tokens - available), []
+        
+        remaining = available - fixed_tokens
+        kept: List[Dict[str, Any]] = []
+        for message in reversed(history):
+            tokens = self.counter.count_message(message)
+            if tokens > remaining:
+                break
+            kept.append(message)
+            remaining -= tokens
+        kept.reverse()
+        return fixed, kept
+    
+    def _truncate_fixed(self, fixed: List[Dict[str, Any]], excess: int) -> List[Dict[str, Any]]:
+        """
+        Cut excess tokens from the fixed messages, starting with the last one
+        and skipping the cached prefix.
+        """
+        truncated: List[Dict[str, Any]] = []
+        for message in reversed(fixed):
+            if excess <= 0 or message.get("cache"):
+                truncated.append(message)
+                continue
+            content = message.get("content") or ""
+            tokens = self.counter.count_text(content)
+            if tokens > excess:
+                truncated.append({**message, "content": self.counter.truncate(content, tokens - excess)})
+                excess = 0
+            else:
+                # Dropping the message also frees its overhead
+                excess -= tokens + MESSAGE_OVERHEAD_TOKENS
+        
+        if excess > 0 or not truncated:
+            raise ValueError("The context window leaves no room for the system prompt")
+        truncated.reverse()
+        return truncated
+
+_counters: Dict[Tuple[str, Optional[str]], TokenCounter] = {}
+
+def get_token_counter(provider: str, model_name: Optional[str] = None) -> TokenCounter:
+    """
+    Get the shared token counter for a provider and model.
+    """
+    key = (provider, model_name)
+    counter = _counters.get(key)
+    if counter is None:
+        counter = TokenCounter(provider, model_name)
+        _counters[key] = counter
+    return counter
@@ -0,0 +1,233 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.config import settings
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+# User columns kept in the cache. The password hash is never cached.
+PRINCIPAL_FIELDS = ("id", "email", "subscription_tier", "stripe_customer_id", "settings",
+                    "created_at", "updated_at")
+
+def dump_user(user: User) -> Dict[str, Any]:
+    """
+    Serialize the cached columns of a user to a JSON-compatible dict.
+    """
+    data = {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+    data["id"] = str(data["id"])
+    for field in ("created_at", "updated_at"):
+        if data[field] is not None:
+            data[field] = data[field].isoformat()
+    return data
+
+def load_user(data: Dict[str, Any]) -> User:
+    """
+    Rebuild a detached user from a dict made by dump_user.
+    
+    The user has an identity key, so adding it to a session updates the
+    existing row instead of inserting a new one.
+    """
+    values = dict(data)
+    values["id"] = uuid.UUID(values["id"])
+    for field in ("created_at", "updated_at"):
+        if values[field] is not None:
+            values[field] = datetime.fromisoformat(values[field])
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+class UserCache:
+    """
+    Two-tier cache of authenticated users, keyed by user id.
+    
+    The first tier is an in-process LRU with a short TTL; the optional second
+    tier is Redis, shared across workers, with a longer one. Redis errors are
+    logged and treated as misses so authentication never fails on the cache.
+    
+    Committed changes to a user invalidate both tiers of this process and the
+    Redis tier (see the session listeners below). Other workers' in-process
+    entries are not reached and expire after local_ttl seconds.
+    """
+    
+    def __init__(self, max_entries: int = 10000, ttl: float = 60.0, local_ttl: float = 5.0,
+                 redis_url: Optional[str] = None, key_prefix: str = "auth-user:"):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_entries: Maximum number of users kept in process
+            ttl: Time to live of a Redis entry in seconds
+            local_ttl: Time to live of an in-process entry in seconds
+            redis_url: Optional Redis URL enabling the shared tier
+            key_prefix: Prefix for keys stored in Redis
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.key_prefix = key_prefix
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._redis = None
+        
+        if redis_url:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(redis_url)
+        
+        # Redis deletes run in the background; keep references so they are
+        # not garbage collected before they finish
+        self._pending: Set[asyncio.Task] = set()
+        
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    async def get(self, user_id: Any) -> Optional[User]:
+        """
+        Look up a user, checking the in-process tier before Redis.
+        
+        Returns:
+            A detached user, or None on a miss
+        """
+        key = str(user_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, data = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return load_user(data)
+            del self._entries[key]
+        
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(self.key_prefix + key)
+            except Exception as e:
+                logger.warning(f"User cache Redis read failed: {e}")
+                raw = None
+            
+            if raw is not None:
+                try:
+                    data = json.loads(raw)
+                except ValueError as e:
+                    logger.warning(f"Ignoring corrupt user cache entry {key}: {e}")
+                else:
+                    self._store_local(key, data)
+                    self.redis_hits += 1
+                    return load_user(data)
+        
+        self.misses += 1
+        return None
+    
+    async def set(self, user: User) -> None:
+        """
+        Store a user in both tiers.
+        """
+        key = str(user.id)
+        data = dump_user(user)
+        self._store_local(key, data)
+        
+        if self._redis is not None:
+            try:
+                await self._redis.set(self.key_prefix + key, json.dumps(data), ex=int(self.ttl))
+            except Exception as e:
+                logger.warning(f"User cache Redis write failed: {e}")
+    
+    async def invalidate(self, user_ids: Iterable[Any]) -> None:
+        """
+        Drop users from both tiers.
+        """
+        keys = self._drop_local(user_ids)
+        if keys and self._redis is not None:
+            await self._delete_remote(keys)
+    
+    def invalidate_soon(self, user_ids: Iterable[Any]) -> None:
+        """
+        Drop users from the in-process tier now and from Redis in the
+        background, for callers that cannot await.
+        """
+        keys = self._drop_local(user_ids)
+        if not keys or self._redis is None:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self._delete_remote(keys))
+        except RuntimeError:
+            logger.warning(f"User cache Redis invalidation skipped for {len(keys)} users: no event loop")
+            return
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+    
+    def clear(self) -> None:
+        """
+        Drop every in-process entry.
+        """
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hit/miss counters for the cache.
+        """
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": (self.hits + self.redis_hits) / lookups if lookups else 0.0
+        }
+    
+    def _store_local(self, key: str, data: Dict[str, Any]) -> None:
+        self._entries[key] = (time.monotonic() + self.local_ttl, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def _drop_local(self, user_ids: Iterable[Any]) -> list:
+        keys = [str(user_id) for user_id in user_ids]
+        for key in keys:
+            self._entries.pop(key, None)
+        self.invalidations += len(keys)
+        return keys
+    
+    async def _delete_remote(self, keys: list) -> None:
+        try:
+            await self._redis.delete(*[self.key_prefix + key for key in keys])
+        except Exception as e:
+            logger.warning(f"User cache Redis invalidation failed: {e}")
+
+user_cache = UserCache(
+    max_entries=settings.AUTH_USER_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTH_USER_CACHE_TTL_SECONDS,
+    local_ttl=settings.AUTH_USER_CACHE_LOCAL_TTL_SECONDS,
+    redis_url=settings.REDIS_URL if settings.AUTH_USER_CACHE_REDIS_ENABLED else None
+)
+
+# Users changed or deleted in a session are invalidated once the session
+# commits, so a new subscription tier or new settings take effect on the
+# user's next request. Bulk UPDATE/DELETE statements on users do not say
+# which rows they touch; callers must invalidate those users themselves.
+@event.listens_for(Session, "after_flush")
+def _flushed_users(session: Session, flush_context: Any) -> None:
+    changed = [obj.id for obj in session.dirty | session.deleted if isinstance(obj, User)]
+    if changed:
+        session.info.setdefault("changed_users", set()).update(changed)
+
+@event.listens_for(Session, "after_commit")
+def _committed_users(session: Session) -> None:
+    changed = session.info.pop("changed_users", None)
+    if changed:
+        user_cache.invalidate_soon(changed)
+
+@event.listens_for(Session, "after_rollback")
+def _rolled_back_users(session: Session) -> None:
+    session.info.pop("changed_users", None)
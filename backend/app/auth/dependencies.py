@@ -1,11 +1,14 @@
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 
+from app.auth.cache import user_cache
 from app.config import settings
 from app.database import get_db
 from app.models import User
@@ -32,7 +35,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def authenticate_token(token: str, db: AsyncSession) -> User:
+    """
+    Get the user an access token was issued to.
+    
+    Raises:
+        HTTPException: 401 if the token is invalid or its user does not exist
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -40,15 +49,28 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     )
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+        user_id = uuid.UUID(payload.get("sub") or "")
+    except (JWTError, ValueError, TypeError):
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # Most requests are served from the user cache without touching the
+    # database; the session only connects on a miss
+    user = await user_cache.get(user_id) if settings.AUTH_USER_CACHE_ENABLED else None
     if user is None:
-        raise credentials_exception
+        user = await db.scalar(select(User).where(User.id == user_id))
+        if user is None:
+            raise credentials_exception
+        if settings.AUTH_USER_CACHE_ENABLED:
+            await user_cache.set(user)
+    
+    return user
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    user = await authenticate_token(token, db)
+    
+    # Writes made through this request's session count as the user's for
+    # read-your-writes routing to replicas
+    db.info["user_id"] = user.id
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Called with (session_id, encoded message) for every message delivered to
+# a session this process is subscribed to
+DeliverCallback = Callable[[str, str], None]
+
+class BroadcastBackend(ABC):
+    """
+    Carries encoded session messages between processes.
+    
+    ConnectionManager publishes every message through the backend and only
+    fans it out to its own sockets when the backend delivers it back, so
+    clients of one session see the same stream whichever worker they are
+    connected to.
+    """
+    
+    def __init__(self):
+        self._deliver: Optional[DeliverCallback] = None
+    
+    def set_receiver(self, deliver: DeliverCallback) -> None:
+        """
+        Set the callback receiving messages for subscribed sessions.
+        """
+        self._deliver = deliver
+    
+    @abstractmethod
+    async def publish(self, session_id: str, text: str) -> None:
+        """
+        Send an encoded message to every process subscribed to the session.
+        """
+        pass
+    
+    @abstractmethod
+    async def subscribe(self, session_id: str) -> None:
+        """
+        Start delivering the session's messages to this process.
+        """
+        pass
+    
+    @abstractmethod
+    async def unsubscribe(self, session_id: str) -> None:
+        """
+        Stop delivering the session's messages to this process.
+        """
+        pass
+    
+    async def close(self) -> None:
+        """
+        Release the backend's connections.
+        """
+        pass
+
+class InMemoryBroadcast(BroadcastBackend):
+    """
+    Backend for a single process: published messages are delivered directly.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.sessions: Set[str] = set()
+    
+    async def publish(self, session_id: str, text: str) -> None:
+        if session_id in self.sessions and self._deliver is not None:
+            self._deliver(session_id, text)
+    
+    async def subscribe(self, session_id: str) -> None:
+        self.sessions.add(session_id)
+    
+    async def unsubscribe(self, session_id: str) -> None:
+        self.sessions.discard(session_id)
+
+class RedisBroadcast(BroadcastBackend):
+    """
+    Backend sharing messages between workers over Redis pub/sub.
+    
+    Each session has its own channel; a worker subscribes only to the
+    sessions it has clients for, and a single reader task per worker hands
+    incoming messages to the local connections.
+    """
+    
+    CHANNEL_PREFIX = "chat:session:"
+    
+    def __init__(self, redis_url: str, redis_client: Any = None):
+        """
+        Initialize the backend.
+        
+        Args:
+            redis_url: Redis connection URL
+            redis_client: Optional existing redis.asyncio client
+        """
+        super().__init__()
+        if redis_client is None:
+            import redis.asyncio as aioredis
+            redis_client = aioredis.from_url(redis_url)
+        
+        self.redis = redis_client
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        self._reader: Optional["asyncio.Task[None]"] = None
+    
+    async def publish(self, session_id: str, text: str) -> None:
+        await self.redis.publish(self.CHANNEL_PREFIX + session_id, text)
+    
+    async def subscribe(self, session_id: str) -> None:
+        await self.pubsub.subscribe(self.CHANNEL_PREFIX + session_id)
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.ensure_future(self._read())
+    
+    async def unsubscribe(self, session_id: str) -> None:
+        await self.pubsub.unsubscribe(self.CHANNEL_PREFIX + session_id)
+    
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+        await self.pubsub.close()
+        await self.redis.close()
+    
+    async def _read(self) -> None:
+        while True:
+            try:
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Redis broadcast reader failed, retrying: {e!r}")
+                await asyncio.sleep(1.0)
+                continue
+            
+            if message is None or message["type"] != "message" or self._deliver is None:
+                continue
+            
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode("utf-8")
+            data = message["data"]
+            if isinstance(data, bytes):
+                data = data.decode("utf-8")
+            
+            self._deliver(channel[len(self.CHANNEL_PREFIX):], data)
+
+def create_broadcast_backend(kind: str, redis_url: str) -> BroadcastBackend:
+    """
+    Create the broadcast backend selected in settings.
+    
+    Args:
+        kind: "memory" or "redis"
+        redis_url: Redis connection URL, used by the redis backend
+    
+    Raises:
+        ValueError: If the backend kind is unknown
+    """
+    if kind == "memory":
+        return InMemoryBroadcast()
+    if kind == "redis":
+        return RedisBroadcast(redis_url)
+    raise ValueError(f"Unknown chat broadcast backend: {kind}")
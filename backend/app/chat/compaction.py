@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from app.ai_models.base import AIModelBase
+from app.ai_models.tokens import TokenCounter
+from app.chat.pagination import decode_cursor, encode_cursor
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import ChatMessage, ConversationSummary
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_MESSAGE = (
+    "You maintain a running summary of a multi-agent conversation. Keep every "
+    "decision, fact, open question and each participant's position; drop "
+    "pleasantries and repetition. Reply with the updated summary only."
+)
+
+class ConversationCompactor:
+    """
+    Keeps a rolling summary of each session so prompts stay roughly constant in size.
+    
+    The summary is stored in its own table (ConversationSummary) together
+    with the cursor of the last message it covers. Prompts are built from the
+    summary plus the messages after that cursor. Older messages are folded
+    into the summary in the background, leaving the most recent keep_recent
+    messages verbatim, once those messages exceed the token budget or once
+    the recent window no longer reaches back to the summary.
+    """
+    
+    def __init__(self, token_budget: int = 3000, keep_recent: int = 6,
+                 max_batch: int = 200, summary_max_tokens: int = 500):
+        """
+        Initialize the compactor.
+        
+        Args:
+            token_budget: Tokens of unsummarized history that trigger a refresh
+            keep_recent: Number of recent messages never folded into the summary
+            max_batch: Maximum number of messages folded in per refresh
+            summary_max_tokens: Completion limit for the summary
+        """
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.max_batch = max_batch
+        self.summary_max_tokens = summary_max_tokens
+        self._refreshing: Set[str] = set()
+        self._tasks: Set["asyncio.Task[Optional[Dict[str, Any]]]"] = set()
+    
+    def build_history(self, summary: Optional[ConversationSummary],
+                      window: List[Dict[str, Any]]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """
+        Split the recent window into the summary and the messages it does not cover.
+        
+        Args:
+            summary: The session's stored summary, if any
+            window: Recent messages, oldest first
+        
+        Returns:
+            The summary text (or None) and the unsummarized messages. A
+            summary with an unreadable cursor is ignored and the whole
+            window is returned.
+        """
+        if summary is None:
+            return None, window
+        
+        try:
+            through = decode_cursor(summary.through)
+        except ValueError:
+            logger.warning(f"Ignoring the summary of session {summary.session_id}: invalid cursor")
+            return None, window
+        
+        return summary.text, [
+            message for message in window
+            if self._position(message) is None or self._position(message) > through
+        ]
+    
+    def budget_for(self, model: AIModelBase) -> int:
+        """
+        Get the history budget for a model, capped at half its context window.
+        """
+        context = model.get_model_info().get("max_tokens") or self.token_budget * 2
+        return min(self.token_budget, context // 2)
+    
+    def needs_refresh(self, summary: Optional[ConversationSummary], window: List[Dict[str, Any]],
+                      window_limit: int, budget: int, counter: TokenCounter) -> bool:
+        """
+        Check whether the summary has fallen behind the conversation.
+        
+        Args:
+            summary: The session's stored summary, if any
+            window: Recent messages, oldest first
+            window_limit: Number of messages the window holds when full
+            budget: Tokens of unsummarized history allowed in the prompt
+            counter: Token counter of the summarizing model
+        
+        Returns:
+            True if the unsummarized messages in the window are over budget,
+            or if the window is full and the summary covers none of it: the
+            messages before the window are then in neither the prompt nor
+            the summary
+        """
+        _, unsummarized = self.build_history(summary, window)
+        if len(unsummarized) <= self.keep_recent:
+            return False
+        if len(window) >= window_limit and len(unsummarized) == len(window):
+            return True
+        return counter.count_messages(unsummarized) > budget
+    
+    def schedule_refresh(self, session_id: uuid.UUID, model: AIModelBase) -> None:
+        """
+        Refresh the summary in the background unless a refresh is already running.
+        """
+        key = str(session_id)
+        if key in self._refreshing:
+            return
+        
+        self._refreshing.add(key)
+        task = asyncio.ensure_future(self.refresh(session_id, model))
+        self._tasks.add(task)
+        
+        def done(finished: "asyncio.Task[Optional[Dict[str, Any]]]") -> None:
+            self._refreshing.discard(key)
+            self._tasks.discard(finished)
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.warning(f"Summary refresh failed for session {key}: {finished.exception()!r}")
+        
+        task.add_done_callback(done)
+    
+    async def refresh(self, session_id: uuid.UUID, model: AIModelBase) -> Optional[Dict[str, Any]]:
+        """
+        Fold the messages after the current summary (except the most recent ones) into it.
+        
+        Returns:
+            The new summary, or None if there was nothing to fold in
+        """
+        async with AsyncSessionLocal() as db:
+            summary = await db.get(ConversationSummary, session_id)
+            query = select(ChatMessage).where(ChatMessage.session_id == session_id)
+            if summary:
+                try:
+                    through = decode_cursor(summary.through)
+                except ValueError:
+                    # Rebuild the summary from the start of the conversation
+                    logger.warning(f"Rebuilding the summary of session {session_id}: invalid cursor")
+                    summary = None
+                else:
+                    query = query.where(tuple_(ChatMessage.created_at, ChatMessage.id) > tuple_(*through))
+            pending = (await db.scalars(
+                query.order_by(ChatMessage.created_at, ChatMessage.id).limit(self.max_batch + self.keep_recent)
+            )).all()
+        
+        to_fold = pending[:-self.keep_recent] if self.keep_recent else pending
+        if not to_fold:
+            return None
+        
+        # The model call can take seconds; don't hold a connection through it
+        text = await model.generate_text(
+            self._summary_prompt(summary.text if summary else None, to_fold),
+            system_message=SUMMARY_SYSTEM_MESSAGE,
+            temperature=0.2,
+            max_tokens=self.summary_max_tokens
+        )
+        
+        new_summary = {
+            "text": text.strip(),
+            "through": encode_cursor(to_fold[-1]),
+            "message_count": ((summary.message_count or 0) if summary else 0) + len(to_fold),
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }
+        async with AsyncSessionLocal() as db:
+            values = {key: new_summary[key] for key in ("text", "through", "message_count")}
+            await db.execute(
+                insert(ConversationSummary).values(session_id=session_id, **values).on_conflict_do_update(
+                    index_elements=[ConversationSummary.session_id],
+                    set_={**values, "updated_at": func.now()}
+                )
+            )
+            await db.commit()
+        
+        logger.info(f"Folded {len(to_fold)} messages into the summary of session {session_id}")
+        return new_summary
+    
+    @staticmethod
+    def _summary_prompt(previous: Optional[str], messages: List[ChatMessage]) -> str:
+        lines = []
+        if previous:
+            lines.append(f"Current summary:\n{previous}\n")
+        lines.append("New messages:")
+        for message in messages:
+            if message.sender_type == "agent":
+                name = (message.metadata_ or {}).get("agent_name", "Agent")
+            else:
+                name = "User"
+            lines.append(f"{name}: {message.content}")
+        lines.append("\nWrite the updated summary.")
+        return "\n".join(lines)
+    
+    @staticmethod
+    def _position(message: Dict[str, Any]) -> Optional[Tuple[datetime, uuid.UUID]]:
+        if not message.get("created_at"):
+            return None
+        return datetime.fromisoformat(message["created_at"]), uuid.UUID(message["id"])
+
+compactor = ConversationCompactor(
+    token_budget=settings.CHAT_COMPACTION_TOKEN_BUDGET,
+    keep_recent=settings.CHAT_COMPACTION_KEEP_RECENT
+)
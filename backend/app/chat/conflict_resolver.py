@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.ai_models.base import AIModelBase
+
+logger = logging.getLogger(__name__)
+
+class ConflictResolver:
+    """
+    Resolves conflicts between agent messages.
+    
+    Resolution runs in phases:
+    1. Detect which agent messages actually conflict (distinct answers from
+       different agents)
+    2. Score the candidates with the configured model, up to batch_size
+       candidates per call (one call for a typical turn); larger conflicts
+       are scored in concurrent batches, each bounded by a deadline
+    3. Stop as soon as a scored batch has a candidate that clears the
+       confidence threshold, otherwise select the highest score
+    4. Broadcast the winner to the session
+    
+    The time spent in each phase is logged and returned with the resolution.
+    """
+    
+    def __init__(self, model: AIModelBase, manager: Any = None,
+                 confidence_threshold: float = 0.85, score_timeout: float = 10.0,
+                 total_timeout: float = 20.0, similarity_threshold: float = 0.8,
+                 batch_size: int = 10):
+        """
+        Initialize the conflict resolver.
+        
+        Args:
+            model: Model used to score candidate resolutions
+            manager: ConnectionManager used to broadcast the resolution
+            confidence_threshold: Score at which a candidate wins immediately
+            score_timeout: Deadline in seconds for each scoring call
+            total_timeout: Deadline in seconds for the whole scoring phase
+            similarity_threshold: Word overlap above which two messages are
+                                  treated as the same answer
+            batch_size: Maximum number of candidates scored per model call
+        """
+        self.model = model
+        self.manager = manager
+        self.confidence_threshold = confidence_threshold
+        self.score_timeout = score_timeout
+        self.total_timeout = total_timeout
+        self.similarity_threshold = similarity_threshold
+        self.batch_size = max(1, batch_size)
+    
+    async def resolve_conflicts(self, messages: List[dict], session_id: Optional[str] = None,
+                                context: Optional[str] = None) -> Optional[dict]:
+        """
+        Resolve conflicts between agent messages.
+        
+        Args:
+            messages: Agent messages with 'id', 'sender_id' and 'content' keys
+            session_id: Session to broadcast the resolution to
+            context: Optional text the agents were responding to
+        
+        Returns:
+            The resolution, or None if the messages do not conflict or no
+            candidate could be scored
+        """
+        timings: Dict[str, float] = {}
+        
+        started = time.perf_counter()
+        candidates = self.detect_conflicts(messages)
+        timings["detect_ms"] = (time.perf_counter() - started) * 1000
+        
+        if len(candidates) <= 1:
+            return None
+        
+        started = time.perf_counter()
+        scores = await self.score_candidates(self._conflict_text(candidates, context), candidates)
+        timings["score_ms"] = (time.perf_counter() - started) * 1000
+        
+        if not scores:
+            logger.warning(f"No conflict candidates could be scored for session {session_id}")
+            return None
+        
+        best_message_id = max(scores, key=scores.get)
+        best_score = scores[best_message_id]
+        early_exit = best_score >= self.confidence_threshold and len(scores) < len(candidates)
+        
+        resolution = {
+            "message_id": best_message_id,
+            "resolution": "Selected based on relevance and accuracy",
+            "score": best_score,
+            "alternatives": [
+                {"message_id": message_id, "score": score}
+                for message_id, score in scores.items() if message_id != best_message_id
+            ],
+            "early_exit": early_exit,
+            "timings": timings
+        }
+        
+        if self.manager is not None and session_id is not None:
+            started = time.perf_counter()
+            await self.manager.broadcast_conflict_resolution(resolution, session_id)
+            timings["broadcast_ms"] = (time.perf_counter() - started) * 1000
+        
+        logger.info(
+            f"Resolved conflict between {len(candidates)} messages in session {session_id}: "
+            + ", ".join(f"{phase}={value:.1f}" for phase, value in timings.items())
+        )
+        
+        return resolution
+    
+    def detect_conflicts(self, messages: List[dict]) -> List[dict]:
+        """
+        Find agent messages that give different answers.
+        
+        Near-duplicate messages are collapsed to the first one; there is a
+        conflict only if distinct answers come from more than one agent.
+        
+        Returns:
+            The distinct candidate messages, or an empty list if there is no conflict
+        """
+        distinct: List[dict] = []
+        for message in messages:
+            if message.get("sender_type", "agent") != "agent":
+                continue
+            if all(self._similarity(message["content"], other["content"]) < self.similarity_threshold
+                   for other in distinct):
+                distinct.append(message)
+        
+        senders = {message.get("sender_id") for message in distinct}
+        if len(distinct) > 1 and len(senders) > 1:
+            return distinct
+        return []
+    
+    async def score_candidates(self, conflict_text: str, candidates: List[dict]) -> Dict[str, float]:
+        """
+        Score candidates in batches, stopping early on a confident winner.
+        
+        Each batch of up to batch_size candidates is scored in a single model
+        call; batches run concurrently. Batches whose call fails or misses
+        its deadline are left out of the result.
+        
+        Returns:
+            Mapping of message id to score for every candidate scored
+        """
+        async def score(batch: List[dict]) -> List[Tuple[str, float]]:
+            try:
+                values = await asyncio.wait_for(
+                    self.model.score_conflict_resolutions(
+                        conflict_text, [message["content"] for message in batch], batch_size=len(batch)
+                    ),
+                    self.score_timeout
+                )
+            except Exception as e:
+                logger.warning(f"Conflict scoring call for {len(batch)} candidates failed: {e!r}")
+                return []
+            return [(str(message["id"]), value) for message, value in zip(batch, values)]
+        
+        batches = [
+            candidates[start:start + self.batch_size]
+            for start in range(0, len(candidates), self.batch_size)
+        ]
+        tasks = [asyncio.ensure_future(score(batch)) for batch in batches]
+        scores: Dict[str, float] = {}
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=self.total_timeout):
+                batch_scores = await next_done
+                scores.update(batch_scores)
+                if any(value >= self.confidence_threshold for _, value in batch_scores):
+                    break
+        except asyncio.TimeoutError:
+            logger.warning("Conflict scoring hit the overall deadline")
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        return scores
+    
+    @staticmethod
+    def _conflict_text(candidates: List[dict], context: Optional[str]) -> str:
+        lines = []
+        if context:
+            lines.append(f"The agents were responding to: {context}")
+        lines.append("The agents gave conflicting responses:")
+        for message in candidates:
+            lines.append(f"- Agent {message.get('sender_id')}: {message['content']}")
+        return "\n".join(lines)
+    
+    @staticmethod
+    def _similarity(first: str, second: str) -> float:
+        first_words = set(re.findall(r"\w+", first.lower()))
+        second_words = set(re.findall(r"\w+", second.lower()))
+        if not first_words or not second_words:
+            return 1.0 if first_words == second_words else 0.0
+        return len(first_words & second_words) / len(first_words | second_words)
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from fastapi import WebSocket
+
+from app.chat.broadcast import BroadcastBackend, InMemoryBroadcast
+
+logger = logging.getLogger(__name__)
+
+class ClientConnection:
+    """
+    One WebSocket client with a bounded outbound queue and its own writer task.
+    
+    Broadcasts only enqueue already encoded frames, so a slow or stalled
+    client never delays the others. When the queue is full the slow
+    consumer policy applies: "drop" discards the oldest queued frame,
+    "disconnect" closes the socket so the client can reconnect and resync.
+    """
+    
+    def __init__(self, websocket: WebSocket, user_id: str, on_close: Callable[["ClientConnection"], None],
+                 max_queue: int = 256, send_timeout: float = 10.0, policy: str = "drop"):
+        """
+        Initialize the connection and start its writer task.
+        
+        Args:
+            websocket: The accepted WebSocket
+            user_id: User the connection belongs to
+            on_close: Called once when the connection is closed
+            max_queue: Maximum number of frames waiting to be sent
+            send_timeout: Seconds a single send may take before the client is dropped
+            policy: Slow consumer policy, "drop" or "disconnect"
+        """
+        if policy not in ("drop", "disconnect"):
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        
+        self.websocket = websocket
+        self.user_id = user_id
+        self.send_timeout = send_timeout
+        self.policy = policy
+        self.dropped = 0
+        self.closed = False
+        self._on_close = on_close
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=max_queue)
+        self._writer = asyncio.ensure_future(self._write())
+    
+    def enqueue(self, text: str) -> bool:
+        """
+        Queue an encoded frame without waiting.
+        
+        Returns:
+            False if the connection is closed or was closed as a slow consumer
+        """
+        if self.closed:
+            return False
+        
+        try:
+            self._queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            pass
+        
+        if self.policy == "disconnect":
+            logger.warning(f"Disconnecting slow WebSocket consumer for user {self.user_id}")
+            asyncio.ensure_future(self.close(code=1013))
+            return False
+        
+        self._queue.get_nowait()
+        self._queue.put_nowait(text)
+        self.dropped += 1
+        return True
+    
+    async def close(self, code: int = 1000) -> None:
+        """
+        Stop the writer task and close the socket.
+        """
+        if self.closed:
+            return
+        
+        self.closed = True
+        self._on_close(self)
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            # The socket is already gone
+            pass
+    
+    async def _write(self) -> None:
+        while True:
+            text = await self._queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(text), self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.info(f"Closing WebSocket for user {self.user_id} after failed send: {e!r}")
+                await self.close(code=1011)
+                return
+
+class ConnectionManager:
+    """
+    Tracks the WebSocket clients of each sandbox session and broadcasts to them.
+    
+    Every message is JSON encoded once per broadcast and published through
+    the broadcast backend, which delivers it to each process with clients in
+    the session. Locally it is queued on each client's ClientConnection, so
+    fan-out cost does not depend on how fast individual clients read.
+    """
+    
+    def __init__(self, max_queue: int = 256, send_timeout: float = 10.0, policy: str = "drop",
+                 backend: Optional[BroadcastBackend] = None):
+        """
+        Initialize the manager.
+        
+        Args:
+            max_queue: Outbound queue size for each client
+            send_timeout: Seconds a single send may take before the client is dropped
+            policy: Slow consumer policy, "drop" or "disconnect"
+            backend: Broadcast backend shared between workers (in-memory by default)
+        """
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.policy = policy
+        self.active_connections: Dict[str, Dict[WebSocket, ClientConnection]] = {}
+        self.backend = backend or InMemoryBroadcast()
+        self.backend.set_receiver(self._deliver)
+    
+    async def connect(self, websocket: WebSocket, session_id: str, user_id: str):
+        await websocket.accept()
+        connection = ClientConnection(
+            websocket, user_id,
+            on_close=lambda closed: self._remove(closed.websocket, session_id),
+            max_queue=self.max_queue,
+            send_timeout=self.send_timeout,
+            policy=self.policy
+        )
+        connections = self.active_connections.setdefault(session_id, {})
+        connections[websocket] = connection
+        if len(connections) == 1:
+            await self.backend.subscribe(session_id)
+    
+    def send_to(self, websocket: WebSocket, session_id: str, message: dict) -> bool:
+        """
+        Queue a message for one client of the session only.
+        
+        Returns:
+            False if the client is not connected
+        """
+        connection = self.active_connections.get(session_id, {}).get(websocket)
+        if connection is None:
+            return False
+        return connection.enqueue(json.dumps(message, default=str))
+    
+    def disconnect(self, websocket: WebSocket, session_id: str):
+        connection = self._remove(websocket, session_id)
+        if connection is not None and not connection.closed:
+            asyncio.ensure_future(connection.close())
+    
+    async def send_message(self, message: dict, session_id: str):
+        text = json.dumps(message, default=str)
+        try:
+            await self.backend.publish(session_id, text)
+        except Exception as e:
+            # Keep serving this worker's clients if the backplane is down
+            logger.warning(f"Broadcast backend publish failed, delivering locally: {e!r}")
+            self._deliver(session_id, text)
+    
+    async def broadcast_conflict_resolution(self, conflict: dict, session_id: str):
+        await self.send_message({
+            "type": "conflict_resolution",
+            "data": conflict
+        }, session_id)
+    
+    async def relay_stream(self, chunks: AsyncIterator[str], message: dict,
+                           session_id: str) -> AsyncIterator[str]:
+        """
+        Relay a streamed response to every client in the session.
+        
+        Sends a message_start event, one message_delta event per chunk and a
+        message_end event carrying the full content, re-yielding each chunk so
+        the caller can forward it elsewhere (e.g. over SSE).
+        """
+        await self.send_message({"type": "message_start", "data": message}, session_id)
+        
+        parts = []
+        async for delta in chunks:
+            parts.append(delta)
+            await self.send_message({
+                "type": "message_delta",
+                "data": {"id": message["id"], "delta": delta}
+            }, session_id)
+            yield delta
+        
+        await self.send_message({
+            "type": "message_end",
+            "data": {**message, "content": "".join(parts)}
+        }, session_id)
+    
+    async def close(self) -> None:
+        """
+        Close every client connection and the broadcast backend.
+        """
+        connections = [
+            connection
+            for session_connections in self.active_connections.values()
+            for connection in session_connections.values()
+        ]
+        await asyncio.gather(*(connection.close(code=1001) for connection in connections))
+        await self.backend.close()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get connection and slow consumer counters.
+        """
+        connections = [
+            connection
+            for session_connections in self.active_connections.values()
+            for connection in session_connections.values()
+        ]
+        return {
+            "sessions": len(self.active_connections),
+            "connections": len(connections),
+            "dropped_frames": sum(connection.dropped for connection in connections)
+        }
+    
+    def _remove(self, websocket: WebSocket, session_id: str) -> Optional[ClientConnection]:
+        connections = self.active_connections.get(session_id)
+        if connections is None:
+            return None
+        
+        connection = connections.pop(websocket, None)
+        if not connections:
+            del self.active_connections[session_id]
+            asyncio.ensure_future(self._unsubscribe(session_id))
+        return connection
+    
+    def _deliver(self, session_id: str, text: str) -> None:
+        for connection in list(self.active_connections.get(session_id, {}).values()):
+            connection.enqueue(text)
+    
+    async def _unsubscribe(self, session_id: str) -> None:
+        # A client may have reconnected to the session in the meantime
+        if session_id in self.active_connections:
+            return
+        try:
+            await self.backend.unsubscribe(session_id)
+        except Exception as e:
+            logger.warning(f"Broadcast backend unsubscribe failed for session {session_id}: {e!r}")
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+class MessageWriter:
+    """
+    Write-behind writer that group-commits chat messages.
+    
+    Messages written within max_delay of each other (up to max_batch rows,
+    across all sessions) are inserted with a single multi-row
+    INSERT ... RETURNING and one commit. Each write returns once its batch
+    has committed, so the caller can broadcast the stored message straight
+    away. If a batch fails, its rows are retried one at a time so a single
+    bad row only fails its own write.
+    
+    created_at is assigned when a message is queued, strictly increasing
+    per writer. The server default (now()) is the transaction time, which
+    would give every message of a batch the same created_at and leave
+    their order in history to the random ids.
+    """
+    
+    def __init__(self, session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+                 max_batch: int = 100, max_delay: float = 0.005):
+        """
+        Initialize the writer.
+        
+        Args:
+            session_factory: Creates the database sessions used for inserts
+            max_batch: Maximum number of rows per INSERT
+            max_delay: Seconds to wait for more rows after the first one arrives
+        """
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.rows = 0
+        self.failures = 0
+        self._last_created_at: Optional[datetime] = None
+        self._queue: Optional["asyncio.Queue[Optional[Tuple[Dict[str, Any], asyncio.Future]]]"] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+    
+    async def write(self, session_id: Union[str, uuid.UUID], sender_type: str, sender_id: str,
+                    content: str, metadata: Optional[Dict[str, Any]] = None,
+                    message_id: Optional[Union[str, uuid.UUID]] = None) -> Dict[str, Any]:
+        """
+        Store a chat message, waiting until its batch has committed.
+        
+        Args:
+            session_id: The sandbox session
+            sender_type: 'user' or 'agent'
+            sender_id: User or agent id
+            content: Message text
+            metadata: Optional message metadata
+            message_id: Id to store the message under; generated if omitted
+        
+        Returns:
+            The stored message as a dict, including its created_at
+        
+        Raises:
+            Exception: The database error if the message could not be stored
+        """
+        values = {
+            "id": uuid.UUID(str(message_id)) if message_id else uuid.uuid4(),
+            "session_id": uuid.UUID(str(session_id)),
+            "sender_type": sender_type,
+            "sender_id": sender_id,
+            "content": content,
+            "metadata": metadata or {},
+            "created_at": self._next_created_at()
+        }
+        
+        future = asyncio.get_running_loop().create_future()
+        self._ensure_started()
+        self._queue.put_nowait((values, future))
+        created_at = await future
+        
+        return {
+            "id": str(values["id"]),
+            "session_id": str(values["session_id"]),
+            "sender_type": sender_type,
+            "sender_id": sender_id,
+            "content": content,
+            "created_at": created_at.isoformat(),
+            "metadata": values["metadata"]
+        }
+    
+    async def close(self) -> None:
+        """
+        Flush every queued message and stop the writer.
+        """
+        if self._task is None or self._task.done():
+            return
+        self._queue.put_nowait(None)
+        await self._task
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get batch counters.
+        """
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "failures": self.failures,
+            "average_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize() if self._queue is not None else 0
+        }
+    
+    def _next_created_at(self) -> datetime:
+        created_at = datetime.now(timezone.utc)
+        if self._last_created_at is not None and created_at <= self._last_created_at:
+            created_at = self._last_created_at + timedelta(microseconds=1)
+        self._last_created_at = created_at
+        return created_at
+    
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.ensure_future(self._run())
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            
+            batch = [item]
+            stopping = False
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            
+            await self._flush(batch)
+            if stopping:
+                return
+    
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        rows = [values for values, _ in batch]
+        try:
+            results = await self._insert(rows)
+        except Exception as e:
+            results = {values["id"]: e for values in rows}
+        
+        self.batches += 1
+        for values, future in batch:
+            result = results.get(values["id"])
+            if result is None:
+                result = RuntimeError(f"Chat message {values['id']} was not returned by its insert")
+            if isinstance(result, Exception):
+                self.failures += 1
+            else:
+                self.rows += 1
+            
+            if future.done():
+                # The caller went away; the message is stored regardless
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
+    async def _insert(self, rows: List[Dict[str, Any]]) -> Dict[uuid.UUID, Union[datetime, Exception]]:
+        async with self.session_factory() as db:
+            try:
+                created = await self._insert_rows(db, rows)
+                await db.commit()
+                return created
+            except Exception as e:
+                await db.rollback()
+                if len(rows) == 1:
+                    return {rows[0]["id"]: e}
+                logger.warning(f"Chat message batch of {len(rows)} failed, retrying rows one by one: {e!r}")
+            
+            results: Dict[uuid.UUID, Union[datetime, Exception]] = {}
+            for row in rows:
+                try:
+                    results.update(await self._insert_rows(db, [row]))
+                    await db.commit()
+                except Exception as e:
+                    await db.rollback()
+                    results[row["id"]] = e
+            return results
+    
+    @staticmethod
+    async def _insert_rows(db: AsyncSession, rows: List[Dict[str, Any]]) -> Dict[uuid.UUID, datetime]:
+        table = ChatMessage.__table__
+        result = await db.execute(
+            insert(table).values(rows).returning(table.c.id, table.c.created_at)
+        )
+        return {row.id: row.created_at for row in result}
+
+message_writer = MessageWriter(
+    max_batch=settings.CHAT_WRITE_MAX_BATCH,
+    max_delay=settings.CHAT_WRITE_MAX_DELAY_SECONDS
+)
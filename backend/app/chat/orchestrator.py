@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.agents.compiled import compiled_agents
+from app.ai_models.base import AIModelBase
+from app.ai_models.factory import AIModelFactory
+from app.ai_models.rate_limit import current_user_id
+from app.ai_models.tokens import ContextBudgeter, get_token_counter
+from app.chat.compaction import compactor
+from app.chat.conflict_resolver import ConflictResolver
+from app.chat.message_writer import message_writer
+from app.chat.window_cache import message_to_dict, window_cache
+from app.config import settings
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.models import Agent, ChatMessage, ConversationSummary, SandboxAgent, SandboxSession
+
+logger = logging.getLogger(__name__)
+
+def get_session_model(session: SandboxSession, provider: Optional[str] = None,
+                      model_name: Optional[str] = None) -> AIModelBase:
+    """
+    Get the AI model selected for a sandbox session, with provider failover.
+    
+    Raises:
+        ValueError: If the selected provider is not supported or configured
+    """
+    configuration = session.configuration or {}
+    return AIModelFactory.get_failover_model(
+        provider or configuration.get("ai_model", "gemini"),
+        model_name=model_name or configuration.get("model_name")
+    )
+
+def get_conflict_resolver(session: SandboxSession, manager: Any) -> ConflictResolver:
+    """
+    Get a conflict resolver scoring with the session's AI model.
+    """
+    return ConflictResolver(
+        get_session_model(session),
+        manager,
+        confidence_threshold=settings.CONFLICT_CONFIDENCE_THRESHOLD,
+        score_timeout=settings.CONFLICT_SCORE_TIMEOUT_SECONDS,
+        total_timeout=settings.CONFLICT_TOTAL_TIMEOUT_SECONDS,
+        batch_size=settings.CONFLICT_SCORE_BATCH_SIZE
+    )
+
+class TurnOrchestrator:
+    """
+    Runs one conversation turn for every agent in a sandbox session.
+    
+    All agents respond concurrently (up to max_parallel at a time, each
+    bounded by agent_timeout). Each reply is streamed to the session as it
+    is generated and saved as soon as that agent finishes, so a turn takes
+    as long as the slowest agent rather than the sum of all of them. When
+    several agents reply, their answers go through conflict resolution.
+    """
+    
+    def __init__(self, manager: Any, max_parallel: int = 4, agent_timeout: float = 60.0,
+                 history_limit: int = 20):
+        """
+        Initialize the orchestrator.
+        
+        Args:
+            manager: ConnectionManager used to relay replies to the session
+            max_parallel: Maximum number of agents generating at once
+            agent_timeout: Deadline in seconds for each agent's reply
+            history_limit: Number of recent messages sent to each agent
+        """
+        self.manager = manager
+        self.max_parallel = max_parallel
+        self.agent_timeout = agent_timeout
+        self.history_limit = history_limit
+    
+    async def run_turn(self, session_id: uuid.UUID, user_message: Optional[dict] = None) -> List[dict]:
+        """
+        Generate, broadcast and save every agent's reply to the latest message.
+        
+        Args:
+            session_id: The sandbox session
+            user_message: The message that triggered the turn, used as
+                          context for conflict resolution
+        
+        Returns:
+            The agent replies that completed
+        """
+        started = time.perf_counter()
+        # Load everything up front so no connection is held while models generate
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(SandboxSession, ConversationSummary).outerjoin(
+                    ConversationSummary, ConversationSummary.session_id == SandboxSession.id
+                ).where(SandboxSession.id == session_id)
+            )).first()
+            if not row:
+                return []
+            session, stored_summary = row
+            
+            agents = (await db.execute(
+                select(SandboxAgent, Agent).join(
+                    Agent, SandboxAgent.agent_id == Agent.id
+                ).where(SandboxAgent.session_id == session_id)
+            )).all()
+            if not agents:
+                return []
+            
+            async def load_history(limit: int) -> List[Dict[str, Any]]:
+                messages = (await db.scalars(
+                    select(ChatMessage).where(
+                        ChatMessage.session_id == session_id
+                    ).order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).limit(limit)
+                )).all()
+                return [message_to_dict(message) for message in reversed(messages)]
+            
+            history = await window_cache.get(str(session_id), self.history_limit, load_history)
+        
+        # Older history is carried by the rolling summary; fold more of it
+        # in once the unsummarized part grows past the budget or the window
+        # has moved past what the summary covers
+        try:
+            summary_model = get_session_model(session)
+            counter = get_token_counter(
+                (session.configuration or {}).get("ai_model", "gemini"),
+                summary_model.get_model_info()["name"]
+            )
+            if compactor.needs_refresh(stored_summary, history, self.history_limit,
+                                       compactor.budget_for(summary_model), counter):
+                compactor.schedule_refresh(session_id, summary_model)
+        except ValueError as e:
+            logger.warning(f"Cannot summarize session {session_id}: {e}")
+        summary, history = compactor.build_history(stored_summary, history)
+        
+        # Queue this turn's model calls under the session owner
+        current_user_id.set(str(session.user_id))
+        
+        agent_names = {str(agent.id): agent.name for _, agent in agents}
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        tasks = [
+            asyncio.ensure_future(self._run_agent(
+                session, sandbox_agent, agent, history, agent_names, summary, semaphore
+            ))
+            for sandbox_agent, agent in agents
+        ]
+        
+        replies = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                reply = await next_done
+                if reply is None:
+                    continue
+                
+                try:
+                    stored = await message_writer.write(
+                        session_id,
+                        sender_type="agent",
+                        sender_id=reply["sender_id"],
+                        content=reply["content"],
+                        metadata=reply["metadata"],
+                        message_id=reply["id"]
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to save reply of agent {reply['sender_id']}: {e!r}")
+                    continue
+                window_cache.append(str(session_id), stored)
+                replies.append(stored)
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        if len(replies) > 1:
+            context = user_message["content"] if user_message else None
+            await get_conflict_resolver(session, self.manager).resolve_conflicts(
+                replies, str(session_id), context=context
+            )
+        
+        logger.info(
+            f"Agent turn for session {session_id}: {len(replies)}/{len(agents)} replies "
+            f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return replies
+    
+    def build_messages(self, agent: Agent, system_messages: List[Dict[str, Any]],
+                       history: List[Dict[str, Any]], agent_names: Dict[str, str]) -> List[Dict[str, Any]]:
+        """
+        Build the message list for one agent from its system messages and the recent history.
+        
+        The agent's own messages are sent as assistant turns; messages from
+        the user and from other agents (prefixed with their name) are sent as
+        user turns.
+        """
+        messages = list(system_messages)
+        agent_id = str(agent.id)
+        
+        for message in history:
+            if message["sender_type"] == "agent" and message["sender_id"] == agent_id:
+                messages.append({"role": "assistant", "content": message["content"]})
+            elif message["sender_type"] == "agent":
+                name = agent_names.get(message["sender_id"], "Agent")
+                messages.append({"role": "user", "content": f"[{name}]: {message['content']}"})
+            else:
+                messages.append({"role": "user", "content": message["content"]})
+        
+        return messages
+    
+    async def _run_agent(self, session: SandboxSession, sandbox_agent: SandboxAgent, agent: Agent,
+                         history: List[Dict[str, Any]], agent_names: Dict[str, str],
+                         summary: Optional[str], semaphore: asyncio.Semaphore) -> Optional[dict]:
+        configuration = {**(agent.configuration or {}), **(sandbox_agent.configuration or {})}
+        session_id = str(session.id)
+        message = {
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "sender_type": "agent",
+            "sender_id": str(agent.id),
+            "metadata": {"agent_name": agent.name}
+        }
+        
+        async with semaphore:
+            try:
+                model = get_session_model(
+                    session,
+                    configuration.get("ai_model"),
+                    configuration.get("model_name")
+                )
+                info = model.get_model_info()
+                message["metadata"]["model"] = info["name"]
+                max_tokens = configuration.get("max_tokens", 1000)
+                
+                # Fit the prompt into the model's context before calling it;
+                # if history had to be dropped, fold it into the summary
+                counter = get_token_counter(
+                    configuration.get("ai_model") or (session.configuration or {}).get("ai_model", "gemini"),
+                    info["name"]
+                )
+                fixed, fitted = ContextBudgeter(counter).fit(
+                    compiled_agents.get(agent).messages(summary),
+                    history, info.get("max_tokens") or 8192, max_tokens
+                )
+                if len(fitted) < len(history):
+                    logger.info(
+                        f"Dropped {len(history) - len(fitted)} messages to fit the context of "
+                        f"{info['name']} in session {session_id}"
+                    )
+                    compactor.schedule_refresh(session.id, model)
+                
+                chunks = model.stream_chat_response(
+                    self.build_messages(agent, fixed, fitted, agent_names),
+                    temperature=configuration.get("temperature", 0.7),
+                    max_tokens=max_tokens
+                )
+                
+                async def collect() -> str:
+                    parts = []
+                    async for delta in self.manager.relay_stream(chunks, message, session_id):
+                        parts.append(delta)
+                    return "".join(parts)
+                
+                content = await asyncio.wait_for(collect(), self.agent_timeout)
+            except Exception as e:
+                logger.warning(f"Agent {agent.id} failed to respond in session {session_id}: {e!r}")
+                await self.manager.send_message({
+                    "type": "agent_error",
+                    "data": {"id": message["id"], "sender_id": message["sender_id"], "detail": str(e)}
+                }, session_id)
+                return None
+        
+        return {**message, "content": content}
@@ -0,0 +1,83 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import ChatMessage
+from app.sandbox.queries import session_missing, session_owned
+
+def encode_cursor(message: ChatMessage) -> str:
+    """
+    Encode the (created_at, id) position of a message as an opaque cursor.
+    """
+    raw = json.dumps([message.created_at.isoformat(), str(message.id)])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """
+    Decode a cursor produced by encode_cursor.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, message_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), uuid.UUID(message_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+async def keyset_page(db: AsyncSession, session_id: uuid.UUID, user_id: uuid.UUID, limit: int,
+                      before: Optional[str] = None, after: Optional[str] = None) -> Optional[List[ChatMessage]]:
+    """
+    Fetch one page of a session's messages in (created_at, id) order using keyset pagination.
+    
+    Seeks straight to the cursor position through the
+    (session_id, created_at, id) index instead of scanning skipped rows.
+    The ownership check is an EXISTS in the same statement, so the ordered
+    index scan still stops after `limit` rows. Only an empty page costs a
+    second query, to tell an empty page from a session that is not owned.
+    
+    Args:
+        db: Database session
+        session_id: The sandbox session
+        user_id: The user who must own the session
+        limit: Maximum number of messages to return
+        before: Return the messages immediately preceding this cursor
+        after: Return the messages immediately following this cursor
+    
+    Returns:
+        The page in ascending (created_at, id) order, or None if the session
+        is not found or not owned
+    
+    Raises:
+        ValueError: If a cursor is malformed or both cursors are given
+    """
+    if before and after:
+        raise ValueError("Use either the before or the after cursor, not both")
+    
+    position = tuple_(ChatMessage.created_at, ChatMessage.id)
+    query = select(ChatMessage).where(
+        ChatMessage.session_id == session_id,
+        session_owned(session_id, user_id)
+    )
+    if before:
+        query = query.where(position < tuple_(*decode_cursor(before))).order_by(
+            ChatMessage.created_at.desc(), ChatMessage.id.desc()
+        )
+    else:
+        if after:
+            query = query.where(position > tuple_(*decode_cursor(after)))
+        query = query.order_by(ChatMessage.created_at, ChatMessage.id)
+    
+    messages = list((await db.scalars(query.limit(limit))).all())
+    if not messages:
+        return None if await session_missing(db, session_id, user_id) else []
+    
+    if before:
+        messages.reverse()
+    return messages
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from pydantic import BaseModel
 import uuid
 import json
 import asyncio
-from datetime import datetime
 
 from app.database import get_db
-from app.models import ChatMessage, SandboxSession, SandboxAgent, Agent
-from app.auth.dependencies import get_current_active_user
+from app.replicas import get_read_db, replica_router
+from app.auth.dependencies import authenticate_token, get_current_active_user
+from app.agents.compiled import compiled_agents
+from app.ai_models.rate_limit import current_user_id
+from app.chat.broadcast import create_broadcast_backend
+from app.chat.connections import ConnectionManager
+from app.chat.orchestrator import TurnOrchestrator, get_session_model
+from app.chat.message_writer import message_writer
+from app.chat.pagination import encode_cursor, keyset_page
+from app.chat.window_cache import message_to_dict, window_cache
+from app.sandbox.queries import get_owned_session, get_session_with_agent
+from app.config import settings
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
@@ -31,217 +41,321 @@ class MessageResponse(MessageBase):
     class Config:
         orm_mode = True
 
+class MessageDelta(BaseModel):
+    messages: List[MessageResponse]
+    cursor: Optional[str] = None
+    has_more: bool = False
+
+class CompletionStreamRequest(BaseModel):
+    content: str
+    agent_id: Optional[uuid.UUID] = None
+    provider: Optional[str] = None
+    model_name: Optional[str] = None
+    temperature: float = 0.7
+    max_tokens: int = 1000
+
 class ConflictResolution(BaseModel):
     message_id: uuid.UUID
     resolution: str
     score: float
 
 # WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
-
-    async def connect(self, websocket: WebSocket, session_id: str, user_id: str):
-        await websocket.accept()
-        if session_id not in self.active_connections:
-            self.active_connections[session_id] = []
-        self.active_connections[session_id].append(websocket)
-
-    def disconnect(self, websocket: WebSocket, session_id: str):
-        if session_id in self.active_connections:
-            self.active_connections[session_id].remove(websocket)
-            if not self.active_connections[session_id]:
-                del self.active_connections[session_id]
-
-    async def send_message(self, message: dict, session_id: str):
-        if session_id in self.active_connections:
-            for connection in self.active_connections[session_id]:
-                await connection.send_json(message)
-
-    async def broadcast_conflict_resolution(self, conflict: dict, session_id: str):
-        if session_id in self.active_connections:
-            for connection in self.active_connections[session_id]:
-                await connection.send_json({
-                    "type": "conflict_resolution",
-                    "data": conflict
-                })
+manager = ConnectionManager(
+    max_queue=settings.WS_SEND_QUEUE_SIZE,
+    send_timeout=settings.WS_SEND_TIMEOUT_SECONDS,
+    policy=settings.WS_SLOW_CONSUMER_POLICY,
+    backend=create_broadcast_backend(settings.CHAT_BROADCAST_BACKEND, settings.REDIS_URL)
+)
+
+orchestrator = TurnOrchestrator(
+    manager,
+    max_parallel=settings.AGENT_TURN_MAX_PARALLEL,
+    agent_timeout=settings.AGENT_TURN_TIMEOUT_SECONDS,
+    history_limit=settings.AGENT_TURN_HISTORY_LIMIT
+)
 
-manager = ConnectionManager()
+# Agent turns run in the background; keep references so they are not
+# garbage collected before they finish
+agent_turns = set()
+
+def start_agent_turn(session_id: uuid.UUID, user_message: dict) -> None:
+    """
+    Start generating agent replies to a user message without blocking the caller.
+    """
+    task = asyncio.ensure_future(orchestrator.run_turn(session_id, user_message))
+    agent_turns.add(task)
+    task.add_done_callback(agent_turns.discard)
 
 # Routes
 @router.get("/{session_id}/messages", response_model=List[MessageResponse])
 async def get_messages(
     session_id: uuid.UUID, 
-    skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db),
+    response: Response,
+    limit: int = Query(100, ge=1, le=500), 
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
     current_user = Depends(get_current_active_user)
 ):
-    # Verify session ownership
-    session = db.query(SandboxSession).filter(
-        SandboxSession.id == session_id,
-        SandboxSession.user_id == current_user.id
-    ).first()
+    """
+    Get one page of chat messages, oldest first.
     
-    if not session:
+    Pass the X-Prev-Cursor response header as `before` to page back, or
+    X-Next-Cursor as `after` to page forward.
+    """
+    try:
+        messages = await keyset_page(db, session_id, current_user.id, limit, before=before, after=after)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if messages is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found or not owned by you"
+        )
+    
+    if messages:
+        response.headers["X-Prev-Cursor"] = encode_cursor(messages[0])
+        response.headers["X-Next-Cursor"] = encode_cursor(messages[-1])
+    
+    return [message_to_dict(message) for message in messages]
+
+@router.get("/{session_id}/messages/since", response_model=MessageDelta)
+async def get_messages_since(
+    session_id: uuid.UUID, 
+    cursor: str, 
+    limit: int = Query(500, ge=1, le=1000), 
+    db: AsyncSession = Depends(get_read_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Get the messages created after a cursor, for clients catching up after a reconnect.
+    
+    Returns the new messages, the cursor to resume from and whether more
+    messages are waiting.
+    """
+    try:
+        messages = await keyset_page(db, session_id, current_user.id, limit + 1, after=cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if messages is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Session not found or not owned by you"
         )
     
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.session_id == session_id
-    ).order_by(ChatMessage.created_at).offset(skip).limit(limit).all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
     
-    return messages
+    return {
+        "messages": [message_to_dict(message) for message in messages],
+        "cursor": encode_cursor(messages[-1]) if messages else cursor,
+        "has_more": has_more
+    }
 
 @router.post("/{session_id}/messages", response_model=MessageResponse)
 async def create_message(
     session_id: uuid.UUID, 
     message_data: MessageCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     # Verify session ownership
-    session = db.query(SandboxSession).filter(
-        SandboxSession.id == session_id,
-        SandboxSession.user_id == current_user.id
-    ).first()
-    
-    if not session:
+    if not await get_owned_session(db, session_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Session not found or not owned by you"
         )
     
     # Create user message
-    new_message = ChatMessage(
-        session_id=session_id,
+    message_dict = await message_writer.write(
+        session_id,
         sender_type="user",
         sender_id=str(current_user.id),
         content=message_data.content,
         metadata=message_data.metadata
     )
-    
-    db.add(new_message)
-    db.commit()
-    db.refresh(new_message)
+    replica_router.mark_write(current_user.id)
     
     # Broadcast message to all connected clients
-    message_dict = {
-        "id": str(new_message.id),
-        "session_id": str(new_message.session_id),
-        "sender_type": new_message.sender_type,
-        "sender_id": new_message.sender_id,
-        "content": new_message.content,
-        "created_at": new_message.created_at.isoformat(),
-        "metadata": new_message.metadata
-    }
+    window_cache.append(str(session_id), message_dict)
+    
+    await manager.send_message({"type": "message", "data": message_dict}, str(session_id))
+    
+    # Agents reply concurrently; each reply is streamed to WebSocket clients
+    start_agent_turn(session_id, message_dict)
+    
+    return message_dict
+
+@router.post("/{session_id}/completions/stream")
+async def stream_completion(
+    session_id: uuid.UUID, 
+    request_data: CompletionStreamRequest, 
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Stream a model response as server-sent events.
+    
+    Each token delta is sent as an SSE "data" event and relayed to WebSocket
+    clients of the session; the completed response is saved as a chat message.
+    """
+    # Verify session ownership, and agent access in the same query
+    if request_data.agent_id:
+        session, agent = await get_session_with_agent(db, session_id, current_user.id, request_data.agent_id)
+    else:
+        session, agent = await get_owned_session(db, session_id, current_user.id), None
+    
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found or not owned by you"
+        )
+    
+    messages = []
+    sender_type = "user"
+    sender_id = str(current_user.id)
+    
+    if request_data.agent_id:
+        if not agent:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Agent not found, not owned by you, or not public"
+            )
+        
+        messages.extend(compiled_agents.get(agent).messages())
+        sender_type = "agent"
+        sender_id = str(agent.id)
+    
+    messages.append({"role": "user", "content": request_data.content})
+    
+    try:
+        model = get_session_model(session, request_data.provider, request_data.model_name)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
-    # This would be handled by WebSocket in a real implementation
-    # await manager.send_message({"type": "message", "data": message_dict}, str(session_id))
+    # Queue this user's model calls fairly against other users
+    current_user_id.set(str(current_user.id))
     
-    # In a real implementation, we would trigger agent responses here
-    # This would involve:
-    # 1. Getting all agents in the sandbox
-    # 2. For each agent, generating a response using LangChain
-    # 3. If there are conflicts, using Gemini to score and resolve them
-    # 4. Saving and broadcasting the agent responses
+    message = {
+        "id": str(uuid.uuid4()),
+        "session_id": str(session_id),
+        "sender_type": sender_type,
+        "sender_id": sender_id,
+        "metadata": {"model": model.get_model_info()["name"]}
+    }
     
-    return new_message
+    async def event_stream():
+        parts = []
+        chunks = model.stream_chat_response(
+            messages,
+            temperature=request_data.temperature,
+            max_tokens=request_data.max_tokens
+        )
+        
+        try:
+            async for delta in manager.relay_stream(chunks, message, str(session_id)):
+                parts.append(delta)
+                yield f"data: {json.dumps({'id': message['id'], 'delta': delta})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+            return
+        
+        try:
+            stored = await message_writer.write(
+                session_id,
+                sender_type=sender_type,
+                sender_id=sender_id,
+                content="".join(parts),
+                metadata=message["metadata"],
+                message_id=message["id"]
+            )
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+            return
+        replica_router.mark_write(current_user.id)
+        window_cache.append(str(session_id), stored)
+        
+        yield f"event: done\ndata: {json.dumps({'id': message['id']})}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.websocket("/{session_id}/stream")
 async def websocket_endpoint(
     websocket: WebSocket, 
     session_id: str, 
     token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    # In a real implementation, we would validate the token
-    # and get the user_id from it
-    user_id = "mock_user_id"
+    # Only the session's owner may connect: messages sent here start agent
+    # turns billed to the session
+    try:
+        session_uuid = uuid.UUID(session_id)
+        user = await authenticate_token(token, db)
+        session = await get_owned_session(db, session_uuid, user.id)
+    except (ValueError, HTTPException):
+        session = None
+    if session is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    user_id = str(user.id)
+    session_id = str(session_uuid)
+    
+    # Do not hold a pooled connection for the lifetime of the socket
+    await db.close()
     
-    # Connect to WebSocket
     await manager.connect(websocket, session_id, user_id)
     
     try:
         while True:
-            # Receive message from WebSocket
             data = await websocket.receive_text()
-            message_data = json.loads(data)
+            try:
+                message_data = json.loads(data)
+                if message_data["type"] != "message":
+                    continue
+                content = message_data["content"]
+                metadata = message_data.get("metadata") or {}
+                if not isinstance(content, str) or not isinstance(metadata, dict):
+                    raise TypeError("content must be a string and metadata an object")
+            except (ValueError, KeyError, TypeError) as e:
+                manager.send_to(websocket, session_id, {
+                    "type": "error",
+                    "data": {"detail": f"Invalid message: {e!r}"}
+                })
+                continue
+            
+            # Create message in database (batched with other writes)
+            message_dict = await message_writer.write(
+                session_uuid,
+                sender_type="user",
+                sender_id=user_id,
+                content=content,
+                metadata=metadata
+            )
+            replica_router.mark_write(user.id)
+            
+            # Broadcast message to all connected clients
+            window_cache.append(session_id, message_dict)
+            await manager.send_message({"type": "message", "data": message_dict}, session_id)
             
-            # Process message
-            if message_data["type"] == "message":
-                # Create message in database
-                new_message = ChatMessage(
-                    session_id=uuid.UUID(session_id),
-                    sender_type="user",
-                    sender_id=user_id,
-                    content=message_data["content"],
-                    metadata=message_data.get("metadata", {})
-                )
-                
-                db.add(new_message)
-                db.commit()
-                db.refresh(new_message)
-                
-                # Broadcast message to all connected clients
-                await manager.send_message({
-                    "type": "message",
-                    "data": {
-                        "id": str(new_message.id),
-                        "session_id": session_id,
-                        "sender_type": new_message.sender_type,
-                        "sender_id": new_message.sender_id,
-                        "content": new_message.content,
-                        "created_at": new_message.created_at.isoformat(),
-                        "metadata": new_message.metadata
-                    }
-                }, session_id)
-                
-                # In a real implementation, we would trigger agent responses here
-                # This would involve:
-                # 1. Getting all agents in the sandbox
-                # 2. For each agent, generating a response using LangChain
-                # 3. If there are conflicts, using Gemini to score and resolve them
-                # 4. Broadcasting the agent responses
+            # Start the agent turn without blocking this socket's receive loop
+            start_agent_turn(session_uuid, message_dict)
     
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket, session_id)
-
-# Conflict resolution module
-class ConflictResolver:
-    @staticmethod
-    async def resolve_conflicts(messages: List[dict], db: Session):
-        """
-        Resolve conflicts between agent messages using Gemini.
-        
-        In a real implementation, this would:
-        1. Identify conflicting messages
-        2. Use Gemini to score each message
-        3. Select the highest-scoring message or combine them
-        4. Return the resolution
-        """
-        # Mock implementation
-        if len(messages) <= 1:
-            return None
-        
-        # Simulate Gemini scoring
-        scores = {msg["id"]: 0.5 + (i * 0.1) for i, msg in enumerate(messages)}
-        
-        # Find highest scoring message
-        best_message_id = max(scores, key=scores.get)
-        best_score = scores[best_message_id]
-        
-        # Create resolution
-        resolution = {
-            "message_id": best_message_id,
-            "resolution": "Selected based on relevance and accuracy",
-            "score": best_score,
-            "alternatives": [
-                {"message_id": msg["id"], "score": scores[msg["id"]]}
-                for msg in messages if msg["id"] != best_message_id
-            ]
-        }
-        
-        return resolution
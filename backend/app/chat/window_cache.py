@@ -0,0 +1,241 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List
+
+from app.config import settings
+from app.models import ChatMessage
+
+# Rough fixed cost of one cached message besides its content
+MESSAGE_OVERHEAD_BYTES = 256
+
+def message_to_dict(message: ChatMessage) -> Dict[str, Any]:
+    """
+    Convert a chat message to the dict sent to clients and kept in the window cache.
+    """
+    return {
+        "id": str(message.id),
+        "session_id": str(message.session_id),
+        "sender_type": message.sender_type,
+        "sender_id": message.sender_id,
+        "content": message.content,
+        "created_at": message.created_at.isoformat() if message.created_at else None,
+        "metadata": message.metadata_
+    }
+
+class _SessionWindow:
+    def __init__(self, size: int, messages: List[Dict[str, Any]]):
+        self.messages: Deque[Dict[str, Any]] = deque(messages, maxlen=size)
+        self.ids = {message.get("id") for message in self.messages}
+        # True when the session has no older messages than the ones loaded,
+        # so a short window still answers requests for more messages
+        self.complete = len(messages) < size
+        self.size_bytes = sum(self._message_bytes(message) for message in self.messages)
+        self.last_used = time.monotonic()
+    
+    def append(self, message: Dict[str, Any]) -> int:
+        """
+        Append a message unless it is already in the window, returning the
+        change in estimated size.
+        """
+        if message.get("id") in self.ids:
+            return 0
+        
+        removed = 0
+        if len(self.messages) == self.messages.maxlen:
+            oldest = self.messages[0]
+            removed = self._message_bytes(oldest)
+            self.ids.discard(oldest.get("id"))
+            self.complete = False
+        self.messages.append(message)
+        self.ids.add(message.get("id"))
+        added = self._message_bytes(message)
+        self.size_bytes += added - removed
+        return added - removed
+    
+    @staticmethod
+    def _message_bytes(message: Dict[str, Any]) -> int:
+        return len(message.get("content") or "") + MESSAGE_OVERHEAD_BYTES
+
+class _PendingLoad:
+    """
+    A window being loaded from the database, with the messages written
+    while the load runs.
+    """
+    
+    def __init__(self):
+        self.done: "asyncio.Future[List[Dict[str, Any]]]" = asyncio.get_running_loop().create_future()
+        self.appended: List[Dict[str, Any]] = []
+
+class ConversationWindowCache:
+    """
+    In-process cache of the most recent messages of each sandbox session.
+    
+    Each session keeps a ring buffer of its last `window` messages, appended
+    to on every message write. Sessions are evicted least recently used
+    first when there are more than max_sessions or the estimated size goes
+    over max_bytes, and after idle_timeout seconds without use. A miss loads
+    the window from the database with a single query; concurrent misses
+    share it, and messages written while it runs are merged in by id, so
+    they are neither lost nor duplicated whichever side of the load they
+    landed on.
+    
+    The cache is per process: with several workers, each only sees the
+    writes it handled itself until the session is evicted and reloaded.
+    """
+    
+    def __init__(self, window: int = 50, max_sessions: int = 1000,
+                 max_bytes: int = 64 * 1024 * 1024, idle_timeout: float = 1800.0):
+        """
+        Initialize the cache.
+        
+        Args:
+            window: Number of recent messages kept per session
+            max_sessions: Maximum number of sessions cached
+            max_bytes: Approximate memory cap for all cached messages
+            idle_timeout: Seconds after which an unused session is evicted
+        """
+        self.window = window
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_timeout = idle_timeout
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sessions: "OrderedDict[str, _SessionWindow]" = OrderedDict()
+        self._loads: Dict[str, _PendingLoad] = {}
+    
+    async def get(self, session_id: str, limit: int,
+                  load: Callable[[int], Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """
+        Get the last `limit` messages of a session, oldest first.
+        
+        Args:
+            session_id: The sandbox session
+            limit: Number of recent messages wanted
+            load: Awaited on a miss with the number of messages to load; must
+                  return the session's most recent messages, oldest first
+        
+        Returns:
+            Up to `limit` recent messages
+        """
+        self.evict_idle()
+        session_id = str(session_id)
+        
+        if limit > self.window:
+            # Larger than anything cached; go straight to the database
+            self.misses += 1
+            return await load(limit)
+        
+        entry = self._sessions.get(session_id)
+        if entry is not None and (len(entry.messages) >= limit or entry.complete):
+            self.hits += 1
+            entry.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return list(entry.messages)[-limit:]
+        
+        self.misses += 1
+        pending = self._loads.get(session_id)
+        if pending is not None:
+            return (await asyncio.shield(pending.done))[-limit:]
+        
+        pending = self._loads[session_id] = _PendingLoad()
+        try:
+            loaded = await load(self.window)
+        except Exception as e:
+            pending.done.set_exception(e)
+            # Mark the exception retrieved when nobody else was waiting
+            pending.done.exception()
+            raise
+        except BaseException:
+            pending.done.cancel()
+            raise
+        finally:
+            del self._loads[session_id]
+        
+        entry = _SessionWindow(self.window, loaded)
+        for message in pending.appended:
+            entry.append(message)
+        self._store(session_id, entry)
+        pending.done.set_result(list(entry.messages))
+        return list(entry.messages)[-limit:]
+    
+    def append(self, session_id: str, message: Dict[str, Any]) -> None:
+        """
+        Record a newly written message.
+        
+        Sessions that are not cached are left alone; their window is loaded
+        from the database on the next read. If a load is running the message
+        is kept and merged into the loaded window.
+        """
+        session_id = str(session_id)
+        pending = self._loads.get(session_id)
+        if pending is not None:
+            pending.appended.append(message)
+            return
+        
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return
+        
+        entry.last_used = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        self.size_bytes += entry.append(message)
+        self._evict_oversize()
+    
+    def invalidate(self, session_id: str) -> None:
+        """
+        Drop a session's cached window.
+        """
+        entry = self._sessions.pop(str(session_id), None)
+        if entry is not None:
+            self.size_bytes -= entry.size_bytes
+    
+    def evict_idle(self) -> None:
+        """
+        Evict sessions that have not been used within idle_timeout.
+        """
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if entry.last_used > cutoff:
+                break
+            self.invalidate(session_id)
+            self.evictions += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hit rate and size counters.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "sessions": len(self._sessions),
+            "size_bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions
+        }
+    
+    def _store(self, session_id: str, entry: _SessionWindow) -> None:
+        self.invalidate(session_id)
+        self._sessions[session_id] = entry
+        self.size_bytes += entry.size_bytes
+        self._evict_oversize()
+    
+    def _evict_oversize(self) -> None:
+        # Always keep the most recently used session
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions or self.size_bytes > self.max_bytes
+        ):
+            session_id = next(iter(self._sessions))
+            self.invalidate(session_id)
+            self.evictions += 1
+
+window_cache = ConversationWindowCache(
+    window=settings.CHAT_WINDOW_CACHE_SIZE,
+    max_sessions=settings.CHAT_WINDOW_CACHE_MAX_SESSIONS,
+    max_bytes=settings.CHAT_WINDOW_CACHE_MAX_BYTES,
+    idle_timeout=settings.CHAT_WINDOW_CACHE_IDLE_SECONDS
+)
@@ -17,6 +17,23 @@ class Settings(BaseSettings):
     
     # Database settings
     DATABASE_URL: str = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/degenz")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Set when DATABASE_URL points at pgbouncer in transaction pooling mode,
+    # which cannot keep server-side prepared statements between transactions
+    DB_PGBOUNCER: bool = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+    
+    # Read replicas (DATABASE_REPLICA_URLS is a comma-separated list). Reads
+    # fall back to the primary when a replica lags more than
+    # DB_REPLICA_MAX_LAG_SECONDS, and a user's reads stay on the primary for
+    # DB_READ_YOUR_WRITES_SECONDS after they write
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    DB_REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+    DB_REPLICA_LAG_CHECK_SECONDS: float = float(os.getenv("DB_REPLICA_LAG_CHECK_SECONDS", "5"))
+    DB_READ_YOUR_WRITES_SECONDS: float = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "10"))
     
     # Redis settings
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://redis:6379/0")
@@ -32,6 +49,67 @@ class Settings(BaseSettings):
     
     # AI services
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
+    MODEL_CLIENT_IDLE_TIMEOUT_SECONDS: float = float(os.getenv("MODEL_CLIENT_IDLE_TIMEOUT_SECONDS", "600"))
+    MODEL_CLIENT_MAX_INSTANCES: int = int(os.getenv("MODEL_CLIENT_MAX_INSTANCES", "256"))
+    
+    # LLM response cache settings
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+    LLM_CACHE_TTL_SECONDS: float = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+    LLM_CACHE_MAX_TEMPERATURE: float = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.3"))
+    LLM_CACHE_REDIS_ENABLED: bool = os.getenv("LLM_CACHE_REDIS_ENABLED", "false").lower() == "true"
+    
+    # Share one upstream call between concurrent identical LLM requests
+    LLM_COALESCING_ENABLED: bool = os.getenv("LLM_COALESCING_ENABLED", "true").lower() == "true"
+    
+    # LLM rate limiting (LLM_RATE_LIMITS is a JSON object of per-provider
+    # overrides, e.g. {"openai": {"rpm": 500, "tpm": 90000, "concurrency": 50}})
+    LLM_RATE_LIMIT_ENABLED: bool = os.getenv("LLM_RATE_LIMIT_ENABLED", "true").lower() == "true"
+    LLM_RATE_LIMITS: str = os.getenv("LLM_RATE_LIMITS", "")
+    LLM_RATE_LIMIT_REDIS_ENABLED: bool = os.getenv("LLM_RATE_LIMIT_REDIS_ENABLED", "false").lower() == "true"
+    
+    # Provider failover (LLM_FALLBACK_PROVIDERS is a comma-separated list
+    # tried in order after the selected provider)
+    LLM_FALLBACK_PROVIDERS: str = os.getenv("LLM_FALLBACK_PROVIDERS", "gemini,openai,claude")
+    LLM_PROVIDER_TIMEOUT_SECONDS: float = float(os.getenv("LLM_PROVIDER_TIMEOUT_SECONDS", "60"))
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1.0"))
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    LLM_CIRCUIT_RESET_SECONDS: float = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+    
+    # Conflict resolution settings
+    CONFLICT_CONFIDENCE_THRESHOLD: float = float(os.getenv("CONFLICT_CONFIDENCE_THRESHOLD", "0.85"))
+    CONFLICT_SCORE_TIMEOUT_SECONDS: float = float(os.getenv("CONFLICT_SCORE_TIMEOUT_SECONDS", "10"))
+    CONFLICT_TOTAL_TIMEOUT_SECONDS: float = float(os.getenv("CONFLICT_TOTAL_TIMEOUT_SECONDS", "20"))
+    CONFLICT_SCORE_BATCH_SIZE: int = int(os.getenv("CONFLICT_SCORE_BATCH_SIZE", "10"))
+    
+    # Agent turn settings
+    AGENT_TURN_MAX_PARALLEL: int = int(os.getenv("AGENT_TURN_MAX_PARALLEL", "4"))
+    AGENT_TURN_TIMEOUT_SECONDS: float = float(os.getenv("AGENT_TURN_TIMEOUT_SECONDS", "60"))
+    AGENT_TURN_HISTORY_LIMIT: int = int(os.getenv("AGENT_TURN_HISTORY_LIMIT", "20"))
+    
+    # WebSocket broadcast settings (WS_SLOW_CONSUMER_POLICY is "drop" to
+    # discard a slow client's oldest queued frames or "disconnect" to close it)
+    WS_SEND_QUEUE_SIZE: int = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+    WS_SEND_TIMEOUT_SECONDS: float = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "10"))
+    WS_SLOW_CONSUMER_POLICY: str = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop")
+    # "memory" for a single worker, "redis" to share sessions between workers over REDIS_URL
+    CHAT_BROADCAST_BACKEND: str = os.getenv("CHAT_BROADCAST_BACKEND", "memory")
+    
+    # Recent message window cached per chat session
+    CHAT_WINDOW_CACHE_SIZE: int = int(os.getenv("CHAT_WINDOW_CACHE_SIZE", "50"))
+    CHAT_WINDOW_CACHE_MAX_SESSIONS: int = int(os.getenv("CHAT_WINDOW_CACHE_MAX_SESSIONS", "1000"))
+    CHAT_WINDOW_CACHE_MAX_BYTES: int = int(os.getenv("CHAT_WINDOW_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    CHAT_WINDOW_CACHE_IDLE_SECONDS: float = float(os.getenv("CHAT_WINDOW_CACHE_IDLE_SECONDS", "1800"))
+    
+    # Rolling conversation summary: unsummarized history over the token
+    # budget is folded into the summary, except the most recent messages
+    CHAT_COMPACTION_TOKEN_BUDGET: int = int(os.getenv("CHAT_COMPACTION_TOKEN_BUDGET", "3000"))
+    CHAT_COMPACTION_KEEP_RECENT: int = int(os.getenv("CHAT_COMPACTION_KEEP_RECENT", "6"))
+    
+    # Group commit of chat message writes
+    CHAT_WRITE_MAX_BATCH: int = int(os.getenv("CHAT_WRITE_MAX_BATCH", "100"))
+    CHAT_WRITE_MAX_DELAY_SECONDS: float = float(os.getenv("CHAT_WRITE_MAX_DELAY_SECONDS", "0.005"))
     
     # Frontend URL
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:3000")
@@ -41,6 +119,14 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_MINUTES: int = 60
     
+    # Authenticated-user cache: entries live AUTH_USER_CACHE_LOCAL_TTL_SECONDS
+    # in process and AUTH_USER_CACHE_TTL_SECONDS in Redis
+    AUTH_USER_CACHE_ENABLED: bool = os.getenv("AUTH_USER_CACHE_ENABLED", "true").lower() == "true"
+    AUTH_USER_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_USER_CACHE_MAX_ENTRIES", "10000"))
+    AUTH_USER_CACHE_TTL_SECONDS: float = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "60"))
+    AUTH_USER_CACHE_LOCAL_TTL_SECONDS: float = float(os.getenv("AUTH_USER_CACHE_LOCAL_TTL_SECONDS", "5"))
+    AUTH_USER_CACHE_REDIS_ENABLED: bool = os.getenv("AUTH_USER_CACHE_REDIS_ENABLED", "false").lower() == "true"
+    
     # CORS settings
     CORS_ORIGINS: list = [
         "http://localhost:3000",
@@ -1,28 +1,156 @@
-import os
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
+import time
+from uuid import uuid4
+from typing import Any, Dict, List, Tuple, Type
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-# Load environment variables
-load_dotenv()
+from app.config import settings
 
-# Get database URL from environment variable or use default
-DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/degenz")
+DATABASE_URL = settings.DATABASE_URL
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+def get_async_url(url: str) -> str:
+    """
+    Point a PostgreSQL URL at the asyncpg driver.
+    """
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class PoolMonitor:
+    """
+    Connection pool telemetry: how long requests wait for a connection and
+    how many are waiting right now. Gauges of the pool itself (in use, idle,
+    overflow) are read from the pool when stats are taken.
+    """
+    
+    def __init__(self):
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.last_wait_seconds = 0.0
+    
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+        self.last_wait_seconds = seconds
+    
+    def stats(self, pool: Any) -> Dict[str, float]:
+        """
+        Get pool gauges and checkout wait counters.
+        
+        wait_seconds_max is the longest wait since the process started.
+        Reading stats never resets anything, so any number of scrapers see
+        the same values.
+        """
+        return {
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "waiting": self.waiting,
+            "checkouts_total": self.checkouts,
+            "timeouts_total": self.timeouts,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_last": self.last_wait_seconds,
+            "wait_seconds_max": self.wait_seconds_max
+        }
 
-# Create base class for models
-Base = declarative_base()
+class MonitoredPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that reports checkout waits to its class's monitor.
+    """
+    
+    monitor: PoolMonitor
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        self.monitor.waiting += 1
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.monitor.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        finally:
+            self.monitor.waiting -= 1
+        self.monitor.record_wait(time.perf_counter() - started)
+        return connection
+
+def monitored_pool(monitor: PoolMonitor) -> Type[MonitoredPool]:
+    """
+    Get a pool class reporting to a monitor. The monitor is a class attribute
+    so it survives the pool being recreated on engine dispose.
+    """
+    return type("MonitoredPool", (MonitoredPool,), {"monitor": monitor})
+
+def get_connect_args() -> Dict[str, Any]:
+    """
+    Get asyncpg connection arguments.
+    
+    Behind pgbouncer in transaction pooling mode consecutive transactions
+    can run on different server connections, so prepared statements must
+    not be cached by either asyncpg or SQLAlchemy, and each needs a unique
+    name: asyncpg's default names restart per client connection and would
+    collide with statements another client left on the server connection.
+    """
+    if settings.DB_PGBOUNCER:
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__"
+        }
+    return {}
+
+def create_database_engine(url: str, monitor: PoolMonitor) -> AsyncEngine:
+    """
+    Create an async engine (asyncpg driver) with the configured pool.
+    """
+    return create_async_engine(
+        get_async_url(url),
+        poolclass=monitored_pool(monitor),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=get_connect_args()
+    )
+
+def create_session_factory(bind: AsyncEngine) -> async_sessionmaker:
+    # Loaded objects stay usable after commit so responses can be
+    # serialized without another round trip
+    return async_sessionmaker(bind, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Create the primary engine and session factory
+pool_monitor = PoolMonitor()
+engine = create_database_engine(DATABASE_URL, pool_monitor)
+AsyncSessionLocal = create_session_factory(engine)
+
+# Read replicas, named replica1, replica2, ... in DATABASE_REPLICA_URLS order
+replica_monitors: List[PoolMonitor] = []
+replica_engines: List[Tuple[str, AsyncEngine]] = []
+replica_urls = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+for index, url in enumerate(replica_urls, start=1):
+    replica_monitors.append(PoolMonitor())
+    replica_engines.append((f"replica{index}", create_database_engine(url, replica_monitors[-1])))
 
 # Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+def get_pool_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Get connection pool telemetry of the primary and each replica for the metrics endpoint.
+    """
+    stats = {"primary": pool_monitor.stats(engine.pool)}
+    for monitor, (name, replica_engine) in zip(replica_monitors, replica_engines):
+        stats[name] = monitor.stats(replica_engine.pool)
+    return stats
@@ -1,17 +1,23 @@
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import os
 import logging
 
 from app.config import settings
-from app.database import engine, Base
+from app.database import engine, replica_engines, get_pool_stats
+from app.replicas import replica_router
+from app.auth.cache import user_cache
 from app.auth.router import router as auth_router
 from app.agents.router import router as agents_router
 from app.prompts.router import router as prompts_router
 from app.marketplace.router import router as marketplace_router
 from app.sandbox.router import router as sandbox_router
-from app.chat.router import router as chat_router
+from app.chat.router import router as chat_router, manager as chat_manager
+from app.chat.message_writer import message_writer
+from app.chat.window_cache import window_cache
+from app.ai_models.http_client import close_http_client
+from app.ai_models.registry import model_registry
 
 # Setup logging
 logging.basicConfig(
@@ -20,9 +26,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
@@ -40,6 +43,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Prev-Cursor", "X-Next-Cursor"],
 )
 
 # Include routers
@@ -50,6 +54,17 @@ app.include_router(marketplace_router, prefix="/api")
 app.include_router(sandbox_router, prefix="/api")
 app.include_router(chat_router, prefix="/api")
 
+# Release pooled provider connections and WebSocket clients on shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    await chat_manager.close()
+    await message_writer.close()
+    model_registry.clear()
+    await close_http_client()
+    await engine.dispose()
+    for _, replica_engine in replica_engines:
+        await replica_engine.dispose()
+
 # Root endpoint
 @app.get("/", tags=["root"])
 async def root():
@@ -60,6 +75,45 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+# Metrics endpoint (Prometheus text format)
+@app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+async def metrics():
+    samples = {}
+    for database, stats in get_pool_stats().items():
+        for name, value in stats.items():
+            samples.setdefault(f"degenz_db_pool_{name}", []).append((database, value))
+    replicas = replica_router.stats()
+    for name, lag in replicas["lag_seconds"].items():
+        # -1 marks a replica that could not be checked
+        samples.setdefault("degenz_db_replica_lag_seconds", []).append((name, -1 if lag is None else lag))
+    samples["degenz_db_reads_total"] = [("replica", replicas["replica_reads"]), ("primary", replicas["primary_reads"])]
+    
+    lines = []
+    for metric, values in samples.items():
+        lines.append(f"# TYPE {metric} {'counter' if metric.endswith('_total') else 'gauge'}")
+        lines.extend(f'{metric}{{database="{database}"}} {value}' for database, value in values)
+    
+    users = user_cache.stats()
+    lines.append("# TYPE degenz_auth_user_cache_lookups_total counter")
+    lines.extend(f'degenz_auth_user_cache_lookups_total{{result="{result}"}} {users[result]}'
+                 for result in ("hits", "redis_hits", "misses"))
+    lines.append("# TYPE degenz_auth_user_cache_invalidations_total counter")
+    lines.append(f"degenz_auth_user_cache_invalidations_total {users['invalidations']}")
+    lines.append("# TYPE degenz_auth_user_cache_entries gauge")
+    lines.append(f"degenz_auth_user_cache_entries {users['entries']}")
+    
+    windows = window_cache.stats()
+    lines.append("# TYPE degenz_chat_window_cache_lookups_total counter")
+    lines.extend(f'degenz_chat_window_cache_lookups_total{{result="{result}"}} {windows[result]}'
+                 for result in ("hits", "misses"))
+    lines.append("# TYPE degenz_chat_window_cache_evictions_total counter")
+    lines.append(f"degenz_chat_window_cache_evictions_total {windows['evictions']}")
+    lines.append("# TYPE degenz_chat_window_cache_sessions gauge")
+    lines.append(f"degenz_chat_window_cache_sessions {windows['sessions']}")
+    lines.append("# TYPE degenz_chat_window_cache_size_bytes gauge")
+    lines.append(f"degenz_chat_window_cache_size_bytes {windows['size_bytes']}")
+    return "\n".join(lines) + "\n"
+
 # Error handlers
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
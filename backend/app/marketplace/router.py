@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
 import uuid
 import stripe
 
 from app.database import get_db
+from app.replicas import get_read_db
 from app.models import MarketplaceListing, Transaction, Agent, Prompt
 from app.auth.dependencies import get_current_active_user
 from app.config import settings
@@ -64,31 +66,31 @@ async def get_listings(
     limit: int = 100, 
     item_type: Optional[str] = None,
     tag: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user = Depends(get_current_active_user)
 ):
-    query = db.query(MarketplaceListing).filter(MarketplaceListing.status == "active")
+    query = select(MarketplaceListing).where(MarketplaceListing.status == "active")
     
     if item_type:
-        query = query.filter(MarketplaceListing.item_type == item_type)
+        query = query.where(MarketplaceListing.item_type == item_type)
     
     if tag:
-        query = query.filter(MarketplaceListing.tags.contains([tag]))
+        query = query.where(MarketplaceListing.tags.contains([tag]))
     
-    listings = query.offset(skip).limit(limit).all()
+    listings = (await db.scalars(query.offset(skip).limit(limit))).all()
     return listings
 
 @router.post("/listings", response_model=ListingResponse, status_code=status.HTTP_201_CREATED)
 async def create_listing(
     listing_data: ListingCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     # Verify item ownership
     if listing_data.item_type == "agent":
-        item = db.query(Agent).filter(Agent.id == listing_data.item_id, Agent.user_id == current_user.id).first()
+        item = await db.scalar(select(Agent).where(Agent.id == listing_data.item_id, Agent.user_id == current_user.id))
     elif listing_data.item_type == "prompt":
-        item = db.query(Prompt).filter(Prompt.id == listing_data.item_id, Prompt.user_id == current_user.id).first()
+        item = await db.scalar(select(Prompt).where(Prompt.id == listing_data.item_id, Prompt.user_id == current_user.id))
     else:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -108,18 +110,18 @@ async def create_listing(
     )
     
     db.add(new_listing)
-    db.commit()
-    db.refresh(new_listing)
+    await db.commit()
+    await db.refresh(new_listing)
     
     return new_listing
 
 @router.get("/listings/{listing_id}", response_model=ListingResponse)
 async def get_listing(
     listing_id: uuid.UUID, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user = Depends(get_current_active_user)
 ):
-    listing = db.query(MarketplaceListing).filter(MarketplaceListing.id == listing_id).first()
+    listing = await db.scalar(select(MarketplaceListing).where(MarketplaceListing.id == listing_id))
     
     if not listing:
         raise HTTPException(
@@ -133,13 +135,13 @@ async def get_listing(
 async def update_listing(
     listing_id: uuid.UUID, 
     listing_data: ListingUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    listing = db.query(MarketplaceListing).filter(
+    listing = await db.scalar(select(MarketplaceListing).where(
         MarketplaceListing.id == listing_id, 
         MarketplaceListing.user_id == current_user.id
-    ).first()
+    ))
     
     if not listing:
         raise HTTPException(
@@ -150,21 +152,21 @@ async def update_listing(
     for key, value in listing_data.dict(exclude_unset=True).items():
         setattr(listing, key, value)
     
-    db.commit()
-    db.refresh(listing)
+    await db.commit()
+    await db.refresh(listing)
     
     return listing
 
 @router.delete("/listings/{listing_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_listing(
     listing_id: uuid.UUID, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    listing = db.query(MarketplaceListing).filter(
+    listing = await db.scalar(select(MarketplaceListing).where(
         MarketplaceListing.id == listing_id, 
         MarketplaceListing.user_id == current_user.id
-    ).first()
+    ))
     
     if not listing:
         raise HTTPException(
@@ -172,21 +174,21 @@ async def delete_listing(
             detail="Listing not found or not owned by you"
         )
     
-    db.delete(listing)
-    db.commit()
+    await db.delete(listing)
+    await db.commit()
     
     return None
 
 @router.post("/purchase/{listing_id}", response_model=TransactionResponse)
 async def purchase_item(
     listing_id: uuid.UUID, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    listing = db.query(MarketplaceListing).filter(
+    listing = await db.scalar(select(MarketplaceListing).where(
         MarketplaceListing.id == listing_id,
         MarketplaceListing.status == "active"
-    ).first()
+    ))
     
     if not listing:
         raise HTTPException(
@@ -235,8 +237,8 @@ async def purchase_item(
     )
     
     db.add(transaction)
-    db.commit()
-    db.refresh(transaction)
+    await db.commit()
+    await db.refresh(transaction)
     
     # In a real implementation, we would handle the payment confirmation
     # via a webhook and then copy the agent/prompt to the buyer's account
@@ -245,16 +247,16 @@ async def purchase_item(
 
 @router.get("/purchases", response_model=List[TransactionResponse])
 async def get_purchases(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    transactions = db.query(Transaction).filter(Transaction.buyer_id == current_user.id).all()
+    transactions = (await db.scalars(select(Transaction).where(Transaction.buyer_id == current_user.id))).all()
     return transactions
 
 @router.get("/sales", response_model=List[TransactionResponse])
 async def get_sales(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    transactions = db.query(Transaction).filter(Transaction.seller_id == current_user.id).all()
+    transactions = (await db.scalars(select(Transaction).where(Transaction.seller_id == current_user.id))).all()
     return transactions
@@ -1,6 +1,6 @@
-from sqlalchemy import create_engine, Column, String, Integer, Float, Boolean, ForeignKey, DateTime, Text, ARRAY, JSON
+from sqlalchemy import create_engine, Column, String, Integer, Float, Boolean, ForeignKey, DateTime, Text, ARRAY, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import declarative_base
 from sqlalchemy.sql import func
 import uuid
 
@@ -26,7 +26,7 @@ class Agent(Base):
     system_prompt = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), index=True)
     is_public = Column(Boolean, default=False)
     configuration = Column(JSONB, default={})
 
@@ -40,8 +40,12 @@ class Prompt(Base):
     tags = Column(ARRAY(String))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), index=True)
     is_public = Column(Boolean, default=False)
+    
+    __table_args__ = (
+        Index("ix_prompts_tags", "tags", postgresql_using="gin"),
+    )
 
 class MarketplaceListing(Base):
     __tablename__ = "marketplace_listings"
@@ -58,13 +62,20 @@ class MarketplaceListing(Base):
     status = Column(String, default="active")
     tags = Column(ARRAY(String))
     preview_data = Column(JSONB)
+    
+    __table_args__ = (
+        # Marketplace browsing filters active listings by item type
+        Index("ix_marketplace_listings_status_item_type", "status", "item_type"),
+        # Tag filters use array containment (@>)
+        Index("ix_marketplace_listings_tags", "tags", postgresql_using="gin"),
+    )
 
 class Transaction(Base):
     __tablename__ = "transactions"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    buyer_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
-    seller_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+    buyer_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), index=True)
+    seller_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), index=True)
     listing_id = Column(UUID(as_uuid=True), ForeignKey("marketplace_listings.id"))
     amount = Column(Float, nullable=False)
     commission_amount = Column(Float, nullable=False)
@@ -78,16 +89,26 @@ class SandboxSession(Base):
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     configuration = Column(JSONB, default={})
 
+class ConversationSummary(Base):
+    __tablename__ = "conversation_summaries"
+    
+    # Server-side state of a session, kept out of the user-editable configuration
+    session_id = Column(UUID(as_uuid=True), ForeignKey("sandbox_sessions.id", ondelete="CASCADE"), primary_key=True)
+    text = Column(Text, nullable=False)
+    through = Column(String, nullable=False)  # cursor of the last message summarized
+    message_count = Column(Integer, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class SandboxAgent(Base):
     __tablename__ = "sandbox_agents"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    session_id = Column(UUID(as_uuid=True), ForeignKey("sandbox_sessions.id", ondelete="CASCADE"))
+    session_id = Column(UUID(as_uuid=True), ForeignKey("sandbox_sessions.id", ondelete="CASCADE"), index=True)
     agent_id = Column(UUID(as_uuid=True), ForeignKey("agents.id"))
     position_x = Column(Integer, default=0)
     position_y = Column(Integer, default=0)
@@ -102,4 +123,11 @@ class ChatMessage(Base):
     sender_id = Column(String, nullable=False)  # user_id or agent_id
     content = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    metadata = Column(JSONB, default={})
+    # "metadata" is reserved on declarative classes; the column keeps its name
+    metadata_ = Column("metadata", JSONB, default={})
+    
+    __table_args__ = (
+        # Keyset pagination of a session's history on (created_at, id); also
+        # serves (session_id, created_at) lookups as a prefix
+        Index("ix_chat_messages_session_created_id", "session_id", "created_at", "id"),
+    )
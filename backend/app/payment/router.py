@@ -4,6 +4,7 @@ from typing import Dict, Any, List, Optional
 import json
 import os
 from datetime import datetime, timedelta
+from sqlalchemy import select
 
 from app.auth.dependencies import get_current_user
 from app.models import User, Subscription, Transaction
@@ -68,7 +69,7 @@ async def create_subscription(
                 metadata=json.dumps(subscription)
             )
             db.add(db_subscription)
-            db.commit()
+            await db.commit()
             
             return {
                 "success": True,
@@ -98,7 +99,7 @@ async def create_subscription(
                 metadata=json.dumps(subscription)
             )
             db.add(db_subscription)
-            db.commit()
+            await db.commit()
             
             return {
                 "success": True,
@@ -122,7 +123,7 @@ async def get_subscriptions(
     Returns:
         List of subscription dictionaries
     """
-    subscriptions = db.query(Subscription).filter(Subscription.user_id == current_user.id).all()
+    subscriptions = (await db.scalars(select(Subscription).where(Subscription.user_id == current_user.id))).all()
     
     result = []
     for subscription in subscriptions:
@@ -132,7 +133,7 @@ async def get_subscriptions(
                 details = await paypal_client.get_subscription_details(subscription.subscription_id)
                 subscription.status = details["status"]
                 subscription.metadata = json.dumps(details)
-                db.commit()
+                await db.commit()
                 
                 result.append({
                     "id": subscription.id,
@@ -148,7 +149,7 @@ async def get_subscriptions(
                 details = await stripe_client.get_subscription_details(subscription.subscription_id)
                 subscription.status = details["status"]
                 subscription.metadata = json.dumps(details)
-                db.commit()
+                await db.commit()
                 
                 result.append({
                     "id": subscription.id,
@@ -191,10 +192,10 @@ async def cancel_subscription(
     Returns:
         Dictionary containing cancellation details
     """
-    subscription = db.query(Subscription).filter(
+    subscription = await db.scalar(select(Subscription).where(
         Subscription.subscription_id == subscription_id,
         Subscription.user_id == current_user.id
-    ).first()
+    ))
     
     if not subscription:
         raise HTTPException(status_code=404, detail="Subscription not found")
@@ -203,13 +204,13 @@ async def cancel_subscription(
         if subscription.provider == "paypal":
             result = await paypal_client.cancel_subscription(subscription_id, reason)
             subscription.status = "CANCELLED"
-            db.commit()
+            await db.commit()
             return result
         
         elif subscription.provider == "stripe":
             result = await stripe_client.cancel_subscription(subscription_id)
             subscription.status = "CANCELLED"
-            db.commit()
+            await db.commit()
             return result
         
         else:
@@ -242,11 +243,11 @@ async def get_transactions(
         end_date = datetime.now().strftime("%Y-%m-%d")
     
     # Get transactions from database
-    transactions = db.query(Transaction).filter(
+    transactions = (await db.scalars(select(Transaction).where(
         Transaction.user_id == current_user.id,
         Transaction.created_at >= datetime.strptime(start_date, "%Y-%m-%d"),
         Transaction.created_at <= datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
-    ).all()
+    ))).all()
     
     result = []
     for transaction in transactions:
@@ -341,45 +342,45 @@ async def process_paypal_event(event_data: Dict[str, Any], db):
     if event_type == "BILLING.SUBSCRIPTION.CREATED":
         # Subscription created
         subscription_id = resource.get("id")
-        subscription = db.query(Subscription).filter(Subscription.subscription_id == subscription_id).first()
+        subscription = await db.scalar(select(Subscription).where(Subscription.subscription_id == subscription_id))
         
         if subscription:
             subscription.status = resource.get("status")
             subscription.metadata = json.dumps(resource)
-            db.commit()
+            await db.commit()
     
     elif event_type == "BILLING.SUBSCRIPTION.ACTIVATED":
         # Subscription activated
         subscription_id = resource.get("id")
-        subscription = db.query(Subscription).filter(Subscription.subscription_id == subscription_id).first()
+        subscription = await db.scalar(select(Subscription).where(Subscription.subscription_id == subscription_id))
         
         if subscription:
             subscription.status = resource.get("status")
             subscription.metadata = json.dumps(resource)
-            db.commit()
+            await db.commit()
     
     elif event_type == "BILLING.SUBSCRIPTION.CANCELLED":
         # Subscription cancelled
         subscription_id = resource.get("id")
-        subscription = db.query(Subscription).filter(Subscription.subscription_id == subscription_id).first()
+        subscription = await db.scalar(select(Subscription).where(Subscription.subscription_id == subscription_id))
         
         if subscription:
             subscription.status = resource.get("status")
             subscription.metadata = json.dumps(resource)
-            db.commit()
+            await db.commit()
     
     elif event_type == "PAYMENT.SALE.COMPLETED":
         # Payment completed
         transaction_id = resource.get("id")
         
         # Check if transaction already exists
-        existing_transaction = db.query(Transaction).filter(Transaction.transaction_id == transaction_id).first()
+        existing_transaction = await db.scalar(select(Transaction).where(Transaction.transaction_id == transaction_id))
         if existing_transaction:
             return
         
         # Find the subscription this payment belongs to
         billing_agreement_id = resource.get("billing_agreement_id")
-        subscription = db.query(Subscription).filter(Subscription.subscription_id == billing_agreement_id).first()
+        subscription = await db.scalar(select(Subscription).where(Subscription.subscription_id == billing_agreement_id))
         
         if subscription:
             # Create a new transaction
@@ -395,7 +396,7 @@ async def process_paypal_event(event_data: Dict[str, Any], db):
                 metadata=json.dumps(resource)
             )
             db.add(transaction)
-            db.commit()
+            await db.commit()
 
 async def process_stripe_event(event_data: Dict[str, Any], db):
     """
@@ -407,45 +408,45 @@ async def process_stripe_event(event_data: Dict[str, Any], db):
     if event_type == "customer.subscription.created":
         # Subscription created
         subscription_id = object_data.get("id")
-        subscription = db.query(Subscription).filter(Subscription.subscription_id == subscription_id).first()
+        subscription = await db.scalar(select(Subscription).where(Subscription.subscription_id == subscription_id))
         
         if subscription:
             subscription.status = object_data.get("status")
             subscription.metadata = json.dumps(object_data)
-            db.commit()
+            await db.commit()
     
     elif event_type == "customer.subscription.updated":
         # Subscription updated
         subscription_id = object_data.get("id")
-        subscription = db.query(Subscription).filter(Subscription.subscription_id == subscription_id).first()
+        subscription = await db.scalar(select(Subscription).where(Subscription.subscription_id == subscription_id))
         
         if subscription:
             subscription.status = object_data.get("status")
             subscription.metadata = json.dumps(object_data)
-            db.commit()
+            await db.commit()
     
     elif event_type == "customer.subscription.deleted":
         # Subscription cancelled
         subscription_id = object_data.get("id")
-        subscription = db.query(Subscription).filter(Subscription.subscription_id == subscription_id).first()
+        subscription = await db.scalar(select(Subscription).where(Subscription.subscription_id == subscription_id))
         
         if subscription:
             subscription.status = "CANCELLED"
             subscription.metadata = json.dumps(object_data)
-            db.commit()
+            await db.commit()
     
     elif event_type == "invoice.payment_succeeded":
         # Payment succeeded
         transaction_id = object_data.get("id")
         
         # Check if transaction already exists
-        existing_transaction = db.query(Transaction).filter(Transaction.transaction_id == transaction_id).first()
+        existing_transaction = await db.scalar(select(Transaction).where(Transaction.transaction_id == transaction_id))
         if existing_transaction:
             return
         
         # Find the subscription this payment belongs to
         subscription_id = object_data.get("subscription")
-        subscription = db.query(Subscription).filter(Subscription.subscription_id == subscription_id).first()
+        subscription = await db.scalar(select(Subscription).where(Subscription.subscription_id == subscription_id))
         
         if subscription:
             # Create a new transaction
@@ -461,4 +462,4 @@ async def process_stripe_event(event_data: Dict[str, Any], db):
                 metadata=json.dumps(object_data)
             )
             db.add(transaction)
-            db.commit()
+            await db.commit()
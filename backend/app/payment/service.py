@@ -2,7 +2,8 @@ import os
 from typing import Dict, Any, Optional, List
 from app.models import User, Subscription, Transaction
 from app.database import get_db
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 class PaymentService:
     """
@@ -10,7 +11,7 @@ class PaymentService:
     Provides a unified interface for both PayPal and Stripe payment processing.
     """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         """
         Initialize the payment service.
         
@@ -54,7 +55,7 @@ class PaymentService:
                 metadata=json.dumps(subscription)
             )
             self.db.add(db_subscription)
-            self.db.commit()
+            await self.db.commit()
             
             return {
                 "success": True,
@@ -81,7 +82,7 @@ class PaymentService:
                 metadata=json.dumps(subscription)
             )
             self.db.add(db_subscription)
-            self.db.commit()
+            await self.db.commit()
             
             return {
                 "success": True,
@@ -104,7 +105,7 @@ class PaymentService:
         """
         from app.payment.router import paypal_client, stripe_client
         
-        subscriptions = self.db.query(Subscription).filter(Subscription.user_id == user.id).all()
+        subscriptions = (await self.db.scalars(select(Subscription).where(Subscription.user_id == user.id))).all()
         
         result = []
         for subscription in subscriptions:
@@ -114,7 +115,7 @@ class PaymentService:
                     details = await paypal_client.get_subscription_details(subscription.subscription_id)
                     subscription.status = details["status"]
                     subscription.metadata = json.dumps(details)
-                    self.db.commit()
+                    await self.db.commit()
                     
                     result.append({
                         "id": subscription.id,
@@ -130,7 +131,7 @@ class PaymentService:
                     details = await stripe_client.get_subscription_details(subscription.subscription_id)
                     subscription.status = details["status"]
                     subscription.metadata = json.dumps(details)
-                    self.db.commit()
+                    await self.db.commit()
                     
                     result.append({
                         "id": subscription.id,
@@ -170,10 +171,10 @@ class PaymentService:
         """
         from app.payment.router import paypal_client, stripe_client
         
-        subscription = self.db.query(Subscription).filter(
+        subscription = await self.db.scalar(select(Subscription).where(
             Subscription.subscription_id == subscription_id,
             Subscription.user_id == user.id
-        ).first()
+        ))
         
         if not subscription:
             raise ValueError("Subscription not found")
@@ -181,13 +182,13 @@ class PaymentService:
         if subscription.provider == "paypal":
             result = await paypal_client.cancel_subscription(subscription_id, reason)
             subscription.status = "CANCELLED"
-            self.db.commit()
+            await self.db.commit()
             return result
         
         elif subscription.provider == "stripe":
             result = await stripe_client.cancel_subscription(subscription_id)
             subscription.status = "CANCELLED"
-            self.db.commit()
+            await self.db.commit()
             return result
         
         else:
@@ -213,11 +214,11 @@ class PaymentService:
             end_date = datetime.now().strftime("%Y-%m-%d")
         
         # Get transactions from database
-        transactions = self.db.query(Transaction).filter(
+        transactions = (await self.db.scalars(select(Transaction).where(
             Transaction.user_id == user.id,
             Transaction.created_at >= datetime.strptime(start_date, "%Y-%m-%d"),
             Transaction.created_at <= datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
-        ).all()
+        ))).all()
         
         result = []
         for transaction in transactions:
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
 import uuid
 
 from app.database import get_db
+from app.replicas import get_read_db
 from app.models import Prompt
 from app.auth.dependencies import get_current_active_user
 
@@ -38,16 +40,16 @@ class PromptResponse(PromptBase):
 async def get_prompts(
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user = Depends(get_current_active_user)
 ):
-    prompts = db.query(Prompt).filter(Prompt.user_id == current_user.id).offset(skip).limit(limit).all()
+    prompts = (await db.scalars(select(Prompt).where(Prompt.user_id == current_user.id).offset(skip).limit(limit))).all()
     return prompts
 
 @router.post("/", response_model=PromptResponse, status_code=status.HTTP_201_CREATED)
 async def create_prompt(
     prompt_data: PromptCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     new_prompt = Prompt(
@@ -56,18 +58,18 @@ async def create_prompt(
     )
     
     db.add(new_prompt)
-    db.commit()
-    db.refresh(new_prompt)
+    await db.commit()
+    await db.refresh(new_prompt)
     
     return new_prompt
 
 @router.get("/{prompt_id}", response_model=PromptResponse)
 async def get_prompt(
     prompt_id: uuid.UUID, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    prompt = db.query(Prompt).filter(Prompt.id == prompt_id, Prompt.user_id == current_user.id).first()
+    prompt = await db.scalar(select(Prompt).where(Prompt.id == prompt_id, Prompt.user_id == current_user.id))
     
     if not prompt:
         raise HTTPException(
@@ -81,10 +83,10 @@ async def get_prompt(
 async def update_prompt(
     prompt_id: uuid.UUID, 
     prompt_data: PromptUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    prompt = db.query(Prompt).filter(Prompt.id == prompt_id, Prompt.user_id == current_user.id).first()
+    prompt = await db.scalar(select(Prompt).where(Prompt.id == prompt_id, Prompt.user_id == current_user.id))
     
     if not prompt:
         raise HTTPException(
@@ -95,18 +97,18 @@ async def update_prompt(
     for key, value in prompt_data.dict().items():
         setattr(prompt, key, value)
     
-    db.commit()
-    db.refresh(prompt)
+    await db.commit()
+    await db.refresh(prompt)
     
     return prompt
 
 @router.delete("/{prompt_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_prompt(
     prompt_id: uuid.UUID, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    prompt = db.query(Prompt).filter(Prompt.id == prompt_id, Prompt.user_id == current_user.id).first()
+    prompt = await db.scalar(select(Prompt).where(Prompt.id == prompt_id, Prompt.user_id == current_user.id))
     
     if not prompt:
         raise HTTPException(
@@ -114,18 +116,18 @@ async def delete_prompt(
             detail="Prompt not found"
         )
     
-    db.delete(prompt)
-    db.commit()
+    await db.delete(prompt)
+    await db.commit()
     
     return None
 
 @router.post("/{prompt_id}/duplicate", response_model=PromptResponse)
 async def duplicate_prompt(
     prompt_id: uuid.UUID, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    prompt = db.query(Prompt).filter(Prompt.id == prompt_id, Prompt.user_id == current_user.id).first()
+    prompt = await db.scalar(select(Prompt).where(Prompt.id == prompt_id, Prompt.user_id == current_user.id))
     
     if not prompt:
         raise HTTPException(
@@ -143,7 +145,7 @@ async def duplicate_prompt(
     )
     
     db.add(new_prompt)
-    db.commit()
-    db.refresh(new_prompt)
+    await db.commit()
+    await db.refresh(new_prompt)
     
     return new_prompt
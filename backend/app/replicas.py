@@ -0,0 +1,168 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import Depends
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.auth.dependencies import get_current_active_user
+from app.config import settings
+from app.database import AsyncSessionLocal, create_session_factory, replica_engines
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary; 0 when it has replayed
+# everything it received, NULL when it is not a standby at all
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+class _Replica:
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.session_factory = create_session_factory(engine)
+        self.lag: Optional[float] = None
+        self.checked_at = 0.0
+        self.lock = asyncio.Lock()
+
+class ReplicaRouter:
+    """
+    Routes read-only sessions to read replicas.
+    
+    Replicas are used round robin. Each replica's replication lag is checked
+    at most every lag_check_interval seconds; replicas that lag more than
+    max_lag, or cannot be reached, are skipped, and with no usable replica
+    reads go to the primary. After a user writes, their reads go to the
+    primary for sticky_seconds so they always see their own changes.
+    
+    Stickiness is tracked per process: a user's next request handled by
+    another worker only gets the max_lag guarantee.
+    """
+    
+    def __init__(self, replicas: List[Tuple[str, AsyncEngine]], max_lag: float = 5.0,
+                 lag_check_interval: float = 5.0, sticky_seconds: float = 10.0,
+                 primary_factory: async_sessionmaker = AsyncSessionLocal):
+        """
+        Initialize the router.
+        
+        Args:
+            replicas: (name, engine) of each read replica
+            max_lag: Replication lag in seconds above which a replica is skipped
+            lag_check_interval: Seconds between lag checks of a replica
+            sticky_seconds: Seconds a user's reads stay on the primary after a write
+            primary_factory: Session factory of the primary
+        """
+        self.replicas = [_Replica(name, engine) for name, engine in replicas]
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self.sticky_seconds = sticky_seconds
+        self.primary_factory = primary_factory
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self._next = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self._sticky: Dict[str, float] = {}
+    
+    def mark_write(self, user_id: Any) -> None:
+        """
+        Keep a user's reads on the primary for the next sticky_seconds.
+        """
+        now = time.monotonic()
+        if len(self._sticky) > 10000:
+            self._sticky = {key: until for key, until in self._sticky.items() if until > now}
+        self._sticky[str(user_id)] = now + self.sticky_seconds
+    
+    def is_sticky(self, user_id: Any) -> bool:
+        """
+        Check whether a user wrote within the last sticky_seconds.
+        """
+        until = self._sticky.get(str(user_id))
+        return until is not None and until > time.monotonic()
+    
+    async def session_for_read(self, user_id: Optional[Any] = None) -> AsyncSession:
+        """
+        Get a session for read-only queries.
+        
+        Args:
+            user_id: The user the reads are for, for read-your-writes
+        
+        Returns:
+            A session on a replica that is up to date enough, or on the primary
+        """
+        if self.replicas and not (user_id is not None and self.is_sticky(user_id)):
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[next(self._next)]
+                lag = await self._lag(replica)
+                if lag is not None and lag <= self.max_lag:
+                    self.replica_reads += 1
+                    return replica.session_factory()
+        
+        self.primary_reads += 1
+        return self.primary_factory()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get read counters and the last measured lag of each replica.
+        """
+        return {
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "sticky_users": len(self._sticky),
+            "lag_seconds": {replica.name: replica.lag for replica in self.replicas}
+        }
+    
+    async def _lag(self, replica: _Replica) -> Optional[float]:
+        if time.monotonic() - replica.checked_at < self.lag_check_interval:
+            return replica.lag
+        
+        async with replica.lock:
+            # Another request may have checked while we waited for the lock
+            if time.monotonic() - replica.checked_at < self.lag_check_interval:
+                return replica.lag
+            try:
+                async with replica.engine.connect() as conn:
+                    lag = (await conn.execute(REPLICA_LAG_QUERY)).scalar()
+                replica.lag = float(lag) if lag is not None else 0.0
+            except Exception as e:
+                logger.warning(f"Lag check of read replica {replica.name} failed: {e!r}")
+                replica.lag = None
+            replica.checked_at = time.monotonic()
+            return replica.lag
+
+replica_router = ReplicaRouter(
+    replica_engines,
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+    lag_check_interval=settings.DB_REPLICA_LAG_CHECK_SECONDS,
+    sticky_seconds=settings.DB_READ_YOUR_WRITES_SECONDS
+)
+
+# Request sessions carry the authenticated user in info["user_id"] (set by
+# get_current_user); a commit that wrote anything makes that user sticky
+@event.listens_for(Session, "after_flush")
+def _flushed_write(session: Session, flush_context: Any) -> None:
+    session.info["wrote"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _executed_write(orm_execute_state: Any) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(Session, "after_commit")
+def _committed_write(session: Session) -> None:
+    if session.info.pop("wrote", False) and session.info.get("user_id") is not None:
+        replica_router.mark_write(session.info["user_id"])
+
+@event.listens_for(Session, "after_rollback")
+def _rolled_back(session: Session) -> None:
+    session.info.pop("wrote", None)
+
+# Dependency to get a read-only database session
+async def get_read_db(current_user = Depends(get_current_active_user)) -> AsyncIterator[AsyncSession]:
+    db = await replica_router.session_for_read(current_user.id)
+    async with db:
+        yield db
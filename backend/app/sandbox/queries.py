@@ -0,0 +1,167 @@
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, exists, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models import Agent, SandboxAgent, SandboxSession
+
+# Shared queries for routes nested under a sandbox session. Each folds the
+# session ownership check into the statement that reads or writes the data,
+# so a request costs one round trip instead of a lookup followed by the
+# real query. Writes use RETURNING instead of a refresh.
+
+def session_owned(session_id: Any, user_id: Any) -> ColumnElement:
+    """
+    EXISTS predicate that is true when the session belongs to the user.
+    """
+    return exists().where(SandboxSession.id == session_id, SandboxSession.user_id == user_id)
+
+def agent_visible(agent_id: Any, user_id: Any) -> ColumnElement:
+    """
+    Predicate for an agent the user owns or that is public.
+    """
+    return and_(Agent.id == agent_id, (Agent.user_id == user_id) | (Agent.is_public == True))
+
+async def get_owned_session(db: AsyncSession, session_id: Any, user_id: Any) -> Optional[SandboxSession]:
+    """
+    Get a session if it belongs to the user.
+    """
+    return await db.scalar(
+        select(SandboxSession).where(SandboxSession.id == session_id, SandboxSession.user_id == user_id)
+    )
+
+async def get_session_with_agent(db: AsyncSession, session_id: Any, user_id: Any,
+                                 agent_id: Any) -> Tuple[Optional[SandboxSession], Optional[Agent]]:
+    """
+    Get an owned session together with an agent the user may use in it.
+    
+    Returns:
+        The session (None if not found or not owned) and the agent (None if
+        not found, not owned and not public)
+    """
+    row = (await db.execute(
+        select(SandboxSession, Agent).outerjoin(Agent, agent_visible(agent_id, user_id)).where(
+            SandboxSession.id == session_id, SandboxSession.user_id == user_id
+        )
+    )).first()
+    return (row[0], row[1]) if row else (None, None)
+
+async def list_session_agents(db: AsyncSession, session_id: Any, user_id: Any) -> Optional[List[SandboxAgent]]:
+    """
+    Get the agents placed in a session.
+    
+    Returns:
+        The agents, or None if the session is not found or not owned
+    """
+    rows = (await db.execute(
+        select(SandboxSession.id, SandboxAgent).outerjoin(
+            SandboxAgent, SandboxAgent.session_id == SandboxSession.id
+        ).where(SandboxSession.id == session_id, SandboxSession.user_id == user_id)
+    )).all()
+    if not rows:
+        return None
+    return [sandbox_agent for _, sandbox_agent in rows if sandbox_agent is not None]
+
+async def create_session(db: AsyncSession, user_id: Any, values: Dict[str, Any]) -> SandboxSession:
+    """
+    Insert a session and return it with its server-side defaults.
+    """
+    return await db.scalar(
+        insert(SandboxSession).values(**values, user_id=user_id).returning(SandboxSession)
+    )
+
+async def update_session(db: AsyncSession, session_id: Any, user_id: Any,
+                         values: Dict[str, Any]) -> Optional[SandboxSession]:
+    """
+    Update an owned session.
+    
+    Returns:
+        The updated session, or None if it is not found or not owned
+    """
+    return await db.scalar(
+        update(SandboxSession).where(
+            SandboxSession.id == session_id, SandboxSession.user_id == user_id
+        ).values(**values).returning(SandboxSession)
+    )
+
+async def delete_session(db: AsyncSession, session_id: Any, user_id: Any) -> bool:
+    """
+    Delete an owned session.
+    
+    Returns:
+        False if the session is not found or not owned
+    """
+    deleted = await db.scalar(
+        delete(SandboxSession).where(
+            SandboxSession.id == session_id, SandboxSession.user_id == user_id
+        ).returning(SandboxSession.id)
+    )
+    return deleted is not None
+
+async def add_session_agent(db: AsyncSession, session_id: Any, user_id: Any,
+                            values: Dict[str, Any]) -> Optional[SandboxAgent]:
+    """
+    Place an agent in an owned session, if the user may use the agent.
+    
+    The row is inserted with INSERT ... SELECT guarded by both checks.
+    
+    Returns:
+        The new sandbox agent, or None if the session or the agent failed
+        its check (see session_missing)
+    """
+    values = {"id": uuid.uuid4(), "session_id": session_id, **values}
+    columns = list(values)
+    source = select(*[_literal(column, value) for column, value in values.items()]).where(
+        session_owned(session_id, user_id),
+        exists().where(agent_visible(values["agent_id"], user_id))
+    )
+    return await db.scalar(
+        insert(SandboxAgent).from_select(columns, source).returning(SandboxAgent)
+    )
+
+async def update_session_agent(db: AsyncSession, session_id: Any, user_id: Any, sandbox_agent_id: Any,
+                               values: Dict[str, Any]) -> Optional[SandboxAgent]:
+    """
+    Update an agent placed in an owned session.
+    
+    Returns:
+        The updated sandbox agent, or None if the session is not owned or
+        does not contain the agent (see session_missing)
+    """
+    return await db.scalar(
+        update(SandboxAgent).where(
+            SandboxAgent.id == sandbox_agent_id,
+            SandboxAgent.session_id == session_id,
+            session_owned(session_id, user_id)
+        ).values(**values).returning(SandboxAgent)
+    )
+
+async def remove_session_agent(db: AsyncSession, session_id: Any, user_id: Any, sandbox_agent_id: Any) -> bool:
+    """
+    Remove an agent from an owned session.
+    
+    Returns:
+        False if the session is not owned or does not contain the agent
+    """
+    deleted = await db.scalar(
+        delete(SandboxAgent).where(
+            SandboxAgent.id == sandbox_agent_id,
+            SandboxAgent.session_id == session_id,
+            session_owned(session_id, user_id)
+        ).returning(SandboxAgent.id)
+    )
+    return deleted is not None
+
+async def session_missing(db: AsyncSession, session_id: Any, user_id: Any) -> bool:
+    """
+    Check whether a session is not found or not owned. Only run on error paths,
+    to tell a missing session from a missing row inside it.
+    """
+    return not await db.scalar(select(session_owned(session_id, user_id)))
+
+def _literal(column: str, value: Any) -> ColumnElement:
+    # Bind a value with its column's type so INSERT ... SELECT keeps
+    # UUID and JSONB values intact
+    return literal(value, type_=SandboxAgent.__table__.c[column].type).label(column)
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
 import uuid
-import json
 
 from app.database import get_db
-from app.models import SandboxSession, SandboxAgent, Agent, ChatMessage
+from app.models import SandboxSession
 from app.auth.dependencies import get_current_active_user
+from app.chat.window_cache import window_cache
+from app.sandbox import queries
 
 router = APIRouter(prefix="/sandbox", tags=["sandbox"])
 
@@ -61,39 +63,30 @@ class AgentPositionUpdate(BaseModel):
 async def get_sessions(
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    sessions = db.query(SandboxSession).filter(SandboxSession.user_id == current_user.id).offset(skip).limit(limit).all()
+    sessions = (await db.scalars(select(SandboxSession).where(SandboxSession.user_id == current_user.id).offset(skip).limit(limit))).all()
     return sessions
 
 @router.post("/sessions", response_model=SandboxSessionResponse, status_code=status.HTTP_201_CREATED)
 async def create_session(
     session_data: SandboxSessionCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    new_session = SandboxSession(
-        **session_data.dict(),
-        user_id=current_user.id
-    )
-    
-    db.add(new_session)
-    db.commit()
-    db.refresh(new_session)
+    new_session = await queries.create_session(db, current_user.id, session_data.dict())
+    await db.commit()
     
     return new_session
 
 @router.get("/sessions/{session_id}", response_model=SandboxSessionResponse)
 async def get_session(
     session_id: uuid.UUID, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    session = db.query(SandboxSession).filter(
-        SandboxSession.id == session_id,
-        SandboxSession.user_id == current_user.id
-    ).first()
+    session = await queries.get_owned_session(db, session_id, current_user.id)
     
     if not session:
         raise HTTPException(
@@ -107,13 +100,10 @@ async def get_session(
 async def update_session(
     session_id: uuid.UUID, 
     session_data: SandboxSessionUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    session = db.query(SandboxSession).filter(
-        SandboxSession.id == session_id,
-        SandboxSession.user_id == current_user.id
-    ).first()
+    session = await queries.update_session(db, session_id, current_user.id, session_data.dict())
     
     if not session:
         raise HTTPException(
@@ -121,96 +111,67 @@ async def update_session(
             detail="Session not found or not owned by you"
         )
     
-    for key, value in session_data.dict().items():
-        setattr(session, key, value)
-    
-    db.commit()
-    db.refresh(session)
+    await db.commit()
     
     return session
 
 @router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_session(
     session_id: uuid.UUID, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    session = db.query(SandboxSession).filter(
-        SandboxSession.id == session_id,
-        SandboxSession.user_id == current_user.id
-    ).first()
-    
-    if not session:
+    if not await queries.delete_session(db, session_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Session not found or not owned by you"
         )
     
-    db.delete(session)
-    db.commit()
+    await db.commit()
+    window_cache.invalidate(str(session_id))
     
     return None
 
 @router.get("/sessions/{session_id}/agents", response_model=List[SandboxAgentResponse])
 async def get_session_agents(
     session_id: uuid.UUID, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    # Verify session ownership
-    session = db.query(SandboxSession).filter(
-        SandboxSession.id == session_id,
-        SandboxSession.user_id == current_user.id
-    ).first()
+    # Session ownership is checked in the same query
+    agents = await queries.list_session_agents(db, session_id, current_user.id)
     
-    if not session:
+    if agents is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Session not found or not owned by you"
         )
     
-    agents = db.query(SandboxAgent).filter(SandboxAgent.session_id == session_id).all()
     return agents
 
 @router.post("/sessions/{session_id}/agents", response_model=SandboxAgentResponse, status_code=status.HTTP_201_CREATED)
 async def add_agent_to_session(
     session_id: uuid.UUID, 
     agent_data: SandboxAgentCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    # Verify session ownership
-    session = db.query(SandboxSession).filter(
-        SandboxSession.id == session_id,
-        SandboxSession.user_id == current_user.id
-    ).first()
-    
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Session not found or not owned by you"
-        )
-    
-    # Verify agent ownership or public status
-    agent = db.query(Agent).filter(
-        Agent.id == agent_data.agent_id,
-        (Agent.user_id == current_user.id) | (Agent.is_public == True)
-    ).first()
-    
-    if not agent:
+    # Session ownership and agent ownership or public status are checked
+    # by the insert itself
+    new_sandbox_agent = await queries.add_session_agent(db, session_id, current_user.id, agent_data.dict())
+    
+    if not new_sandbox_agent:
+        if await queries.session_missing(db, session_id, current_user.id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Session not found or not owned by you"
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Agent not found, not owned by you, or not public"
         )
     
-    new_sandbox_agent = SandboxAgent(
-        session_id=session_id,
-        **agent_data.dict()
-    )
-    
-    db.add(new_sandbox_agent)
-    db.commit()
-    db.refresh(new_sandbox_agent)
+    await db.commit()
     
     return new_sandbox_agent
 
@@ -218,34 +179,22 @@ async def add_agent_to_session(
 async def remove_agent_from_session(
     session_id: uuid.UUID, 
     agent_id: uuid.UUID, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    # Verify session ownership
-    session = db.query(SandboxSession).filter(
-        SandboxSession.id == session_id,
-        SandboxSession.user_id == current_user.id
-    ).first()
-    
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Session not found or not owned by you"
-        )
-    
-    sandbox_agent = db.query(SandboxAgent).filter(
-        SandboxAgent.session_id == session_id,
-        SandboxAgent.id == agent_id
-    ).first()
-    
-    if not sandbox_agent:
+    # Session ownership is checked by the delete itself
+    if not await queries.remove_session_agent(db, session_id, current_user.id, agent_id):
+        if await queries.session_missing(db, session_id, current_user.id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Session not found or not owned by you"
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Agent not found in this session"
         )
     
-    db.delete(sandbox_agent)
-    db.commit()
+    await db.commit()
     
     return None
 
@@ -254,36 +203,25 @@ async def update_agent_position(
     session_id: uuid.UUID, 
     agent_id: uuid.UUID, 
     position_data: AgentPositionUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    # Verify session ownership
-    session = db.query(SandboxSession).filter(
-        SandboxSession.id == session_id,
-        SandboxSession.user_id == current_user.id
-    ).first()
-    
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Session not found or not owned by you"
-        )
-    
-    sandbox_agent = db.query(SandboxAgent).filter(
-        SandboxAgent.session_id == session_id,
-        SandboxAgent.id == agent_id
-    ).first()
+    # Session ownership is checked by the update itself
+    sandbox_agent = await queries.update_session_agent(
+        db, session_id, current_user.id, agent_id, position_data.dict()
+    )
     
     if not sandbox_agent:
+        if await queries.session_missing(db, session_id, current_user.id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Session not found or not owned by you"
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Agent not found in this session"
         )
     
-    sandbox_agent.position_x = position_data.position_x
-    sandbox_agent.position_y = position_data.position_y
-    
-    db.commit()
-    db.refresh(sandbox_agent)
+    await db.commit()
     
     return sandbox_agent
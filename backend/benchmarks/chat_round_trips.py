@@ -0,0 +1,125 @@
+"""
+Upstream calls and uncached input tokens per chat turn.
+
+Plays a conversation turn by turn against stubbed providers and reports
+what each turn costs upstream:
+
+- Gemini: calls per turn. The history is sent as one contents list, so this
+  stays at one however long the conversation gets; the previous per-message
+  send_message replay made one call per history message plus one.
+- Claude: input tokens that miss the prompt cache. The agent prefix is sent
+  as a cache_control block, so from the second turn on it is read from
+  Anthropic's cache; the same turns without the cache flag pay for the
+  whole prefix every time.
+
+Usage:
+    python -m benchmarks.chat_round_trips [--turns 40] [--prefix-words 2000]
+"""
+import argparse
+import asyncio
+import json
+from typing import Any, Dict, List, Set
+
+from app.agents.compiled import CompiledAgent
+from app.ai_models.claude_model import ClaudeModel
+from app.ai_models.gemini_model import GeminiModel
+from app.ai_models.http_client import close_http_client
+from app.ai_models.tokens import get_token_counter
+from benchmarks.stub_transport import StubGeminiClient, StubTransport, install, install_gemini
+
+def conversation(turns: int, prefix_words: int, cache: bool = True) -> List[List[Dict[str, Any]]]:
+    """
+    Build the message list sent on each turn of a conversation.
+    """
+    prefix = " ".join(["persona"] * prefix_words)
+    system = CompiledAgent("benchmark", None, prefix).messages()
+    if not cache:
+        system = [{key: value for key, value in message.items() if key != "cache"} for message in system]
+    
+    history: List[Dict[str, Any]] = []
+    requests = []
+    for turn in range(turns):
+        history.append({"role": "user", "content": f"Question {turn}"})
+        requests.append(system + list(history))
+        history.append({"role": "assistant", "content": f"Answer {turn}"})
+    return requests
+
+async def gemini_calls_per_turn(turns: int, prefix_words: int) -> List[int]:
+    """
+    Count the upstream Gemini calls made on each turn.
+    """
+    stub = StubGeminiClient()
+    model = GeminiModel(api_key="benchmark")
+    install_gemini(model, stub)
+    
+    calls = []
+    for messages in conversation(turns, prefix_words):
+        before = len(stub.requests)
+        await model.generate_chat_response(messages)
+        calls.append(len(stub.requests) - before)
+    return calls
+
+def cacheable_prefix(body: Dict[str, Any]) -> str:
+    """
+    Get the system text up to and including the last cache_control block.
+    """
+    system = body.get("system")
+    if not isinstance(system, list):
+        return ""
+    marked = [i for i, block in enumerate(system) if "cache_control" in block]
+    return "".join(block["text"] for block in system[:marked[-1] + 1]) if marked else ""
+
+async def claude_uncached_tokens(turns: int, prefix_words: int, cache: bool) -> List[int]:
+    """
+    Estimate the input tokens of each Claude turn that miss the prompt cache.
+    """
+    transport = StubTransport(latency=0.0)
+    install(transport)
+    model = ClaudeModel(api_key="benchmark")
+    counter = get_token_counter("claude")
+    
+    try:
+        for messages in conversation(turns, prefix_words, cache=cache):
+            await model.generate_chat_response(messages)
+    finally:
+        await close_http_client()
+    
+    cached: Set[str] = set()
+    uncached = []
+    for request in transport.requests:
+        body = request["body"]
+        total = counter.count_text(json.dumps(body.get("system", ""))) + counter.count_messages(body["messages"])
+        prefix = cacheable_prefix(body)
+        if prefix in cached:
+            total -= counter.count_text(prefix)
+        elif prefix:
+            cached.add(prefix)
+        uncached.append(total)
+    return uncached
+
+async def run(turns: int, prefix_words: int) -> Dict[str, List[int]]:
+    return {
+        "gemini_calls": await gemini_calls_per_turn(turns, prefix_words),
+        "claude_cached": await claude_uncached_tokens(turns, prefix_words, cache=True),
+        "claude_uncached": await claude_uncached_tokens(turns, prefix_words, cache=False),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--prefix-words", type=int, default=2000, help="Number of words in the agent prefix")
+    args = parser.parse_args()
+    
+    results = asyncio.run(run(args.turns, args.prefix_words))
+    gemini_calls = results["gemini_calls"]
+    replayed = sum(len(messages) + 1 for messages in conversation(args.turns, args.prefix_words))
+    print(f"{args.turns} turns, {args.prefix_words} word agent prefix")
+    print(f"gemini: {sum(gemini_calls)} upstream calls ({max(gemini_calls)} per turn at most); "
+          f"per-message replay would make {replayed}")
+    cached, uncached = sum(results["claude_cached"]), sum(results["claude_uncached"])
+    print(f"claude: {len(results['claude_cached'])} upstream calls; "
+          f"{cached} uncached input tokens with the prefix cached, {uncached} without "
+          f"({100 * (1 - cached / uncached):.0f}% fewer)")
+
+if __name__ == "__main__":
+    main()
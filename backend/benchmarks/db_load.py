@@ -0,0 +1,241 @@
+"""
+Requests per second of a database-backed route at a fixed p99.
+
+Serves the same lookup through two FastAPI routes, in process:
+
+- blocking: a synchronous Session queried inside an async def route, the way
+  every router worked before the move to async SQLAlchemy. Each query
+  freezes the event loop, so requests are served one at a time.
+- async: an AsyncSession from create_session_factory and
+  sandbox.queries.get_owned_session, as the routers do now.
+
+Both run against the same SQLite file with a simulated round-trip latency
+added to every statement (slept in the driver's thread, like network time
+on a real connection). Concurrency is swept upwards and the best throughput
+whose p99 stays under the target is reported for each route.
+
+Usage:
+    python -m benchmarks.db_load [--latency 0.005] [--p99 0.1] [--duration 2]
+"""
+import argparse
+import asyncio
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, List
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+import benchmarks.sqlite_types  # noqa: F401  (PostgreSQL column types on SQLite)
+from app.database import create_session_factory
+from app.models import SandboxSession, User
+from app.sandbox.queries import get_owned_session
+
+POOL_SIZE = 20
+CONCURRENCY = [1, 4, 16, 64]
+
+class QueryTracker:
+    """
+    Counts the queries of one route and the most that were ever in flight
+    at once. Queries run in the connections' threads, so updates are locked.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+    
+    def simulate_latency(self, latency: float):
+        """
+        Get a sqlite3 trace callback that sleeps for every query.
+        """
+        def trace(statement: str) -> None:
+            if not statement.lstrip().upper().startswith(("SELECT", "INSERT", "UPDATE", "DELETE")):
+                return
+            with self.lock:
+                self.queries += 1
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                time.sleep(latency)
+            finally:
+                with self.lock:
+                    self.in_flight -= 1
+        return trace
+
+def build_app(path: str, latency: float) -> FastAPI:
+    """
+    Build an app with a blocking and an async route reading one session.
+    
+    app.state.trackers holds the QueryTracker of each route.
+    """
+    sync_engine = create_engine(f"sqlite:///{path}", poolclass=QueuePool, pool_size=POOL_SIZE, max_overflow=0)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool,
+                                       pool_size=POOL_SIZE, max_overflow=0)
+    
+    trackers = {"blocking": QueryTracker(), "async": QueryTracker()}
+    
+    @event.listens_for(sync_engine, "connect")
+    def on_sync_connect(dbapi_connection: Any, record: Any) -> None:
+        dbapi_connection.set_trace_callback(trackers["blocking"].simulate_latency(latency))
+    
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def on_async_connect(dbapi_connection: Any, record: Any) -> None:
+        trace = trackers["async"].simulate_latency(latency)
+        dbapi_connection.await_(dbapi_connection.driver_connection.set_trace_callback(trace))
+    
+    SyncSessionLocal = sessionmaker(sync_engine, autoflush=False, expire_on_commit=False)
+    AsyncSessionLocal = create_session_factory(async_engine)
+    
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+    
+    app = FastAPI()
+    app.state.engines = (sync_engine, async_engine)
+    app.state.trackers = trackers
+    
+    @app.get("/blocking/{user_id}/{session_id}")
+    async def read_blocking(user_id: uuid.UUID, session_id: uuid.UUID):
+        # Opened in the route rather than a sync dependency, which FastAPI
+        # would run in its thread pool
+        with SyncSessionLocal() as db:
+            session = db.scalar(
+                select(SandboxSession).where(SandboxSession.id == session_id, SandboxSession.user_id == user_id)
+            )
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return {"id": str(session.id), "name": session.name}
+    
+    @app.get("/async/{user_id}/{session_id}")
+    async def read_async(user_id: uuid.UUID, session_id: uuid.UUID, db: AsyncSession = Depends(get_async_db)):
+        session = await get_owned_session(db, session_id, user_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return {"id": str(session.id), "name": session.name}
+    
+    return app
+
+def seed(path: str) -> str:
+    """
+    Create the schema and one session; return the path of the session route.
+    """
+    engine = create_engine(f"sqlite:///{path}")
+    User.__table__.create(engine)
+    SandboxSession.__table__.create(engine)
+    user_id, session_id = uuid.uuid4(), uuid.uuid4()
+    with Session(engine) as db:
+        db.add_all([
+            User(id=user_id, email="load@example.com"),
+            SandboxSession(id=session_id, name="Load", user_id=user_id, configuration={})
+        ])
+        db.commit()
+    engine.dispose()
+    return f"{user_id}/{session_id}"
+
+class AppServer:
+    """
+    Serves an ASGI app on its own event loop in a background thread.
+    
+    The load generator runs on a different loop, so a route that blocks the
+    server's loop delays the requests queued behind it the way it would for
+    real clients, and their latency includes that wait.
+    """
+    
+    def __init__(self, app: FastAPI):
+        self.app = app
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+    
+    async def get(self, url: str) -> None:
+        """
+        Send a request from the caller's loop and wait for the response.
+        """
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._get(url), self.loop))
+    
+    async def _get(self, url: str) -> None:
+        response = await self.client.get(url)
+        response.raise_for_status()
+    
+    def close(self) -> None:
+        sync_engine, async_engine = self.app.state.engines
+        sync_engine.dispose()
+        # aiosqlite connections hold non-daemon threads until closed
+        for closing in [self.client.aclose(), async_engine.dispose()]:
+            asyncio.run_coroutine_threadsafe(closing, self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+async def drive(server: AppServer, url: str, concurrency: int, duration: float) -> Dict[str, float]:
+    """
+    Keep a fixed number of requests in flight for a while.
+    
+    Returns:
+        Requests per second and p99 latency in seconds
+    """
+    latencies: List[float] = []
+    deadline = time.perf_counter() + duration
+    
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await server.get(url)
+            latencies.append(time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {"rps": len(latencies) / elapsed, "p99": latencies[math.ceil(len(latencies) * 0.99) - 1]}
+
+async def run(latency: float, duration: float, concurrency: List[int] = CONCURRENCY) -> Dict[str, Dict[int, Dict[str, float]]]:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "load.db")
+        ids = seed(path)
+        server = AppServer(build_app(path, latency))
+        results: Dict[str, Dict[int, Dict[str, float]]] = {}
+        try:
+            for route in ["blocking", "async"]:
+                results[route] = {}
+                for level in concurrency:
+                    results[route][level] = await drive(server, f"/{route}/{ids}", level, duration)
+        finally:
+            server.close()
+        return results
+
+def best_under(results: Dict[int, Dict[str, float]], p99: float) -> float:
+    """
+    Get the highest requests per second whose p99 stays under the target.
+    """
+    return max((result["rps"] for result in results.values() if result["p99"] <= p99), default=0.0)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.005, help="Simulated query round trip in seconds")
+    parser.add_argument("--p99", type=float, default=0.1, help="p99 latency target in seconds")
+    parser.add_argument("--duration", type=float, default=2.0, help="Seconds per concurrency level")
+    args = parser.parse_args()
+    
+    results = asyncio.run(run(args.latency, args.duration))
+    print(f"{args.latency * 1000:.0f} ms per query, pool of {POOL_SIZE}")
+    print(f"{'route':<10} {'in flight':>9} {'req/s':>9} {'p99 ms':>9}")
+    for route, levels in results.items():
+        for level, result in levels.items():
+            print(f"{route:<10} {level:>9} {result['rps']:>9.1f} {result['p99'] * 1000:>9.1f}")
+    for route, levels in results.items():
+        print(f"{route}: {best_under(levels, args.p99):.1f} req/s at p99 <= {args.p99 * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Concurrent-call throughput of the model providers.
+
+Every provider sends its requests through the shared async HTTP client, so
+the benchmark swaps that client's transport for a stub with a fixed latency
+and fires many calls at once. The blocking run spends the same latency in
+time.sleep, reproducing the synchronous SDK calls the providers used to make
+inside async def: calls then complete one after another and the event loop
+is frozen for the whole run.
+
+Gemini talks gRPC through google-generativeai rather than the shared client
+and is not covered here.
+
+Usage:
+    python -m benchmarks.provider_concurrency [--calls 200] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, Type
+
+from app.ai_models.base import AIModelBase
+from app.ai_models.claude_model import ClaudeModel
+from app.ai_models.deepseek_model import DeepSeekModel
+from app.ai_models.grok_model import GrokModel
+from app.ai_models.http_client import close_http_client
+from app.ai_models.huggingface_model import HuggingfaceModel
+from app.ai_models.mistral_model import MistralAIModel
+from app.ai_models.openai_model import OpenAIModel
+from app.ai_models.openrouter_model import OpenrouterModel
+from app.ai_models.perplexity_model import PerplexityModel
+from benchmarks.stub_transport import StubTransport, install
+
+PROVIDERS: Dict[str, Type[AIModelBase]] = {
+    "openai": OpenAIModel,
+    "claude": ClaudeModel,
+    "mistral": MistralAIModel,
+    "deepseek": DeepSeekModel,
+    "grok": GrokModel,
+    "perplexity": PerplexityModel,
+    "openrouter": OpenrouterModel,
+    "huggingface": HuggingfaceModel,
+}
+
+async def measure(model_class: Type[AIModelBase], calls: int, latency: float, blocking: bool) -> float:
+    """
+    Fire concurrent generate_text calls and return completed calls per second.
+    """
+    install(StubTransport(latency=latency, blocking=blocking))
+    model = model_class(api_key="benchmark")
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*[model.generate_text(f"Prompt {i}") for i in range(calls)])
+    finally:
+        await close_http_client()
+    return calls / (time.perf_counter() - started)
+
+async def run(calls: int, latency: float) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, model_class in PROVIDERS.items():
+        results[name] = {
+            "blocking": await measure(model_class, calls, latency, blocking=True),
+            "async": await measure(model_class, calls, latency, blocking=False),
+        }
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated provider latency in seconds")
+    args = parser.parse_args()
+    
+    results = asyncio.run(run(args.calls, args.latency))
+    print(f"{args.calls} concurrent calls, {args.latency * 1000:.0f} ms provider latency")
+    print(f"{'provider':<12} {'blocking/s':>12} {'async/s':>12} {'speedup':>9}")
+    for name, result in results.items():
+        speedup = result["async"] / result["blocking"]
+        print(f"{name:<12} {result['blocking']:>12.1f} {result['async']:>12.1f} {speedup:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+from typing import Any
+
+from sqlalchemy import ARRAY
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.ext.compiler import compiles
+
+# The models use PostgreSQL column types; render them as SQLite types so
+# the schema can be created in a SQLite database. Importing this module
+# registers the rules.
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_: Any, compiler: Any, **kw: Any) -> str:
+    return "CHAR(32)"
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_: Any, compiler: Any, **kw: Any) -> str:
+    return "JSON"
+
+@compiles(ARRAY, "sqlite")
+def _array_on_sqlite(type_: Any, compiler: Any, **kw: Any) -> str:
+    return "JSON"
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+
+import httpx
+import google.ai.generativelanguage as glm
+
+from app.ai_models import http_client
+
+class StubTransport(httpx.AsyncBaseTransport):
+    """
+    Fake provider endpoint answering every request after a fixed latency.
+    
+    With blocking=True the latency is spent in time.sleep, which is what a
+    synchronous SDK or requests.post does when called from an async def.
+    Every request body is recorded so benchmarks can count upstream calls,
+    and peak_in_flight is the most requests that were ever in flight at once.
+    """
+    
+    def __init__(self, latency: float = 0.05, blocking: bool = False):
+        self.latency = latency
+        self.blocking = blocking
+        self.requests: List[Dict[str, Any]] = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content or b"{}")
+        self.requests.append({"url": str(request.url), "body": body})
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if self.blocking:
+                time.sleep(self.latency)
+            else:
+                await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        return httpx.Response(200, json=self.answer(request.url, body))
+    
+    def answer(self, url: httpx.URL, body: Dict[str, Any]) -> Any:
+        """
+        Build a minimal successful response in the provider's format.
+        """
+        if url.path.endswith("/messages"):
+            return {
+                "id": "msg_stub", "type": "message", "role": "assistant", "model": body.get("model"),
+                "content": [{"type": "text", "text": "0.5"}],
+                "stop_reason": "end_turn", "stop_sequence": None,
+                "usage": {"input_tokens": 0, "output_tokens": 1},
+            }
+        if url.host == "api-inference.huggingface.co":
+            return [{"generated_text": "0.5"}]
+        return {
+            "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": body.get("model"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "0.5"}}],
+        }
+
+def install(transport: StubTransport) -> None:
+    """
+    Route the shared provider HTTP client through the stub transport.
+    """
+    http_client._client = httpx.AsyncClient(transport=transport)
+
+class StubGeminiClient:
+    """
+    Fake google-generativeai async client counting generate_content calls.
+    
+    Gemini does not go through the shared HTTP client, so this stands in for
+    the SDK's gRPC client instead of the HTTP transport.
+    """
+    
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests: List[Any] = []
+    
+    async def generate_content(self, request: Any, **kwargs: Any) -> Any:
+        self.requests.append(request)
+        await asyncio.sleep(self.latency)
+        return glm.GenerateContentResponse(candidates=[
+            {"content": {"role": "model", "parts": [{"text": "0.5"}]}, "finish_reason": "STOP"}
+        ])
+
+def install_gemini(model: Any, stub: StubGeminiClient) -> None:
+    """
+    Make a GeminiModel call the stub client instead of its own.
+    """
+    model._client = stub
+    model._model = None
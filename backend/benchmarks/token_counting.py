@@ -0,0 +1,74 @@
+"""
+Token counting and context budgeting over long histories.
+
+Counts a 10k-message history with a fresh counter (every message
+tokenized), again with the same counter (memoized by message id), and times
+ContextBudgeter.fit on the warm counter, for a provider with an exact
+tokenizer and one using the characters-per-token estimate. OpenAI falls
+back to the estimate too when tiktoken is not installed.
+
+Usage:
+    python -m benchmarks.token_counting [--messages 10000] [--repeat 5]
+"""
+import argparse
+import random
+import time
+import uuid
+from typing import Any, Callable, Dict, List
+
+from app.ai_models.tokens import ContextBudgeter, TokenCounter
+
+WORDS = "the agent replied with a short plan covering budget scope risks and next steps".split()
+
+def make_history(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Build a chat history of messages with ids and 5 to 80 words of content.
+    """
+    rng = random.Random(seed)
+    return [
+        {"id": str(uuid.UUID(int=rng.getrandbits(128))), "role": rng.choice(["user", "assistant"]),
+         "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 80)))}
+        for _ in range(count)
+    ]
+
+def best_of(repeat: int, call: Callable[[], Any]) -> float:
+    """
+    Run a call several times and return its fastest time in milliseconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+def run(messages: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    history = make_history(messages)
+    fixed = [{"role": "system", "content": " ".join(WORDS * 50), "cache": True}]
+    
+    results = {}
+    for provider in ["openai", "gemini"]:
+        cold = best_of(repeat, lambda: TokenCounter(provider).count_messages(history))
+        counter = TokenCounter(provider)
+        counter.count_messages(history)
+        results[provider] = {
+            "cold_ms": cold,
+            "memoized_ms": best_of(repeat, lambda: counter.count_messages(history)),
+            "fit_ms": best_of(repeat, lambda: ContextBudgeter(counter).fit(fixed, history, 128000, 1000)),
+        }
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    results = run(args.messages, args.repeat)
+    print(f"{args.messages} messages, best of {args.repeat}")
+    print(f"{'provider':<10} {'cold ms':>10} {'memoized ms':>12} {'fit ms':>9}")
+    for provider, result in results.items():
+        print(f"{provider:<10} {result['cold_ms']:>10.2f} {result['memoized_ms']:>12.2f} {result['fit_ms']:>9.2f}")
+
+if __name__ == "__main__":
+    main()
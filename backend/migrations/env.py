@@ -0,0 +1,55 @@
+import asyncio
+
+from alembic import context
+from sqlalchemy import pool, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.database import get_async_url, get_connect_args
+from app.models import Base
+
+target_metadata = Base.metadata
+
+# Arbitrary key of the advisory lock that serializes concurrent migration runs
+MIGRATION_LOCK_KEY = 7246105
+
+def run_migrations_offline() -> None:
+    """
+    Emit the migration SQL without connecting (alembic upgrade head --sql).
+    """
+    context.configure(
+        url=get_async_url(settings.DATABASE_URL),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"}
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def do_run_migrations(connection) -> None:
+    context.configure(connection=connection, target_metadata=target_metadata, compare_type=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+async def run_migrations_online() -> None:
+    # The advisory lock is held by the session, so run migrations against
+    # PostgreSQL directly rather than through pgbouncer in transaction mode
+    connectable = create_async_engine(
+        get_async_url(settings.DATABASE_URL),
+        poolclass=pool.NullPool,
+        connect_args=get_connect_args()
+    )
+    async with connectable.connect() as connection:
+        await connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        await connection.commit()
+        try:
+            await connection.run_sync(do_run_migrations)
+        finally:
+            await connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            await connection.commit()
+    await connectable.dispose()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
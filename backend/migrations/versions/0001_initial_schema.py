@@ -0,0 +1,120 @@
+"""Initial schema
+
+The tables as the application created them before migrations were
+introduced, so existing databases can be stamped at this revision. Every
+index is added by later revisions.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def timestamps():
+    return [
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    ]
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False, unique=True),
+        *timestamps(),
+        sa.Column("subscription_tier", sa.String()),
+        sa.Column("stripe_customer_id", sa.String()),
+        sa.Column("settings", postgresql.JSONB()),
+    )
+    op.create_table(
+        "agents",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("system_prompt", sa.Text(), nullable=False),
+        *timestamps(),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE")),
+        sa.Column("is_public", sa.Boolean()),
+        sa.Column("configuration", postgresql.JSONB()),
+    )
+    op.create_table(
+        "prompts",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("tags", postgresql.ARRAY(sa.String())),
+        *timestamps(),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE")),
+        sa.Column("is_public", sa.Boolean()),
+    )
+    op.create_table(
+        "marketplace_listings",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("item_type", sa.String(), nullable=False),
+        sa.Column("item_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE")),
+        *timestamps(),
+        sa.Column("status", sa.String()),
+        sa.Column("tags", postgresql.ARRAY(sa.String())),
+        sa.Column("preview_data", postgresql.JSONB()),
+    )
+    op.create_table(
+        "transactions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("buyer_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id")),
+        sa.Column("seller_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id")),
+        sa.Column("listing_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("marketplace_listings.id")),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("commission_amount", sa.Float(), nullable=False),
+        sa.Column("stripe_payment_id", sa.String()),
+        sa.Column("status", sa.String()),
+        *timestamps(),
+    )
+    op.create_table(
+        "sandbox_sessions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE")),
+        *timestamps(),
+        sa.Column("configuration", postgresql.JSONB()),
+    )
+    op.create_table(
+        "sandbox_agents",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("session_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("sandbox_sessions.id", ondelete="CASCADE")),
+        sa.Column("agent_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("agents.id")),
+        sa.Column("position_x", sa.Integer()),
+        sa.Column("position_y", sa.Integer()),
+        sa.Column("configuration", postgresql.JSONB()),
+    )
+    op.create_table(
+        "chat_messages",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("session_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("sandbox_sessions.id", ondelete="CASCADE")),
+        sa.Column("sender_type", sa.String(), nullable=False),
+        sa.Column("sender_id", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("metadata", postgresql.JSONB()),
+    )
+
+def downgrade() -> None:
+    op.drop_table("chat_messages")
+    op.drop_table("sandbox_agents")
+    op.drop_table("sandbox_sessions")
+    op.drop_table("transactions")
+    op.drop_table("marketplace_listings")
+    op.drop_table("prompts")
+    op.drop_table("agents")
+    op.drop_table("users")
@@ -0,0 +1,61 @@
+"""Indexes for the API's query patterns
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+import sqlalchemy as sa
+from alembic import context, op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, access method)
+INDEXES = [
+    # Per-user lists and ownership checks
+    ("ix_agents_user_id", "agents", ["user_id"], None),
+    ("ix_prompts_user_id", "prompts", ["user_id"], None),
+    ("ix_sandbox_sessions_user_id", "sandbox_sessions", ["user_id"], None),
+    # Keyset pagination of a session's chat history on (created_at, id)
+    ("ix_chat_messages_session_created_id", "chat_messages", ["session_id", "created_at", "id"], None),
+    # Agents of a session, loaded on every agent turn
+    ("ix_sandbox_agents_session_id", "sandbox_agents", ["session_id"], None),
+    # Marketplace browsing: active listings, optionally of one item type
+    ("ix_marketplace_listings_status_item_type", "marketplace_listings", ["status", "item_type"], None),
+    # Tag filters use array containment (@>)
+    ("ix_marketplace_listings_tags", "marketplace_listings", ["tags"], "gin"),
+    ("ix_prompts_tags", "prompts", ["tags"], "gin"),
+    # Purchase and sales history
+    ("ix_transactions_buyer_id", "transactions", ["buyer_id"], None),
+    ("ix_transactions_seller_id", "transactions", ["seller_id"], None),
+]
+
+# A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind, which
+# IF NOT EXISTS would then keep forever. Offline (--sql) runs cannot look at
+# the catalog and skip the check.
+INVALID_INDEX = sa.text("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)")
+
+def is_invalid(name: str) -> bool:
+    if context.is_offline_mode():
+        return False
+    return bool(op.get_bind().execute(INVALID_INDEX, {"name": name}).scalar())
+
+def upgrade() -> None:
+    # Build the indexes without blocking writes to existing tables
+    with op.get_context().autocommit_block():
+        for name, table, columns, using in INDEXES:
+            if is_invalid(name):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            op.create_index(
+                name, table, columns,
+                postgresql_using=using,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,60 @@
+"""Move conversation summaries out of the session configuration
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "conversation_summaries",
+        sa.Column("session_id", postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey("sandbox_sessions.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("through", sa.String(), nullable=False),
+        sa.Column("message_count", sa.Integer()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.execute(
+        """
+        INSERT INTO conversation_summaries (session_id, text, through, message_count)
+        SELECT id,
+               configuration->'conversation_summary'->>'text',
+               configuration->'conversation_summary'->>'through',
+               COALESCE((configuration->'conversation_summary'->>'message_count')::integer, 0)
+        FROM sandbox_sessions
+        WHERE configuration->'conversation_summary'->>'text' IS NOT NULL
+          AND configuration->'conversation_summary'->>'through' IS NOT NULL
+        """
+    )
+    op.execute(
+        """
+        UPDATE sandbox_sessions SET configuration = configuration - 'conversation_summary'
+        WHERE configuration->'conversation_summary' IS NOT NULL
+        """
+    )
+
+def downgrade() -> None:
+    op.execute(
+        """
+        UPDATE sandbox_sessions SET configuration = COALESCE(configuration, '{}'::jsonb) || jsonb_build_object(
+            'conversation_summary', jsonb_build_object(
+                'text', s.text,
+                'through', s.through,
+                'message_count', s.message_count,
+                'updated_at', s.updated_at
+            )
+        )
+        FROM conversation_summaries s
+        WHERE s.session_id = sandbox_sessions.id
+        """
+    )
+    op.drop_table("conversation_summaries")
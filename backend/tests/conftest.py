@@ -0,0 +1,55 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import benchmarks.sqlite_types  # noqa: F401  (PostgreSQL column types on SQLite)
+from app.models import Base
+
+class StatementCounter:
+    """
+    Records every statement sent to the database.
+    """
+    
+    def __init__(self):
+        self.statements: List[str] = []
+    
+    def __call__(self, conn: Any, cursor: Any, statement: str, parameters: Any,
+                 context: Any, executemany: bool) -> None:
+        self.statements.append(statement)
+    
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+    
+    def reset(self) -> None:
+        self.statements.clear()
+
+@pytest.fixture
+def database() -> Callable[[Callable[[AsyncSession, StatementCounter], Awaitable[None]]], None]:
+    """
+    Run a test coroutine against a fresh in-memory database.
+    
+    The coroutine is called with an AsyncSession and a StatementCounter
+    recording the statements the session sends.
+    """
+    def run(test: Callable[[AsyncSession, StatementCounter], Awaitable[None]]) -> None:
+        async def main() -> None:
+            engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+            try:
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                
+                counter = StatementCounter()
+                event.listen(engine.sync_engine, "before_cursor_execute", counter)
+                async with AsyncSession(engine, autoflush=False, expire_on_commit=False) as db:
+                    await test(db, counter)
+            finally:
+                await engine.dispose()
+        
+        asyncio.run(main())
+    
+    return run
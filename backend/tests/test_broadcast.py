@@ -0,0 +1,14 @@
+import pytest
+
+from app.chat.broadcast import BroadcastBackend, InMemoryBroadcast
+
+class PublishOnly(BroadcastBackend):
+    async def publish(self, session_id: str, text: str) -> None:
+        pass
+
+def test_half_implemented_backend_fails_at_instantiation():
+    with pytest.raises(TypeError):
+        PublishOnly()
+
+def test_in_memory_backend_is_complete():
+    assert isinstance(InMemoryBroadcast(), BroadcastBackend)
@@ -0,0 +1,15 @@
+import asyncio
+
+from benchmarks.chat_round_trips import claude_uncached_tokens, gemini_calls_per_turn
+
+def test_gemini_makes_one_call_per_turn():
+    assert asyncio.run(gemini_calls_per_turn(turns=40, prefix_words=200)) == [1] * 40
+
+def test_cached_claude_prefix_is_paid_for_once():
+    cached = asyncio.run(claude_uncached_tokens(turns=10, prefix_words=2000, cache=True))
+    uncached = asyncio.run(claude_uncached_tokens(turns=10, prefix_words=2000, cache=False))
+    
+    assert len(cached) == len(uncached) == 10
+    # The first turn writes the cache and pays for the whole prefix
+    assert cached[0] > uncached[0] * 0.9
+    assert all(hit < miss / 10 for hit, miss in zip(cached[1:], uncached[1:]))
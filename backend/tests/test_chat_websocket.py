@@ -0,0 +1,97 @@
+import time
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+from starlette.websockets import WebSocketDisconnect
+
+import benchmarks.sqlite_types  # noqa: F401  (PostgreSQL column types on SQLite)
+from app.auth.cache import user_cache
+from app.auth.dependencies import create_access_token
+from app.chat import router as chat
+from app.database import get_db
+from app.models import Base, SandboxSession, User
+
+OWNER, OTHER, SESSION = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    written, turns = [], []
+    
+    async def write(session_id, sender_type, sender_id, content, metadata=None, message_id=None):
+        written.append((session_id, sender_id, content))
+        return {"id": str(uuid.uuid4()), "session_id": str(session_id), "sender_type": sender_type,
+                "sender_id": sender_id, "content": content, "metadata": metadata or {}}
+    
+    monkeypatch.setattr(chat.message_writer, "write", write)
+    monkeypatch.setattr(chat, "start_agent_turn", lambda session_id, message: turns.append(session_id))
+    user_cache.clear()
+    
+    app = FastAPI()
+    app.include_router(chat.router)
+    
+    @app.on_event("startup")
+    async def seed():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine) as db:
+            db.add_all([
+                User(id=OWNER, email="owner@example.com"),
+                User(id=OTHER, email="other@example.com"),
+                SandboxSession(id=SESSION, name="Sandbox", user_id=OWNER, configuration={})
+            ])
+            await db.commit()
+    
+    @app.on_event("shutdown")
+    async def dispose():
+        await engine.dispose()
+    
+    async def get_test_db():
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            yield db
+    
+    app.dependency_overrides[get_db] = get_test_db
+    with TestClient(app) as test_client:
+        test_client.written, test_client.turns = written, turns
+        yield test_client
+
+def token_for(user_id):
+    return create_access_token({"sub": str(user_id)})
+
+@pytest.mark.parametrize("session_id, token", [
+    (SESSION, "not a token"),
+    (SESSION, token_for(OTHER)),
+    ("not-a-uuid", token_for(OWNER)),
+])
+def test_only_the_owner_can_connect(client, session_id, token):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(f"/chat/{session_id}/stream?token={token}") as websocket:
+            websocket.receive_text()
+    
+    assert closed.value.code == 1008
+    assert client.written == [] and client.turns == []
+
+def test_bad_frames_get_an_error_and_the_socket_stays_open(client):
+    with client.websocket_connect(f"/chat/{SESSION}/stream?token={token_for(OWNER)}") as websocket:
+        for frame in ["not json", "[]", '{"content": "Hi"}', '{"type": "message"}']:
+            websocket.send_text(frame)
+            assert websocket.receive_json()["type"] == "error"
+        
+        websocket.send_json({"type": "message", "content": "Hello"})
+        message = websocket.receive_json()
+    
+    assert message["type"] == "message"
+    assert message["data"]["sender_id"] == str(OWNER)
+    assert client.written == [(SESSION, str(OWNER), "Hello")]
+    assert client.turns == [SESSION]
+    
+    # The server side unregisters the socket once it sees the close
+    for _ in range(100):
+        if str(SESSION) not in chat.manager.active_connections:
+            break
+        time.sleep(0.01)
+    assert str(SESSION) not in chat.manager.active_connections
@@ -0,0 +1,101 @@
+import asyncio
+from typing import AsyncIterator, List
+
+from app.ai_models import factory
+from app.ai_models.coalescing import SingleFlight
+from app.ai_models.factory import AIModelFactory
+from app.ai_models.http_client import close_http_client
+from app.config import settings
+from benchmarks.stub_transport import StubTransport, install
+
+CHUNKS = ["The ", "quick ", "brown ", "fox"]
+
+class Upstream:
+    """
+    Stub upstream stream counting how often it is opened.
+    """
+    
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.opened = 0
+        self.cancelled = 0
+    
+    async def open(self) -> AsyncIterator[str]:
+        self.opened += 1
+        try:
+            for chunk in CHUNKS:
+                await asyncio.sleep(self.delay)
+                yield chunk
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+async def collect(chunks: AsyncIterator[str]) -> List[str]:
+    return [chunk async for chunk in chunks]
+
+def test_concurrent_subscribers_share_one_upstream():
+    async def scenario():
+        group, upstream = SingleFlight(), Upstream()
+        results = await asyncio.gather(*[collect(group.stream("key", upstream.open)) for _ in range(3)])
+        assert results == [CHUNKS] * 3
+        assert upstream.opened == 1
+        assert group.stats() == {"in_flight": 0, "calls": 1, "coalesced": 2}
+    
+    asyncio.run(scenario())
+
+def test_subscriber_after_cancellation_gets_a_complete_stream():
+    async def scenario():
+        group, upstream = SingleFlight(), Upstream()
+        
+        first = group.stream("key", upstream.open)
+        assert await first.__anext__() == "The "
+        # Created while the first stream is in flight, read only after the
+        # first subscriber left and the shared upstream was cancelled
+        late = group.stream("key", upstream.open)
+        await first.aclose()
+        
+        assert await collect(late) == CHUNKS
+        await asyncio.sleep(0)
+        assert upstream.cancelled == 1
+        assert upstream.opened == 2
+    
+    asyncio.run(scenario())
+
+def test_cancelled_stream_is_not_served_as_complete():
+    async def scenario():
+        group, upstream = SingleFlight(), Upstream(delay=0.05)
+        
+        first = group.stream("key", upstream.open)
+        await first.__anext__()
+        fanout = group._streams["key"]
+        await first.aclose()
+        
+        # The entry is gone as soon as the last subscriber leaves
+        assert "key" not in group._streams
+        await asyncio.sleep(0.01)
+        assert fanout.done and fanout.cancelled
+        assert await collect(group.stream("key", upstream.open)) == CHUNKS
+    
+    asyncio.run(scenario())
+
+def test_requests_with_different_api_keys_are_not_merged(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "LLM_COALESCING_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(factory, "single_flight", SingleFlight())
+    
+    async def scenario():
+        transport = StubTransport(latency=0.05)
+        install(transport)
+        messages = [{"role": "user", "content": "Hi"}]
+        try:
+            await asyncio.gather(*[
+                AIModelFactory.get_model("deepseek", api_key=api_key).generate_chat_response(messages)
+                for api_key in ["key-a", "key-b", "key-a", "key-b"]
+            ])
+        finally:
+            await close_http_client()
+        return transport.requests
+    
+    # Identical concurrent requests share a call only within the same key
+    assert len(asyncio.run(scenario())) == 2
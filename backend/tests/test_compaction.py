@@ -0,0 +1,53 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.ai_models.tokens import TokenCounter
+from app.chat.compaction import ConversationCompactor
+from app.chat.pagination import encode_cursor
+from app.models import ChatMessage, ConversationSummary
+
+def make_window(count):
+    started = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        {"id": str(uuid.uuid4()), "created_at": (started + timedelta(seconds=i)).isoformat(),
+         "sender_type": "user", "sender_id": "user", "content": f"Message {i}"}
+        for i in range(count)
+    ]
+
+def summary_through(message):
+    through = ChatMessage(id=uuid.UUID(message["id"]), created_at=datetime.fromisoformat(message["created_at"]))
+    return ConversationSummary(session_id=uuid.uuid4(), text="So far", through=encode_cursor(through))
+
+def test_build_history_drops_summarized_messages():
+    window = make_window(5)
+    
+    text, history = ConversationCompactor().build_history(summary_through(window[2]), window)
+    
+    assert text == "So far"
+    assert history == window[3:]
+
+def test_build_history_ignores_an_invalid_cursor():
+    window = make_window(5)
+    summary = ConversationSummary(session_id=uuid.uuid4(), text="So far", through="not a cursor")
+    
+    assert ConversationCompactor().build_history(summary, window) == (None, window)
+
+def test_long_run_of_short_messages_is_summarized():
+    # 60 short messages, far under the token budget; the window holds the last 20
+    conversation = make_window(60)
+    window = conversation[-20:]
+    compactor, counter = ConversationCompactor(token_budget=3000), TokenCounter("gemini")
+    
+    assert counter.count_messages(window) < 3000
+    assert compactor.needs_refresh(None, window, 20, 3000, counter)
+    # The summary stops before the window: messages in between are in neither
+    assert compactor.needs_refresh(summary_through(conversation[20]), window, 20, 3000, counter)
+
+def test_summary_reaching_into_the_window_needs_no_refresh():
+    conversation = make_window(60)
+    window = conversation[-20:]
+    compactor, counter = ConversationCompactor(token_budget=3000), TokenCounter("gemini")
+    
+    assert not compactor.needs_refresh(summary_through(window[5]), window, 20, 3000, counter)
+    # A short conversation that still fits the window needs no summary yet
+    assert not compactor.needs_refresh(None, conversation[:12], 20, 3000, counter)
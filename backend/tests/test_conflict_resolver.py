@@ -0,0 +1,73 @@
+import asyncio
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from app.ai_models.base import AIModelBase
+from app.chat.conflict_resolver import ConflictResolver
+
+class ScoringModel(AIModelBase):
+    """
+    Stub model answering batch scoring prompts with fixed scores per resolution.
+    """
+    
+    def __init__(self, scores: Dict[str, float], delays: Optional[Dict[str, float]] = None):
+        self.scores = scores
+        self.delays = delays or {}
+        self.calls = 0
+    
+    async def generate_text(self, prompt: str, system_message: Optional[str] = None,
+                            temperature: float = 0.7, max_tokens: int = 1000,
+                            options: Optional[Dict[str, Any]] = None) -> str:
+        self.calls += 1
+        resolutions = [resolution.strip() for resolution in re.findall(r"\[\d+\]\n(.+)", prompt)]
+        await asyncio.sleep(max(self.delays.get(resolution, 0.0) for resolution in resolutions))
+        return json.dumps([self.scores[resolution] for resolution in resolutions])
+    
+    async def generate_chat_response(self, messages: List[Dict[str, str]], temperature: float = 0.7,
+                                     max_tokens: int = 1000, options: Optional[Dict[str, Any]] = None) -> str:
+        raise AssertionError("not used")
+    
+    async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
+                                        options: Optional[Dict[str, Any]] = None) -> float:
+        self.calls += 1
+        return self.scores[resolution_text]
+    
+    @classmethod
+    def describe(cls, model_name: str) -> Dict[str, Any]:
+        return {"name": model_name}
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        return self.describe("stub")
+
+def agent_messages(answers: List[str]) -> List[dict]:
+    return [
+        {"id": f"m{i}", "sender_type": "agent", "sender_id": f"agent{i}", "content": answer}
+        for i, answer in enumerate(answers)
+    ]
+
+ANSWERS = ["Paris is the capital", "Lyon was chosen", "Marseille by the sea", "Nice in the south", "Lille up north"]
+
+def test_five_agent_conflict_is_one_round_trip():
+    model = ScoringModel(dict(zip(ANSWERS, [0.2, 0.7, 0.4, 0.6, 0.1])))
+    
+    resolution = asyncio.run(ConflictResolver(model).resolve_conflicts(agent_messages(ANSWERS)))
+    
+    assert model.calls == 1
+    assert resolution["message_id"] == "m1"
+    assert resolution["score"] == 0.7
+    assert len(resolution["alternatives"]) == 4
+
+def test_confident_batch_stops_scoring():
+    # The batch holding the confident candidate answers first; the others
+    # are still running when the resolver stops waiting
+    model = ScoringModel(dict(zip(ANSWERS, [0.95, 0.7, 0.4, 0.6, 0.1])),
+                         delays={answer: 5.0 for answer in ANSWERS[2:]})
+    resolver = ConflictResolver(model, batch_size=2, confidence_threshold=0.9)
+    
+    resolution = asyncio.run(resolver.resolve_conflicts(agent_messages(ANSWERS)))
+    
+    assert model.calls == 3
+    assert resolution["message_id"] == "m0"
+    assert resolution["early_exit"] is True
+    assert resolution["timings"]["score_ms"] < 1000
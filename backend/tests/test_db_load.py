@@ -0,0 +1,30 @@
+import asyncio
+import os
+import tempfile
+
+from benchmarks.db_load import AppServer, build_app, seed
+
+def serve_burst(requests: int):
+    async def burst(server: AppServer, route: str, ids: str) -> None:
+        await asyncio.gather(*[server.get(f"/{route}/{ids}") for _ in range(requests)])
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "load.db")
+        ids = seed(path)
+        server = AppServer(build_app(path, latency=0.02))
+        try:
+            for route in ["blocking", "async"]:
+                asyncio.run(burst(server, route, ids))
+        finally:
+            server.close()
+        return server.app.state.trackers
+
+def test_async_route_overlaps_queries():
+    trackers = serve_burst(requests=8)
+    
+    # One statement per request on both routes
+    assert trackers["blocking"].queries == 8
+    assert trackers["async"].queries == 8
+    # The blocking route freezes the event loop for each query
+    assert trackers["blocking"].peak_in_flight == 1
+    assert trackers["async"].peak_in_flight > 1
@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from app.ai_models.factory import AIModelFactory
+from app.ai_models.http_client import close_http_client
+from app.config import settings
+from benchmarks.stub_transport import StubTransport, install
+
+@pytest.mark.parametrize("enabled", [False, True])
+def test_wrapper_options_never_reach_the_provider(monkeypatch, enabled):
+    for flag in ["LLM_CACHE_ENABLED", "LLM_COALESCING_ENABLED", "LLM_RATE_LIMIT_ENABLED"]:
+        monkeypatch.setattr(settings, flag, enabled)
+    
+    async def scenario():
+        transport = StubTransport(latency=0.0)
+        install(transport)
+        model = AIModelFactory.get_model("deepseek", api_key="test")
+        try:
+            await model.generate_text("Hi", temperature=0.0, options={"cache": False, "coalesce": False, "top_p": 0.5})
+            await model.generate_chat_response([{"role": "user", "content": "Hi"}], temperature=0.0,
+                                               options={"cache": False, "top_p": 0.5})
+        finally:
+            await close_http_client()
+        return [request["body"] for request in transport.requests]
+    
+    for body in asyncio.run(scenario()):
+        assert body["top_p"] == 0.5
+        assert "cache" not in body and "coalesce" not in body
@@ -0,0 +1,117 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import pytest
+
+from app.ai_models import failover
+from app.ai_models.base import ModelWrapper
+from app.ai_models.failover import CircuitBreaker, FailoverModel, ProviderUnavailableError
+
+class StubProvider(ModelWrapper):
+    """
+    Stub provider that answers after a delay, or fails while failing is set.
+    """
+    
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.failing = False
+        self.calls = 0
+    
+    async def generate_text(self, prompt: str, system_message: Optional[str] = None,
+                           temperature: float = 0.7, max_tokens: int = 1000,
+                           options: Optional[Dict[str, Any]] = None) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.failing:
+            raise ConnectionError("Provider is down")
+        return "ok"
+    
+    async def generate_chat_response(self, messages: List[Dict[str, str]],
+                                    temperature: float = 0.7, max_tokens: int = 1000,
+                                    options: Optional[Dict[str, Any]] = None) -> str:
+        return await self.generate_text("")
+    
+    async def stream_chat_response(self, messages: List[Dict[str, str]],
+                                   temperature: float = 0.7, max_tokens: int = 1000,
+                                   options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        yield await self.generate_text("")
+        yield "!"
+    
+    async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
+                                       options: Optional[Dict[str, Any]] = None) -> float:
+        return 0.5
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        return {"name": "stub"}
+
+@pytest.fixture(autouse=True)
+def provider_health(monkeypatch):
+    monkeypatch.setattr(failover, "provider_health", {})
+
+async def open_circuit(model: FailoverModel, provider: StubProvider) -> None:
+    provider.failing = True
+    for _ in range(2):
+        with pytest.raises(ProviderUnavailableError):
+            await model.generate_text("Hi")
+    provider.failing = False
+
+def test_half_open_circuit_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    breaker.record_failure()
+    assert not breaker.allow_request()
+    
+    breaker.opened_at -= 60.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.allow_request() and breaker.allow_request()
+
+def test_concurrent_requests_fail_fast_while_the_probe_is_in_flight():
+    async def scenario():
+        provider = StubProvider(delay=0.05)
+        model = FailoverModel([("stub", provider)], failure_threshold=2, reset_timeout=0.05)
+        await open_circuit(model, provider)
+        
+        # Open: nothing reaches the provider
+        provider.calls = 0
+        with pytest.raises(ProviderUnavailableError):
+            await model.generate_text("Hi")
+        assert provider.calls == 0
+        
+        await asyncio.sleep(0.05)
+        results = await asyncio.gather(*[model.generate_text("Hi") for _ in range(5)],
+                                       return_exceptions=True)
+        assert provider.calls == 1
+        assert results.count("ok") == 1
+        assert all(isinstance(result, ProviderUnavailableError) for result in results if result != "ok")
+        
+        # The successful probe closed the circuit
+        assert await asyncio.gather(*[model.generate_text("Hi") for _ in range(5)]) == ["ok"] * 5
+    
+    asyncio.run(scenario())
+
+def test_abandoned_probe_frees_the_circuit():
+    async def scenario():
+        provider = StubProvider()
+        model = FailoverModel([("stub", provider)], failure_threshold=2, reset_timeout=0.05)
+        await open_circuit(model, provider)
+        await asyncio.sleep(0.05)
+        provider.delay = 1.0
+        breaker = model.health["stub"].breaker
+        
+        probe = asyncio.ensure_future(model.generate_text("Hi"))
+        await asyncio.sleep(0.01)
+        assert not breaker.available()
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+        assert breaker.available()
+        
+        stream = model.stream_chat_response([{"role": "user", "content": "Hi"}])
+        provider.delay = 0.0
+        assert await stream.__anext__() == "ok"
+        assert not breaker.available()
+        await stream.aclose()
+        assert breaker.available()
+    
+    asyncio.run(scenario())
@@ -0,0 +1,23 @@
+import asyncio
+
+from app.ai_models.gemini_model import GeminiModel
+from benchmarks.stub_transport import StubGeminiClient, install_gemini
+
+def test_each_instance_calls_with_its_own_key():
+    async def scenario():
+        first, second = GeminiModel(api_key="key-a"), GeminiModel(api_key="key-b")
+        return [model.client._client._transport._credentials.token for model in (first, second)]
+    
+    assert asyncio.run(scenario()) == ["key-a", "key-b"]
+
+def test_system_instruction_model_uses_the_instance_client():
+    model, stub = GeminiModel(api_key="key-a"), StubGeminiClient()
+    install_gemini(model, stub)
+    
+    asyncio.run(model.generate_chat_response([
+        {"role": "system", "content": "Be brief."},
+        {"role": "user", "content": "Hi"}
+    ]))
+    
+    assert len(stub.requests) == 1
+    assert stub.requests[0].system_instruction.parts[0].text == "Be brief."
@@ -0,0 +1,32 @@
+import asyncio
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.chat.message_writer import MessageWriter
+from app.models import ChatMessage, SandboxSession, User
+
+def test_batched_messages_keep_their_order(database):
+    async def scenario(db, counter):
+        owner = User(id=uuid.uuid4(), email="owner@example.com")
+        session = SandboxSession(id=uuid.uuid4(), name="Sandbox", user_id=owner.id, configuration={})
+        db.add_all([owner, session])
+        await db.commit()
+        
+        writer = MessageWriter(async_sessionmaker(db.bind, expire_on_commit=False), max_delay=0.05)
+        written = await asyncio.gather(*[
+            writer.write(session.id, "user", str(owner.id), f"Message {i}") for i in range(20)
+        ])
+        await writer.close()
+        
+        # One batch, yet every message has its own created_at
+        assert writer.stats()["batches"] == 1
+        assert len({message["created_at"] for message in written}) == 20
+        
+        stored = (await db.scalars(
+            select(ChatMessage).order_by(ChatMessage.created_at, ChatMessage.id)
+        )).all()
+        assert [message.content for message in stored] == [f"Message {i}" for i in range(20)]
+    
+    database(scenario)
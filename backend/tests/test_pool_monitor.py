@@ -0,0 +1,19 @@
+from sqlalchemy.pool import QueuePool
+
+from app.database import PoolMonitor
+
+def test_reading_stats_resets_nothing():
+    monitor = PoolMonitor()
+    pool = QueuePool(lambda: None, pool_size=2)
+    monitor.record_wait(0.5)
+    monitor.record_wait(0.1)
+    monitor.record_wait(2.0, timed_out=True)
+    
+    first = monitor.stats(pool)
+    assert first == monitor.stats(pool)
+    assert first["wait_seconds_max"] == 2.0
+    assert first["wait_seconds_last"] == 2.0
+    assert first["checkouts_total"] == 2 and first["timeouts_total"] == 1
+    
+    monitor.record_wait(0.2)
+    assert monitor.stats(pool)["wait_seconds_max"] == 2.0
@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from app.ai_models.http_client import close_http_client
+from benchmarks.provider_concurrency import PROVIDERS
+from benchmarks.stub_transport import StubTransport, install
+
+async def call_concurrently(provider: str, transport: StubTransport, calls: int) -> None:
+    install(transport)
+    model = PROVIDERS[provider](api_key="test")
+    try:
+        await asyncio.gather(*[model.generate_text(f"Prompt {i}") for i in range(calls)])
+    finally:
+        await close_http_client()
+
+@pytest.mark.parametrize("provider", sorted(PROVIDERS))
+def test_provider_calls_overlap(provider):
+    transport = StubTransport(latency=0.05)
+    asyncio.run(call_concurrently(provider, transport, calls=20))
+    
+    # Every call was waiting on the provider at the same time
+    assert len(transport.requests) == 20
+    assert transport.peak_in_flight == 20
+
+def test_blocking_transport_serializes_calls():
+    # The stub itself can tell blocking calls apart, or the test above proves nothing
+    transport = StubTransport(latency=0.01, blocking=True)
+    asyncio.run(call_concurrently("openai", transport, calls=5))
+    
+    assert transport.peak_in_flight == 1
@@ -0,0 +1,18 @@
+import asyncio
+
+from app.ai_models.rate_limit import ProviderLimiter
+
+def test_request_waiting_for_rate_budget_holds_no_slot():
+    async def scenario():
+        limiter = ProviderLimiter(rpm=1, tpm=50000, concurrency=1)
+        async with limiter.admit(10):
+            pass
+        
+        # The request bucket is empty for the next minute
+        waiting = asyncio.ensure_future(limiter.admit(10).__aenter__())
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        assert limiter.stats()["in_flight"] == 0
+        waiting.cancel()
+    
+    asyncio.run(scenario())
@@ -0,0 +1,56 @@
+import asyncio
+
+from app.ai_models import factory
+from app.ai_models.cache import ResponseCache
+from app.ai_models.factory import AIModelFactory
+from app.ai_models.http_client import close_http_client
+from app.config import settings
+from benchmarks.stub_transport import StubTransport, install
+
+class StubRedis:
+    """
+    Stub Redis client holding raw values.
+    """
+    
+    def __init__(self, values):
+        self.values = values
+    
+    async def get(self, key):
+        return self.values.get(key)
+    
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+def test_responses_are_not_shared_across_api_keys(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_COALESCING_ENABLED", False)
+    monkeypatch.setattr(settings, "LLM_RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(factory, "response_cache", ResponseCache())
+    
+    async def scenario():
+        transport = StubTransport(latency=0.0)
+        install(transport)
+        try:
+            for api_key in ["key-a", "key-b", "key-a", "key-b"]:
+                model = AIModelFactory.get_model("deepseek", api_key=api_key)
+                await model.generate_chat_response([{"role": "user", "content": "Hi"}], temperature=0.0)
+        finally:
+            await close_http_client()
+        return transport.requests
+    
+    # One upstream call per key; the repeats are served from the cache
+    assert len(asyncio.run(scenario())) == 2
+
+def test_corrupt_redis_entry_is_a_miss():
+    async def scenario():
+        cache = ResponseCache()
+        cache._redis = StubRedis({cache.key_prefix + "key": b"{not json"})
+        assert await cache.get("key") is None
+        assert cache.misses == 1
+        
+        await cache.set("key", "fresh")
+        cache.clear()
+        assert await cache.get("key") == "fresh"
+        assert cache.redis_hits == 1
+    
+    asyncio.run(scenario())
@@ -0,0 +1,121 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.chat.pagination import encode_cursor, keyset_page
+from app.models import Agent, ChatMessage, SandboxAgent, SandboxSession, User
+from app.sandbox import queries
+
+# Every read of a session's data must cost one statement, with the
+# ownership check folded into it
+
+async def seed(db, counter, messages=5):
+    owner = User(id=uuid.uuid4(), email="owner@example.com")
+    other = User(id=uuid.uuid4(), email="other@example.com")
+    session = SandboxSession(id=uuid.uuid4(), name="Sandbox", user_id=owner.id, configuration={})
+    empty = SandboxSession(id=uuid.uuid4(), name="Empty", user_id=owner.id, configuration={})
+    agent = Agent(id=uuid.uuid4(), name="Agent", system_prompt="Be brief.", user_id=owner.id)
+    placed = SandboxAgent(id=uuid.uuid4(), session_id=session.id, agent_id=agent.id, configuration={})
+    started = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    history = [
+        ChatMessage(id=uuid.uuid4(), session_id=session.id, sender_type="user", sender_id=str(owner.id),
+                    content=f"Message {i}", created_at=started + timedelta(seconds=i), metadata_={})
+        for i in range(messages)
+    ]
+    db.add_all([owner, other, session, empty, agent, placed, *history])
+    await db.commit()
+    counter.reset()
+    return SimpleNamespace(owner=owner, other=other, session=session, empty=empty, agent=agent,
+                           placed=placed, history=history)
+
+def test_get_owned_session_is_one_statement(database):
+    async def scenario(db, counter):
+        data = await seed(db, counter)
+        
+        assert await queries.get_owned_session(db, data.session.id, data.owner.id) is not None
+        assert await queries.get_owned_session(db, data.session.id, data.other.id) is None
+        assert counter.count == 2
+    
+    database(scenario)
+
+def test_get_session_with_agent_is_one_statement(database):
+    async def scenario(db, counter):
+        data = await seed(db, counter)
+        
+        session, agent = await queries.get_session_with_agent(db, data.session.id, data.owner.id, data.agent.id)
+        assert session.id == data.session.id and agent.id == data.agent.id
+        assert counter.count == 1
+        
+        session, agent = await queries.get_session_with_agent(db, data.session.id, data.other.id, data.agent.id)
+        assert session is None and agent is None
+        assert counter.count == 2
+    
+    database(scenario)
+
+def test_list_session_agents_is_one_statement(database):
+    async def scenario(db, counter):
+        data = await seed(db, counter)
+        
+        agents = await queries.list_session_agents(db, data.session.id, data.owner.id)
+        assert [agent.id for agent in agents] == [data.placed.id]
+        assert await queries.list_session_agents(db, data.empty.id, data.owner.id) == []
+        assert await queries.list_session_agents(db, data.session.id, data.other.id) is None
+        assert counter.count == 3
+    
+    database(scenario)
+
+def test_keyset_page_is_one_statement(database):
+    async def scenario(db, counter):
+        data = await seed(db, counter)
+        
+        first = await keyset_page(db, data.session.id, data.owner.id, 2)
+        assert [message.content for message in first] == ["Message 0", "Message 1"]
+        assert counter.count == 1
+        
+        after = await keyset_page(db, data.session.id, data.owner.id, 2, after=encode_cursor(first[-1]))
+        assert [message.content for message in after] == ["Message 2", "Message 3"]
+        assert counter.count == 2
+        
+        before = await keyset_page(db, data.session.id, data.owner.id, 2, before=encode_cursor(after[-1]))
+        assert [message.content for message in before] == ["Message 1", "Message 2"]
+        assert counter.count == 3
+    
+    database(scenario)
+
+def test_keyset_page_checks_ownership_of_empty_pages(database):
+    async def scenario(db, counter):
+        data = await seed(db, counter)
+        
+        assert await keyset_page(db, data.empty.id, data.owner.id, 10) == []
+        assert await keyset_page(db, data.session.id, data.other.id, 10) is None
+        # An empty page takes a second statement to tell the two apart
+        assert counter.count == 4
+    
+    database(scenario)
+
+def test_writes_are_one_statement(database):
+    async def scenario(db, counter):
+        data = await seed(db, counter)
+        
+        created = await queries.create_session(db, data.owner.id, {"name": "New", "configuration": {}})
+        assert created.user_id == data.owner.id
+        
+        placed = await queries.add_session_agent(db, data.session.id, data.owner.id, {
+            "agent_id": data.agent.id, "position_x": 1, "position_y": 2, "configuration": {}
+        })
+        assert placed.session_id == data.session.id
+        
+        moved = await queries.update_session_agent(
+            db, data.session.id, data.owner.id, placed.id, {"position_x": 5, "position_y": 6}
+        )
+        assert (moved.position_x, moved.position_y) == (5, 6)
+        assert counter.count == 3
+        
+        # Not owned: nothing is written and nothing is returned
+        assert await queries.add_session_agent(db, data.session.id, data.other.id, {
+            "agent_id": data.agent.id, "configuration": {}
+        }) is None
+        assert await queries.remove_session_agent(db, data.session.id, data.other.id, placed.id) is False
+        assert counter.count == 5
+    
+    database(scenario)
@@ -0,0 +1,93 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.ai_models.base import ModelWrapper
+from app.ai_models.cache import CachedModel, ResponseCache
+from app.ai_models.rate_limit import ProviderLimiter, RateLimitedModel
+
+CHUNKS = ["The ", "quick ", "brown ", "fox"]
+MESSAGES = [{"role": "user", "content": "Hi"}]
+
+class StubModel(ModelWrapper):
+    """
+    Stub model counting how often its stream is opened and closed.
+    """
+    
+    def __init__(self):
+        self.opened = 0
+        self.closed = 0
+    
+    async def generate_text(self, prompt: str, system_message: Optional[str] = None,
+                           temperature: float = 0.7, max_tokens: int = 1000,
+                           options: Optional[Dict[str, Any]] = None) -> str:
+        return "".join(CHUNKS)
+    
+    async def generate_chat_response(self, messages: List[Dict[str, str]],
+                                    temperature: float = 0.7, max_tokens: int = 1000,
+                                    options: Optional[Dict[str, Any]] = None) -> str:
+        return "".join(CHUNKS)
+    
+    def stream_chat_response(self, messages: List[Dict[str, str]],
+                             temperature: float = 0.7, max_tokens: int = 1000,
+                             options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        self.opened += 1
+        return self._chunks()
+    
+    async def _chunks(self) -> AsyncIterator[str]:
+        try:
+            for chunk in CHUNKS:
+                await asyncio.sleep(0)
+                yield chunk
+        finally:
+            self.closed += 1
+    
+    async def score_conflict_resolution(self, conflict_text: str, resolution_text: str,
+                                       options: Optional[Dict[str, Any]] = None) -> float:
+        return 0.5
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        return {"name": "stub"}
+
+async def read_first(chunks: AsyncIterator[str]) -> str:
+    first = await chunks.__anext__()
+    await chunks.aclose()
+    return first
+
+def test_cached_stream_never_opens_the_upstream():
+    async def scenario():
+        upstream = StubModel()
+        model = CachedModel(upstream, "stub", ResponseCache())
+        
+        assert [chunk async for chunk in model.stream_chat_response(MESSAGES, temperature=0.0)] == CHUNKS
+        assert [chunk async for chunk in model.stream_chat_response(MESSAGES, temperature=0.0)] == ["".join(CHUNKS)]
+        assert upstream.opened == 1
+    
+    asyncio.run(scenario())
+
+def test_abandoned_cached_stream_closes_the_upstream():
+    async def scenario():
+        upstream = StubModel()
+        model = CachedModel(upstream, "stub", ResponseCache())
+        
+        for temperature in [0.0, 1.0]:
+            assert await read_first(model.stream_chat_response(MESSAGES, temperature=temperature)) == "The "
+        assert upstream.closed == 2
+        # A partial stream is never cached
+        assert upstream.opened == 2 and model.cache.stats()["entries"] == 0
+    
+    asyncio.run(scenario())
+
+def test_abandoned_rate_limited_stream_closes_the_upstream_before_releasing_its_slot():
+    async def scenario():
+        upstream = StubModel()
+        limiter = ProviderLimiter(rpm=60, tpm=50000, concurrency=1)
+        model = RateLimitedModel(upstream, limiter)
+        
+        chunks = model.stream_chat_response(MESSAGES)
+        assert await chunks.__anext__() == "The "
+        assert limiter.stats()["in_flight"] == 1
+        await chunks.aclose()
+        assert upstream.closed == 1
+        assert limiter.stats()["in_flight"] == 0
+    
+    asyncio.run(scenario())
@@ -0,0 +1,67 @@
+import pytest
+
+from app.ai_models.tokens import ContextBudgeter, TokenCounter
+from benchmarks.token_counting import make_history
+
+def budgeter():
+    # 4 characters per token, no exact tokenizer
+    return ContextBudgeter(TokenCounter("gemini"))
+
+def system(words, **extra):
+    return {"role": "system", "content": " ".join(["word"] * words), **extra}
+
+def test_history_is_dropped_oldest_first():
+    history = [{"id": str(i), "role": "user", "content": "x" * 40} for i in range(10)]
+    
+    fixed, kept = budgeter().fit([system(10)], history, context_tokens=100, completion_tokens=20)
+    
+    assert kept == history[-4:]
+
+def test_oversized_system_prompt_is_truncated():
+    prompt = system(1000)
+    
+    fixed, kept = budgeter().fit([prompt], [{"role": "user", "content": "Hi"}],
+                                 context_tokens=200, completion_tokens=50)
+    
+    assert kept == []
+    assert len(fixed) == 1
+    assert prompt["content"].startswith(fixed[0]["content"])
+    assert TokenCounter("gemini").count_messages(fixed) <= 150
+
+def test_cached_prefix_is_never_truncated():
+    prefix = system(100, cache=True)
+    tail = system(100)
+    
+    fixed, _ = budgeter().fit([prefix, tail], [], context_tokens=200, completion_tokens=0)
+    
+    assert fixed[0] == prefix
+    assert len(fixed) == 2 and tail["content"].startswith(fixed[1]["content"])
+    assert TokenCounter("gemini").count_messages(fixed) <= 200
+
+def test_cached_prefix_too_large_on_its_own_raises():
+    with pytest.raises(ValueError):
+        budgeter().fit([system(1000, cache=True), system(10)], [], context_tokens=200, completion_tokens=50)
+
+def test_summary_is_dropped_before_the_system_prompt_is_cut():
+    summary = {"role": "system", "content": "Summary " * 20}
+    
+    prompt = system(100)
+    
+    # 173 tokens in all, 53 over budget: dropping the summary frees 44
+    fixed, _ = budgeter().fit([prompt, summary], [], context_tokens=120, completion_tokens=0)
+    
+    assert len(fixed) == 1
+    assert len(fixed[0]["content"]) < len(prompt["content"])
+    assert prompt["content"].startswith(fixed[0]["content"])
+
+def test_no_room_for_the_system_prompt_raises():
+    with pytest.raises(ValueError):
+        budgeter().fit([system(10)], [], context_tokens=1000, completion_tokens=1000)
+
+def test_history_is_only_tokenized_once():
+    history = make_history(10000)
+    counter = TokenCounter("openai")
+    total = counter.count_messages(history)
+    
+    counter.count_text = None  # Any further tokenizing would fail
+    assert counter.count_messages(history) == total
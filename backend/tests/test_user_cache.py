@@ -0,0 +1,147 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth import cache as auth_cache
+from app.auth import dependencies
+from app.auth.cache import UserCache
+from app.auth.dependencies import authenticate_token, create_access_token
+from app.config import settings
+from app.models import User
+
+class StubRedis:
+    """
+    Stub Redis client; every call fails while down is set.
+    """
+    
+    def __init__(self):
+        self.values = {}
+        self.down = False
+    
+    def _check(self):
+        if self.down:
+            raise ConnectionError("Redis is down")
+    
+    async def get(self, key):
+        self._check()
+        return self.values.get(key)
+    
+    async def set(self, key, value, ex=None):
+        self._check()
+        self.values[key] = value
+    
+    async def delete(self, *keys):
+        self._check()
+        for key in keys:
+            self.values.pop(key, None)
+
+@pytest.fixture
+def user_cache(monkeypatch):
+    cache = UserCache()
+    cache._redis = StubRedis()
+    monkeypatch.setattr(settings, "AUTH_USER_CACHE_ENABLED", True)
+    monkeypatch.setattr(auth_cache, "user_cache", cache)
+    monkeypatch.setattr(dependencies, "user_cache", cache)
+    return cache
+
+async def seed(db, counter):
+    user = User(id=uuid.uuid4(), email="user@example.com", subscription_tier="basic", settings={})
+    db.add(user)
+    await db.commit()
+    counter.reset()
+    return user, create_access_token({"sub": str(user.id)})
+
+def test_users_are_served_from_each_tier(database, user_cache):
+    async def scenario(db, counter):
+        user, token = await seed(db, counter)
+        
+        assert (await authenticate_token(token, db)).id == user.id
+        assert counter.count == 1
+        
+        # In-process tier
+        assert (await authenticate_token(token, db)).id == user.id
+        # Redis tier, as seen by another worker
+        user_cache.clear()
+        cached = await authenticate_token(token, db)
+        assert cached.id == user.id and cached.email == user.email
+        
+        assert counter.count == 1
+        assert user_cache.stats()["hits"] == 1
+        assert user_cache.stats()["redis_hits"] == 1
+        assert user_cache.stats()["misses"] == 1
+    
+    database(scenario)
+
+def test_committed_update_invalidates_both_tiers(database, user_cache):
+    async def scenario(db, counter):
+        user, token = await seed(db, counter)
+        await authenticate_token(token, db)
+        
+        user.subscription_tier = "pro"
+        await db.commit()
+        # The Redis delete runs in the background
+        await asyncio.gather(*user_cache._pending)
+        
+        assert user_cache._entries == {} and user_cache._redis.values == {}
+        assert (await authenticate_token(token, db)).subscription_tier == "pro"
+    
+    database(scenario)
+
+def test_rolled_back_update_keeps_the_cached_user(database, user_cache):
+    async def scenario(db, counter):
+        user, token = await seed(db, counter)
+        await authenticate_token(token, db)
+        
+        user.subscription_tier = "pro"
+        await db.flush()
+        await db.rollback()
+        
+        assert user_cache.stats()["invalidations"] == 0
+        assert (await authenticate_token(token, db)).subscription_tier == "basic"
+    
+    database(scenario)
+
+def test_deleted_user_is_rejected_after_commit(database, user_cache):
+    async def scenario(db, counter):
+        user, token = await seed(db, counter)
+        await authenticate_token(token, db)
+        
+        await db.delete(user)
+        await db.commit()
+        await asyncio.gather(*user_cache._pending)
+        
+        with pytest.raises(HTTPException) as error:
+            await authenticate_token(token, db)
+        assert error.value.status_code == 401
+    
+    database(scenario)
+
+def test_redis_outage_falls_back_to_the_database(database, user_cache):
+    async def scenario(db, counter):
+        user, token = await seed(db, counter)
+        user_cache._redis.down = True
+        
+        assert (await authenticate_token(token, db)).id == user.id
+        user_cache.clear()
+        assert (await authenticate_token(token, db)).id == user.id
+        assert counter.count == 2
+        
+        # Invalidation still drops the in-process entry
+        user.subscription_tier = "pro"
+        await db.commit()
+        await asyncio.gather(*user_cache._pending)
+        assert user_cache._entries == {}
+    
+    database(scenario)
+
+def test_corrupt_redis_entry_is_a_miss(database, user_cache):
+    async def scenario(db, counter):
+        user, token = await seed(db, counter)
+        user_cache._redis.values[user_cache.key_prefix + str(user.id)] = b"{not json"
+        
+        assert (await authenticate_token(token, db)).id == user.id
+        assert counter.count == 1
+    
+    database(scenario)
@@ -0,0 +1,55 @@
+import asyncio
+
+from app.chat.window_cache import ConversationWindowCache
+
+def message(i):
+    return {"id": f"m{i}", "content": f"Message {i}"}
+
+class SlowLoad:
+    """
+    Stub window loader that waits until released, counting its calls.
+    """
+    
+    def __init__(self, messages):
+        self.messages = messages
+        self.calls = 0
+        self.release = asyncio.Event()
+    
+    async def __call__(self, limit):
+        self.calls += 1
+        await self.release.wait()
+        return self.messages[-limit:]
+
+def test_message_written_during_a_load_is_kept_once():
+    async def scenario():
+        cache = ConversationWindowCache(window=10)
+        # m3 was committed before the load read; m4 after
+        load = SlowLoad([message(i) for i in range(4)])
+        
+        reading = asyncio.ensure_future(cache.get("s", 10, load))
+        await asyncio.sleep(0)
+        cache.append("s", message(3))
+        cache.append("s", message(4))
+        load.release.set()
+        
+        assert [m["id"] for m in await reading] == ["m0", "m1", "m2", "m3", "m4"]
+        cache.append("s", message(4))
+        assert [m["id"] for m in await cache.get("s", 10, load)] == ["m0", "m1", "m2", "m3", "m4"]
+        assert load.calls == 1
+    
+    asyncio.run(scenario())
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache = ConversationWindowCache(window=10)
+        load = SlowLoad([message(i) for i in range(3)])
+        
+        readers = [asyncio.ensure_future(cache.get("s", 2, load)) for _ in range(5)]
+        await asyncio.sleep(0)
+        load.release.set()
+        
+        assert await asyncio.gather(*readers) == [[message(1), message(2)]] * 5
+        assert load.calls == 1
+        assert cache.stats()["misses"] == 5
+    
+    asyncio.run(scenario())